@@ -0,0 +1,194 @@
+"""End-to-end crawl benchmark against a local replay of the BPS site.
+
+Builds a synthetic archive from the saved fixtures (or uses a recorded one),
+serves it with bps_replay.ReplayServer and crawls it over the HTTP tier for
+each crawl size in a fresh subprocess, reporting pages/sec, parse and
+extract ms per page and peak RSS. Challenged pages go to
+bps_replay.ReplayBrowserPool instead of Chrome, so neither network access
+nor a browser is needed.
+
+With --format=ndjson the crawl streams its records and keeps its state in
+SQLite, as large crawls do; the RSS growth per page between the smallest
+and largest size is then reported, and --max-rss-growth=KB fails the run
+when memory grows by more than KB per crawled page.
+
+    python benchmarks/bench_crawl.py [--sizes=10,50,200] [--archive=path.warc]
+                                     [--latency=MIN-MAX] [--challenge=RATE] [--json]
+                                     [--format=json|ndjson] [--max-rss-growth=KB]
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+
+from bps_archive import ArchiveWriter
+from bps_extract import extract_page
+from bps_urls import UrlRules
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+BASE_URL = "https://medankota.bps.go.id"
+
+
+def _fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def build_synthetic_archive(path: str, pages: int):
+    """Archive every fixture link plus `pages` generated table pages, each linking three more.
+
+    Every page gets its own table of random figures so the crawler's
+    near-duplicate detection treats them as distinct pages.
+    """
+    templates = {name: _fixture(name) for name in ("home.html", "statictable.html", "publication.html")}
+    rules = UrlRules()
+
+    urls = [BASE_URL + "/"]
+    for source in templates.values():
+        for href in extract_page(source)["links"]:
+            url = rules.normalize(href, BASE_URL + "/")
+            if url and url not in urls:
+                urls.append(url)
+    urls += [f"{BASE_URL}/statictable/2024/01/01/{n}/tabel-{n}.html" for n in range(pages)]
+
+    writer = ArchiveWriter(path)
+    for index, url in enumerate(urls):
+        lowered = url.lower()
+        if url == BASE_URL + "/":
+            template = templates["home.html"]
+        elif "/statictable" in lowered:
+            template = templates["statictable.html"]
+        elif "/publication" in lowered:
+            template = templates["publication.html"]
+        else:
+            template = templates["home.html"]
+
+        children = [urls[child] for child in range(3 * index + 1, 3 * index + 4) if child < len(urls)]
+        related = "".join(f'<li><a href="{child[len(BASE_URL):]}">Tabel terkait {child[-12:]}</a></li>'
+                          for child in children)
+        body = template.replace("</title>", f" #{index}</title>", 1)
+        rng = random.Random(index)
+        rows = "".join(f"<tr><td>Kecamatan {rng.randint(1, 99)}</td><td>{rng.randint(1000, 999999)}</td>"
+                       f"<td>{rng.uniform(0, 100):.2f}</td></tr>" for _ in range(12))
+        body = body.replace("</body>", f"<table>{rows}</table><ul class=\"related\">{related}</ul></body>", 1)
+        writer.write_response(url, body)
+    writer.close()
+    return len(urls)
+
+
+def run_single(archive: str, max_pages: int, latency_ms, challenge_rate: float, output_format: str = "json") -> dict:
+    """Crawl the replayed archive once in this process and measure it"""
+    import logging
+    from bps_output import ndjson_path_for
+    from bps_replay import ReplayBrowserPool, ReplayServer
+    from bps_scraper import UndetectedBPSMedanScraper
+
+    workdir = tempfile.mkdtemp(prefix="bps_bench_")
+    os.chdir(workdir)
+    with ReplayServer(archive, latency=(latency_ms[0] / 1000, latency_ms[-1] / 1000),
+                      challenge_rate=challenge_rate) as server:
+        output_file = os.path.join(workdir, "index.json")
+        state_file = None
+        if output_format == "ndjson":
+            output_file = ndjson_path_for(output_file)
+            state_file = os.path.join(workdir, "state.sqlite")
+        # Challenged pages are retried against the replay instead of starting Chrome
+        browser_pool = ReplayBrowserPool()
+        scraper = UndetectedBPSMedanScraper(output_file, headless=True, rate=(1000, 1000), base_url=server.base_url,
+                                            output_format=output_format, state_file=state_file,
+                                            browser_pool=browser_pool)
+        scraper.logger.setLevel(logging.WARNING)
+        started_at = time.perf_counter()
+        try:
+            result = scraper.scrape_with_undetected_chrome(max_pages=max_pages, start_delay=0)
+        finally:
+            browser_pool.close()
+        seconds = time.perf_counter() - started_at
+
+    stages = result.get("stage_timings_ms", {})
+    pages = result.get("total_urls", 0)
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+    return {
+        "max_pages": max_pages,
+        "pages": pages,
+        "errors": result.get("error_count", 0),
+        "challenges": server.stats["challenges"],
+        # A challenge makes the scheduler back off the host, as it would on the live site
+        "backoffs": sum(host["backoffs"] for host in scraper.scheduler.summary().values()),
+        "seconds": round(seconds, 3),
+        "pages_per_sec": round(pages / seconds, 2) if seconds else 0.0,
+        "parse_ms_p50": stages.get("parse", {}).get("p50", 0.0),
+        "extract_ms_p50": stages.get("extract", {}).get("p50", 0.0),
+        "peak_rss_mb": round(peak_rss_kb / 1024, 1) if peak_rss_kb else None,
+    }
+
+
+def main():
+    options = dict(arg[2:].partition("=")[::2] for arg in sys.argv[1:] if arg.startswith("--"))
+    latency_ms = tuple(float(bound) for bound in (options.get("latency") or "0-0").split("-", 1))
+    challenge_rate = float(options.get("challenge") or 0)
+
+    if "single" in options:
+        print(json.dumps(run_single(options["archive"], int(options["single"]), latency_ms, challenge_rate,
+                                    options.get("format") or "json")))
+        return
+
+    sizes = [int(size) for size in (options.get("sizes") or "10,50,200").split(",")]
+    archive = options.get("archive")
+    if not archive:
+        archive = os.path.join(tempfile.mkdtemp(prefix="bps_bench_"), "synthetic.warc")
+        build_synthetic_archive(archive, max(sizes))
+
+    # One subprocess per size so peak RSS is measured per crawl, not cumulatively
+    results = []
+    for size in sizes:
+        command = [sys.executable, os.path.abspath(__file__), f"--single={size}", f"--archive={os.path.abspath(archive)}",
+                   f"--latency={options.get('latency') or '0-0'}", f"--challenge={challenge_rate}",
+                   f"--format={options.get('format') or 'json'}"]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    growth_kb = rss_growth_per_page(results) if options.get("format") == "ndjson" else None
+
+    if "json" in options:
+        print(json.dumps({"runs": results, "rss_growth_kb_per_page": growth_kb} if growth_kb is not None else results,
+                         indent=2))
+    else:
+        print(f"{'pages':>6}{'errors':>8}{'seconds':>10}{'pages/s':>10}{'parse ms':>10}{'extract ms':>12}{'peak RSS MB':>13}")
+        for row in results:
+            print(f"{row['pages']:>6}{row['errors']:>8}{row['seconds']:>10.2f}{row['pages_per_sec']:>10.1f}"
+                  f"{row['parse_ms_p50']:>10.2f}{row['extract_ms_p50']:>12.2f}{str(row['peak_rss_mb']):>13}")
+        if growth_kb is not None:
+            print(f"RSS growth: {growth_kb:.1f} KB per page")
+
+    limit = options.get("max-rss-growth")
+    if limit and growth_kb is not None and growth_kb > float(limit):
+        print(f"RSS grows {growth_kb:.1f} KB per page, more than the allowed {float(limit):.1f} KB", file=sys.stderr)
+        sys.exit(1)
+
+
+def rss_growth_per_page(results: list):
+    """Peak RSS added per crawled page between the smallest and the largest crawl, in KB"""
+    measured = [row for row in results if row["peak_rss_mb"] is not None]
+    if len(measured) < 2:
+        return None
+    smallest = min(measured, key=lambda row: row["pages"])
+    largest = max(measured, key=lambda row: row["pages"])
+    if largest["pages"] <= smallest["pages"]:
+        return None
+    return round((largest["peak_rss_mb"] - smallest["peak_rss_mb"]) * 1024 / (largest["pages"] - smallest["pages"]), 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Parse-time micro-benchmark for page extraction on saved BPS HTML fixtures.
+
+Compares the old per-page work (two BeautifulSoup 'html.parser' trees plus
+separate description/keyword/link walks) with the single-pass lxml pipeline.
+
+    python benchmarks/bench_extract.py [iterations]
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from bps_extract import extract_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def legacy_extract(page_source: str):
+    """The previous two-parse BeautifulSoup extraction"""
+    soup = BeautifulSoup(page_source, 'html.parser')
+    meta_desc = soup.find('meta', attrs={'name': 'description'})
+    if meta_desc and meta_desc.get('content'):
+        description = meta_desc.get('content').strip()
+    else:
+        first_p = soup.find('p')
+        description = first_p.get_text(strip=True)[:200] if first_p else "No description available"
+
+    keywords = []
+    meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
+    if meta_keywords and meta_keywords.get('content'):
+        keywords.extend([k.strip() for k in meta_keywords.get('content').split(',')][:5])
+    for header in soup.find_all(['h1', 'h2', 'h3'])[:3]:
+        keywords.extend(re.findall(r'\b[a-zA-Z]{3,}\b', header.get_text(strip=True).lower())[:2])
+
+    link_soup = BeautifulSoup(page_source, 'html.parser')
+    links = [a.get('href') for a in link_soup.find_all('a', href=True)]
+    return description, keywords, links
+
+
+def time_per_page(func, page_source: str, iterations: int) -> float:
+    """Mean milliseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(page_source)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    fixtures = sorted(name for name in os.listdir(FIXTURES_DIR) if name.endswith(".html"))
+
+    print(f"{'fixture':<22}{'bytes':>8}{'legacy ms':>12}{'lxml ms':>10}{'speedup':>9}")
+    for name in fixtures:
+        with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+            page_source = f.read()
+
+        legacy_ms = time_per_page(legacy_extract, page_source, iterations)
+        single_ms = time_per_page(extract_page, page_source, iterations)
+        print(f"{name:<22}{len(page_source):>8}{legacy_ms:>12.3f}{single_ms:>10.3f}{legacy_ms / single_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Memory of the crawl's seen-URL set and page records, in bytes per URL.
+
+Compares a plain set of URL strings with the prefix-compressed UrlTable and
+a Bloom filter, and per-page dicts with PageRecord slots, using synthetic
+BPS-shaped URLs and records. Measured with tracemalloc.
+
+    python benchmarks/bench_state.py [--urls=100000] [--records=10000] [--json]
+"""
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+
+from bps_compact import BloomFilter, PageRecord, UrlTable
+
+BASE_URL = "https://medankota.bps.go.id"
+SECTIONS = ("statictable", "publication", "pressrelease", "news", "subject")
+
+
+def synthetic_urls(count: int):
+    """BPS-shaped URLs: dated section paths with a slug, some with query strings"""
+    for n in range(count):
+        section = SECTIONS[n % len(SECTIONS)]
+        url = (f"{BASE_URL}/{section}/20{18 + n % 7}/{1 + n % 12:02d}/{1 + n % 28:02d}/{n}/"
+               f"jumlah-penduduk-menurut-kecamatan-di-kota-medan-{n}.html")
+        yield url + ("?page=2&sort=desc" if n % 10 == 0 else "")
+
+
+def synthetic_record(n: int, url: str) -> dict:
+    """A page record shaped like the ones the crawler emits"""
+    return {
+        "url": url,
+        "original_url": url,
+        "title": f"Jumlah Penduduk Menurut Kecamatan di Kota Medan {n}",
+        "description": "Tabel ini menyajikan jumlah penduduk menurut kecamatan di Kota Medan.",
+        "keywords": ["penduduk", "kecamatan", "medan"],
+        "type": "statistics_table",
+        "depth": n % 4,
+        "scraped_at": "2026-01-01T00:00:00",
+        "content_length": 40000 + n,
+        "redirected": False,
+        "fetch_method": "http",
+        "load_time": 0.25,
+        "chunks": 3,
+        "table_facts": 0,
+        "fingerprint": f"{n:016x}",
+        "timings_ms": {"delay": 0.0, "load": 250.0, "parse": 2.1, "extract": 1.4, "chunks": 0.8},
+    }
+
+
+def measure(build):
+    """(bytes allocated and still held, seconds) for building a structure"""
+    gc.collect()
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    kept = build()
+    seconds = time.perf_counter() - started_at
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current, seconds
+
+
+def main():
+    options = dict(arg[2:].partition("=")[::2] for arg in sys.argv[1:] if arg.startswith("--"))
+    url_count = int(options.get("urls") or 100000)
+    record_count = int(options.get("records") or 10000)
+
+    urls = list(synthetic_urls(url_count))
+    url_bytes = sum(len(url) for url in urls)
+
+    def build_set():
+        return set(synthetic_urls(url_count))
+
+    def build_table():
+        table = UrlTable()
+        table.update(synthetic_urls(url_count))
+        return table
+
+    def build_bloom():
+        bloom = BloomFilter(url_count, 0.001)
+        bloom.update(synthetic_urls(url_count))
+        return bloom
+
+    record_urls = urls[:record_count]
+
+    def build_dicts():
+        return [synthetic_record(n, url) for n, url in enumerate(record_urls)]
+
+    def build_records():
+        return [PageRecord.from_dict(synthetic_record(n, url)) for n, url in enumerate(record_urls)]
+
+    rows = []
+    for name, build, count in (("set[str]", build_set, url_count),
+                               ("UrlTable", build_table, url_count),
+                               ("BloomFilter 0.1%", build_bloom, url_count),
+                               ("dict records", build_dicts, record_count),
+                               ("PageRecord", build_records, record_count)):
+        held, seconds = measure(build)
+        rows.append({"structure": name, "items": count, "bytes": held,
+                     "bytes_per_item": round(held / count, 1), "seconds": round(seconds, 3)})
+
+    if "json" in options:
+        print(json.dumps({"avg_url_length": round(url_bytes / url_count, 1), "results": rows}, indent=2))
+        return
+
+    print(f"{url_count} URLs, {url_bytes / url_count:.1f} characters on average")
+    print(f"{'structure':<20}{'items':>9}{'MB':>9}{'bytes/item':>12}{'seconds':>10}")
+    for row in rows:
+        print(f"{row['structure']:<20}{row['items']:>9}{row['bytes'] / 2 ** 20:>9.2f}"
+              f"{row['bytes_per_item']:>12.1f}{row['seconds']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
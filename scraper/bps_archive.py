@@ -0,0 +1,152 @@
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Minimal WARC/1.0 writer and reader: one "response" record per fetched page,
+# each holding an HTTP/1.1 response block. Plain (uncompressed) records keep
+# the files readable with standard WARC tooling and greppable by hand.
+WARC_VERSION = b"WARC/1.0"
+_CRLF = b"\r\n"
+
+
+def _http_block(status: int, headers: Dict[str, str], body: bytes) -> bytes:
+    """Serialize an HTTP/1.1 response as stored inside a WARC record"""
+    reason = {200: "OK", 301: "Moved Permanently", 302: "Found", 404: "Not Found"}.get(status, "")
+    lines = [f"HTTP/1.1 {status} {reason}".rstrip()]
+    for name, value in headers.items():
+        lines.append(f"{name}: {value}")
+    lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('utf-8') + body
+
+
+def _parse_headers(block: bytes) -> Dict[str, str]:
+    """Header lines (after the first line) of a header block"""
+    headers = {}
+    for line in block.split(_CRLF)[1:]:
+        name, sep, value = line.decode('utf-8', errors='replace').partition(":")
+        if sep:
+            headers[name.strip()] = value.strip()
+    return headers
+
+
+class ArchiveWriter:
+    """Appends fetched pages to a WARC-like archive; safe to share between threads"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.record_count = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'ab')
+        self._lock = threading.Lock()
+
+    def write_response(self, url: str, body: str, status: int = 200, headers: Optional[Dict[str, str]] = None):
+        """Store one HTTP response for a URL"""
+        http_headers = {"Content-Type": "text/html; charset=utf-8"}
+        http_headers.update(headers or {})
+        block = _http_block(status, http_headers, body.encode('utf-8'))
+        warc_headers = [
+            WARC_VERSION.decode(),
+            "WARC-Type: response",
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+            f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+            f"WARC-Target-URI: {url}",
+            "Content-Type: application/http; msgtype=response",
+            f"Content-Length: {len(block)}",
+        ]
+        record = ("\r\n".join(warc_headers) + "\r\n\r\n").encode('utf-8') + block + _CRLF + _CRLF
+        with self._lock:
+            self._file.write(record)
+            self._file.flush()
+            self.record_count += 1
+
+    def write_page(self, requested_url: str, page: Dict):
+        """Store a crawled page snapshot, plus a redirect record when the URL changed"""
+        headers = {}
+        if page.get("etag"):
+            headers["ETag"] = page["etag"]
+        if page.get("last_modified"):
+            headers["Last-Modified"] = page["last_modified"]
+        self.write_response(page["url"], page["source"], headers=headers)
+        if requested_url != page["url"]:
+            self.write_response(requested_url, "", status=301, headers={"Location": page["url"]})
+
+    def close(self):
+        """Close the archive file"""
+        with self._lock:
+            self._file.close()
+
+
+class ArchiveReader:
+    """Random access to the responses in a WARC-like archive, indexed by target URI"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._file = open(path, 'rb')
+        self._build_index()
+
+    def _build_index(self):
+        """Scan record headers once; a later record for the same URL wins"""
+        f = self._file
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            if line.rstrip() != WARC_VERSION:
+                continue
+            header_block = line.rstrip() + _CRLF
+            while True:
+                line = f.readline()
+                if not line or line in (_CRLF, b"\n"):
+                    break
+                header_block += line
+            headers = _parse_headers(header_block.rstrip())
+            length = int(headers.get("Content-Length", 0))
+            offset = f.tell()
+            if headers.get("WARC-Type") == "response" and "WARC-Target-URI" in headers:
+                self._offsets[headers["WARC-Target-URI"]] = (offset, length)
+            f.seek(offset + length)
+
+    def __len__(self) -> int:
+        """Number of archived URLs"""
+        return len(self._offsets)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._offsets
+
+    def urls(self) -> List[str]:
+        """Archived URLs in file order"""
+        return list(self._offsets)
+
+    def get(self, url: str) -> Optional[Dict]:
+        """The archived response for a URL: status, headers and body bytes"""
+        location = self._offsets.get(url)
+        if location is None:
+            return None
+        offset, length = location
+        with self._lock:
+            self._file.seek(offset)
+            block = self._file.read(length)
+        head, _, body = block.partition(_CRLF + _CRLF)
+        status_line = head.split(_CRLF, 1)[0].decode('utf-8', errors='replace').split()
+        return {
+            "url": url,
+            "status": int(status_line[1]) if len(status_line) > 1 else 200,
+            "headers": _parse_headers(head),
+            "body": body,
+        }
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Every archived response"""
+        for url in self.urls():
+            yield self.get(url)
+
+    def close(self):
+        """Close the archive file"""
+        self._file.close()
@@ -0,0 +1,159 @@
+import mmap
+import struct
+from typing import List, Dict, Tuple
+
+from bps_publish import publish_file
+from bps_search import BM25Index, RESULT_FIELDS, tokenize
+
+
+# File layout (little-endian):
+#   header | term directory | term strings | postings | record directory | record strings
+# The term directory and record directory are fixed-width, so a lookup is a
+# binary search over terms plus direct offset arithmetic; only the touched
+# pages of the mapping are ever read.
+MAGIC = b"BPSIDX1\0"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sIIIQQQQQ")
+_TERM_ENTRY = struct.Struct("<IIII")          # term offset, term length, first posting, posting count
+_POSTING = struct.Struct("<If")               # record id, BM25 impact
+_RECORD_ENTRY = struct.Struct("<" + "II" * len(RESULT_FIELDS))   # (offset, length) per field
+
+
+def build_binary_index(records: List[Dict], path: str) -> Dict:
+    """Compile page records into the memory-mappable index format"""
+    bm25 = BM25Index(records)
+    terms = sorted(bm25.postings, key=lambda term: term.encode('utf-8'))
+
+    term_dir = bytearray()
+    term_blob = bytearray()
+    postings = bytearray()
+    posting_index = 0
+    for term in terms:
+        encoded = term.encode('utf-8')
+        term_postings = bm25.postings[term]
+        term_dir += _TERM_ENTRY.pack(len(term_blob), len(encoded), posting_index, len(term_postings))
+        term_blob += encoded
+        for doc_id, impact in term_postings:
+            postings += _POSTING.pack(doc_id, impact)
+        posting_index += len(term_postings)
+
+    record_dir = bytearray()
+    string_blob = bytearray()
+    for record in records:
+        entry = []
+        for field in RESULT_FIELDS:
+            encoded = str(record.get(field, "") or "").encode('utf-8')
+            entry.extend((len(string_blob), len(encoded)))
+            string_blob += encoded
+        record_dir += _RECORD_ENTRY.pack(*entry)
+
+    term_dir_off = _HEADER.size
+    term_blob_off = term_dir_off + len(term_dir)
+    postings_off = term_blob_off + len(term_blob)
+    record_dir_off = postings_off + len(postings)
+    string_blob_off = record_dir_off + len(record_dir)
+
+    header = _HEADER.pack(MAGIC, VERSION, len(records), len(terms),
+                          term_dir_off, term_blob_off, postings_off, record_dir_off, string_blob_off)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        for section in (header, term_dir, term_blob, postings, record_dir, string_blob):
+            f.write(section)
+    publish_file(tmp_path, path)
+
+    return {
+        "records": len(records),
+        "terms": len(terms),
+        "postings": posting_index,
+        "bytes": string_blob_off + len(string_blob),
+    }
+
+
+class MmapIndex:
+    """Read-only BM25 index served straight from a memory-mapped file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.record_count, self.term_count, self._term_dir_off, self._term_blob_off,
+         self._postings_off, self._record_dir_off, self._string_blob_off) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a BPS binary index (version {VERSION})")
+
+    def __len__(self) -> int:
+        """Number of records in the index"""
+        return self.record_count
+
+    def _term_at(self, index: int) -> Tuple[bytes, int, int]:
+        """(term bytes, first posting, posting count) of the index-th directory entry"""
+        term_off, term_len, first, count = _TERM_ENTRY.unpack_from(self._mm, self._term_dir_off + index * _TERM_ENTRY.size)
+        start = self._term_blob_off + term_off
+        return self._mm[start:start + term_len], first, count
+
+    def _postings_for(self, term: str) -> Tuple[int, int]:
+        """Binary search the term directory; returns (first posting, count)"""
+        target = term.encode('utf-8')
+        low, high = 0, self.term_count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            candidate, first, count = self._term_at(middle)
+            if candidate == target:
+                return first, count
+            if candidate < target:
+                low = middle + 1
+            else:
+                high = middle - 1
+        return 0, 0
+
+    def _iter_postings(self, first: int, count: int):
+        """Yield (record id, impact) pairs, highest impact first"""
+        return _POSTING.iter_unpack(self._mm[self._postings_off + first * _POSTING.size:
+                                             self._postings_off + (first + count) * _POSTING.size])
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Return (record id, score) pairs for the best-matching records"""
+        terms = set(tokenize(query))
+        if len(terms) == 1:
+            first, count = self._postings_for(terms.pop())
+            return list(self._iter_postings(first, min(count, limit)))
+
+        scores: Dict[int, float] = {}
+        for term in terms:
+            for doc_id, impact in self._iter_postings(*self._postings_for(term)):
+                scores[doc_id] = scores.get(doc_id, 0.0) + impact
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def record(self, doc_id: int) -> Dict:
+        """Decode one record's result fields"""
+        entry = _RECORD_ENTRY.unpack_from(self._mm, self._record_dir_off + doc_id * _RECORD_ENTRY.size)
+        record = {}
+        for index, field in enumerate(RESULT_FIELDS):
+            start = self._string_blob_off + entry[2 * index]
+            record[field] = self._mm[start:start + entry[2 * index + 1]].decode('utf-8')
+        return record
+
+    def stats(self) -> Dict:
+        """Section sizes, for the inspect command"""
+        return {
+            "path": self.path,
+            "records": self.record_count,
+            "terms": self.term_count,
+            "postings": (self._record_dir_off - self._postings_off) // _POSTING.size,
+            "bytes": len(self._mm),
+            "sections": {
+                "term_directory": self._term_blob_off - self._term_dir_off,
+                "term_strings": self._postings_off - self._term_blob_off,
+                "postings": self._record_dir_off - self._postings_off,
+                "record_directory": self._string_blob_off - self._record_dir_off,
+                "record_strings": len(self._mm) - self._string_blob_off,
+            },
+        }
+
+    def close(self):
+        """Unmap the file"""
+        self._mm.close()
@@ -0,0 +1,276 @@
+import hashlib
+import math
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+_HASH_MASK = (1 << 64) - 1
+
+
+def _section_end(url: str) -> int:
+    """Index just past the first path segment's '/', or past the host when there is none"""
+    host_start = url.find("://") + 3
+    path_start = url.find("/", host_start)
+    if path_start < 0:
+        return len(url)
+    section_end = url.find("/", path_start + 1)
+    return section_end + 1 if section_end >= 0 else path_start + 1
+
+
+class UrlTable:
+    """Interned, prefix-compressed URL set with dense integer ids.
+
+    Each URL is split after its first path segment: the prefix (scheme, host
+    and site section, e.g. https://medankota.bps.go.id/statictable/) is
+    stored once and shared by every URL under it, the rest is appended as
+    UTF-8 to a single byte buffer. Membership goes through an
+    open-addressing table of 64-bit URL hashes held in flat arrays, so no
+    per-URL Python objects stay alive. Two URLs with the same 64-bit hash
+    would count as one; at a million URLs the odds are about 1 in 30 million.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        size = 1 << max(4, (capacity * 3 // 2).bit_length())
+        self._prefixes: List[str] = []
+        self._prefix_ids: Dict[str, int] = {}
+        self._prefix_of = array('I')
+        self._ends = array('I')
+        self._suffixes = bytearray()
+        self._keys = array('Q', bytes(8 * size))
+        self._ids = array('I', bytes(4 * size))
+        self._mask = size - 1
+
+    @staticmethod
+    def _key(url: str) -> int:
+        """Non-zero 64-bit hash of a URL (0 marks an empty slot)"""
+        return (hash(url) & _HASH_MASK) or 1
+
+    def _slot(self, key: int) -> int:
+        """Slot holding the key, or the empty slot where it would go"""
+        keys, mask = self._keys, self._mask
+        slot = key & mask
+        while keys[slot] and keys[slot] != key:
+            slot = (slot + 1) & mask
+        return slot
+
+    def _grow(self):
+        """Double the hash table; ids do not change"""
+        old_keys, old_ids = self._keys, self._ids
+        size = len(old_keys) * 2
+        self._keys = array('Q', bytes(8 * size))
+        self._ids = array('I', bytes(4 * size))
+        self._mask = size - 1
+        for key, url_id in zip(old_keys, old_ids):
+            if key:
+                slot = self._slot(key)
+                self._keys[slot] = key
+                self._ids[slot] = url_id
+
+    def add(self, url: str) -> int:
+        """Id of the URL, adding it when it is new"""
+        key = self._key(url)
+        slot = self._slot(key)
+        if self._keys[slot]:
+            return self._ids[slot]
+
+        cut = _section_end(url)
+        prefix = url[:cut]
+        prefix_id = self._prefix_ids.get(prefix)
+        if prefix_id is None:
+            prefix_id = self._prefix_ids[prefix] = len(self._prefixes)
+            self._prefixes.append(prefix)
+        url_id = len(self._ends)
+        self._prefix_of.append(prefix_id)
+        self._suffixes += url[cut:].encode('utf-8')
+        self._ends.append(len(self._suffixes))
+
+        self._keys[slot] = key
+        self._ids[slot] = url_id
+        if len(self._ends) * 3 > len(self._keys) * 2:
+            self._grow()
+        return url_id
+
+    def update(self, urls: Iterable[str]):
+        """Add several URLs"""
+        for url in urls:
+            self.add(url)
+
+    def id_of(self, url: str) -> Optional[int]:
+        """Id of a stored URL, or None"""
+        slot = self._slot(self._key(url))
+        return self._ids[slot] if self._keys[slot] else None
+
+    def __contains__(self, url: str) -> bool:
+        return bool(self._keys[self._slot(self._key(url))])
+
+    def __len__(self) -> int:
+        return len(self._ends)
+
+    def url(self, url_id: int) -> str:
+        """The URL stored under an id"""
+        start = self._ends[url_id - 1] if url_id else 0
+        return self._prefixes[self._prefix_of[url_id]] + self._suffixes[start:self._ends[url_id]].decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        for url_id in range(len(self)):
+            yield self.url(url_id)
+
+    def nbytes(self) -> int:
+        """Memory held by the table's buffers and interned prefixes"""
+        arrays = (self._prefix_of, self._ends, self._keys, self._ids)
+        return (sum(a.buffer_info()[1] * a.itemsize for a in arrays) + len(self._suffixes)
+                + sum(sys.getsizeof(prefix) for prefix in self._prefixes)
+                + sys.getsizeof(self._prefix_ids) + sys.getsizeof(self._prefixes))
+
+
+class BloomFilter:
+    """Fixed-size probabilistic seen set: no false negatives, `error_rate` false positives.
+
+    Memory stays at about 1.8 bytes per expected URL (for a 0.1% error
+    rate) however long the URLs are; a false positive means a new link is
+    taken for already seen and skipped.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bit_count = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.bit_count / capacity * math.log(2))))
+        self._bits = bytearray((self.bit_count + 7) // 8)
+        self._count = 0
+
+    def _positions(self, url: str) -> List[int]:
+        """Bit positions of a URL, by double hashing one 128-bit digest"""
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.bit_count for i in range(self.hash_count)]
+
+    def add(self, url: str) -> bool:
+        """Set the URL's bits; returns True if it was (probably) not seen before"""
+        new = False
+        for position in self._positions(url):
+            mask = 1 << (position & 7)
+            if not self._bits[position >> 3] & mask:
+                self._bits[position >> 3] |= mask
+                new = True
+        if new:
+            self._count += 1
+        return new
+
+    def update(self, urls: Iterable[str]):
+        """Add several URLs"""
+        for url in urls:
+            self.add(url)
+
+    def __contains__(self, url: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(url))
+
+    def __len__(self) -> int:
+        """Number of distinct URLs added (approximate)"""
+        return self._count
+
+    def nbytes(self) -> int:
+        """Memory held by the bit array"""
+        return len(self._bits)
+
+
+# Page record fields, in the order they appear in the index JSON
+RECORD_FIELDS = (
+    "url", "original_url", "title", "description", "keywords", "type", "depth", "scraped_at",
+    "content_length", "redirected", "fetch_method", "load_time", "chunks", "table_facts",
+    "fingerprint", "timings_ms", "aliases",
+)
+
+# Small vocabularies repeated on every record; one shared string each
+_INTERNED_FIELDS = ("type", "fetch_method")
+
+_MISSING = object()
+
+
+class PageRecord:
+    """One scraped page, held in attribute slots instead of a per-page dict.
+
+    Reads like the dict it replaces (record["url"], record.get(...)) and
+    round-trips through to_dict() with exactly the keys it was given;
+    keys outside RECORD_FIELDS are kept in `extra`.
+    """
+
+    __slots__ = RECORD_FIELDS + ("extra",)
+
+    def __init__(self, **fields):
+        self.extra = None
+        for name, value in fields.items():
+            self[name] = value
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PageRecord":
+        """Record from its dict form"""
+        return data if isinstance(data, PageRecord) else cls(**data)
+
+    def __setitem__(self, name: str, value):
+        if name in RECORD_FIELDS:
+            if name in _INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, name, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[name] = value
+
+    def __getitem__(self, name: str):
+        try:
+            return getattr(self, name) if name in RECORD_FIELDS else self.extra[name]
+        except (AttributeError, KeyError, TypeError):
+            raise KeyError(name) from None
+
+    def get(self, name: str, default=None):
+        """Field value, or the default when it is not set"""
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name, _MISSING) is not _MISSING
+
+    def to_dict(self) -> Dict:
+        """Dict form, with only the fields that are set"""
+        data = {}
+        for name in RECORD_FIELDS:
+            value = getattr(self, name, _MISSING)
+            if value is not _MISSING:
+                data[name] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def nbytes(self) -> int:
+        """Approximate memory of the record and the values it holds"""
+        total = sys.getsizeof(self)
+        for name in self.__slots__:
+            value = getattr(self, name, None)
+            if value is None or (name in _INTERNED_FIELDS and isinstance(value, str)):
+                continue
+            total += sys.getsizeof(value)
+            if isinstance(value, dict):
+                total += sum(sys.getsizeof(item) for item in value.values())
+            elif isinstance(value, list):
+                total += sum(sys.getsizeof(item) for item in value)
+        return total
+
+
+def memory_report(seen, records: Iterable[PageRecord]) -> Dict:
+    """Bytes held by the seen set and the in-memory page records, per URL / per page"""
+    records = list(records)
+    seen_bytes = seen.nbytes() if hasattr(seen, "nbytes") else sys.getsizeof(seen)
+    record_bytes = sum(record.nbytes() for record in records)
+    return {
+        "urls": len(seen),
+        "seen_bytes": seen_bytes,
+        "seen_bytes_per_url": round(seen_bytes / len(seen), 1) if len(seen) else 0.0,
+        "records": len(records),
+        "record_bytes": record_bytes,
+        "record_bytes_per_page": round(record_bytes / len(records), 1) if records else 0.0,
+    }
@@ -0,0 +1,303 @@
+import hashlib
+import os
+import re
+import sqlite3
+import zlib
+from typing import List, Dict, Iterable, Tuple
+
+from bps_output import partial_path_for
+from bps_publish import publish_file
+from bps_search import tokenize
+
+
+# Bounded chunk size (characters) for passages handed to the chatbot prompt
+CHUNK_SIZE = 800
+MIN_BLOCK_LENGTH = 3
+
+# A block seen on this many distinct pages is treated as site chrome
+BOILERPLATE_PAGES = 3
+
+_SENTENCE_END_RE = re.compile(r'[.!?;]\s')
+
+
+def chunk_path_for(output_file: str) -> str:
+    """Chunk store sibling of an index path"""
+    root, _ = os.path.splitext(output_file)
+    return root + "_chunks.db"
+
+
+def block_hash(text: str) -> str:
+    """Content hash of one text block, insensitive to case and spacing"""
+    return hashlib.sha1(" ".join(text.lower().split()).encode('utf-8')).hexdigest()[:16]
+
+
+def chunk_blocks(blocks: Iterable[Tuple[str, str]], size: int = CHUNK_SIZE) -> List[Dict]:
+    """Pack body blocks into chunks of at most `size` characters.
+
+    The body text is the blocks joined by newlines; every chunk's start and
+    end are its offsets in that body, so body[start:end] == chunk["text"].
+    """
+    chunks: List[Dict] = []
+    pieces: List[Tuple[int, str]] = []  # (body offset, text) of the chunk being packed
+    offset = 0
+
+    def flush():
+        if pieces:
+            start = pieces[0][0]
+            text = "\n".join(piece for _, piece in pieces)
+            chunks.append({"start": start, "end": start + len(text), "text": text})
+            pieces.clear()
+
+    for _, text in blocks:
+        block_end = offset + len(text)
+        if pieces and block_end - pieces[0][0] > size:
+            flush()
+
+        # A single oversized block is cut at sentence (or word) boundaries
+        while len(text) > size:
+            flush()
+            cut = _cut_point(text, size)
+            piece = text[:cut].rstrip()
+            if piece:
+                chunks.append({"start": offset, "end": offset + len(piece), "text": piece})
+            rest = text[cut:].lstrip()
+            offset += len(text) - len(rest)
+            text = rest
+
+        if text:
+            pieces.append((offset, text))
+        offset = block_end + 1
+
+    flush()
+    return chunks
+
+
+def _cut_point(text: str, size: int) -> int:
+    """Last sentence end, else last space, within the first `size` characters"""
+    window = text[:size]
+    sentence_ends = [match.end() for match in _SENTENCE_END_RE.finditer(window)]
+    if sentence_ends and sentence_ends[-1] > size // 2:
+        return sentence_ends[-1]
+    space = window.rfind(" ")
+    return space if space > size // 2 else size
+
+
+class ChunkStore:
+    """Compressed, hash-deduplicated passage store keyed by page URL"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS chunk_text (
+            hash TEXT PRIMARY KEY,
+            body BLOB NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS chunks (
+            url TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            start INTEGER NOT NULL,
+            end INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            PRIMARY KEY (url, seq)
+        );
+        CREATE TABLE IF NOT EXISTS block_pages (
+            hash TEXT PRIMARY KEY,
+            pages INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS page_blocks (
+            url TEXT PRIMARY KEY,
+            hashes TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS block_text (
+            hash TEXT PRIMARY KEY,
+            body BLOB NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS block_refs (
+            hash TEXT NOT NULL,
+            url TEXT NOT NULL,
+            PRIMARY KEY (hash, url)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, db_path: str, boilerplate_pages: int = BOILERPLATE_PAGES, chunk_size: int = CHUNK_SIZE,
+                 read_only: bool = False):
+        self.db_path = db_path
+        self.boilerplate_pages = boilerplate_pages
+        self.chunk_size = chunk_size
+        if read_only:
+            # A published store is replaced by rename, never written, so it needs no locking
+            self.conn = sqlite3.connect(f"file:{db_path}?immutable=1", uri=True, check_same_thread=False)
+            return
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self.conn.commit()
+
+    @classmethod
+    def stage(cls, path: str, resume: bool = False, **kwargs) -> "ChunkStore":
+        """Open the staged copy of the published store at `path` that a crawl writes to.
+
+        A new run starts from a copy of the published store; a resumed run
+        carries on with the copy its interrupted run left behind. Readers
+        keep seeing the published store until publish().
+        """
+        staged_path = partial_path_for(path)
+        if not (resume and os.path.exists(staged_path)):
+            for stale in (staged_path, staged_path + "-wal", staged_path + "-shm"):
+                if os.path.exists(stale):
+                    os.remove(stale)
+            if os.path.exists(path):
+                source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+                target = sqlite3.connect(staged_path)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                    source.close()
+        return cls(staged_path, **kwargs)
+
+    def publish(self, path: str):
+        """Close this staged store and make it the published one at `path` in one rename"""
+        # Fold the write-ahead log back in so the renamed file is complete on its own
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.close()
+        publish_file(self.db_path, path)
+
+    def _register_blocks(self, url: str, blocks: List[Tuple[str, str]]) -> set:
+        """Count each distinct block once per page, replacing the page's previous blocks.
+
+        The page's block hashes are kept in reading order with their texts,
+        so the page can be chunked again later. Returns the hashes whose
+        page count crossed the boilerplate threshold, either way.
+        """
+        hashes = [digest for digest, _ in blocks]
+        row = self.conn.execute("SELECT hashes FROM page_blocks WHERE url = ?", (url,)).fetchone()
+        previous = set(row[0].split(",")) if row and row[0] else set()
+        current = set(hashes)
+        removed, added = previous - current, current - previous
+
+        self.conn.executemany("UPDATE block_pages SET pages = pages - 1 WHERE hash = ?", [(h,) for h in removed])
+        self.conn.executemany("INSERT INTO block_pages (hash, pages) VALUES (?, 1) "
+                              "ON CONFLICT(hash) DO UPDATE SET pages = pages + 1", [(h,) for h in added])
+        self.conn.executemany("DELETE FROM block_refs WHERE hash = ? AND url = ?", [(h, url) for h in removed])
+        self.conn.executemany("INSERT OR IGNORE INTO block_refs (hash, url) VALUES (?, ?)", [(h, url) for h in added])
+        self.conn.executemany("INSERT OR IGNORE INTO block_text (hash, body) VALUES (?, ?)",
+                              [(digest, zlib.compress(text.encode('utf-8'))) for digest, text in blocks])
+        self.conn.execute("INSERT OR REPLACE INTO page_blocks (url, hashes) VALUES (?, ?)",
+                          (url, ",".join(hashes)))
+
+        changed = list(removed | added)
+        if not changed:
+            return set()
+        placeholders = ",".join("?" * len(changed))
+        rows = self.conn.execute(f"SELECT hash, pages FROM block_pages WHERE hash IN ({placeholders})", changed)
+        # Threshold reached by this page (added) or left because of it (removed)
+        return {digest for digest, pages in rows
+                if pages == (self.boilerplate_pages if digest in added else self.boilerplate_pages - 1)}
+
+    def _boilerplate(self, hashes: Iterable[str]) -> set:
+        """Block hashes that appear on enough pages to count as site chrome"""
+        hashes = list(set(hashes))
+        if not hashes:
+            return set()
+        placeholders = ",".join("?" * len(hashes))
+        rows = self.conn.execute(
+            f"SELECT hash FROM block_pages WHERE pages >= ? AND hash IN ({placeholders})",
+            [self.boilerplate_pages] + hashes,
+        )
+        return {row[0] for row in rows}
+
+    def add_page(self, url: str, blocks: List[Tuple[str, str]]) -> int:
+        """Drop boilerplate blocks, chunk the rest and store it; returns the chunk count.
+
+        When this page makes a block count as boilerplate (or stop counting),
+        the other pages holding that block are chunked again, so what is
+        stripped does not depend on the order pages were crawled in.
+        """
+        blocks = [(block_hash(text), text) for _, text in blocks if len(text) >= MIN_BLOCK_LENGTH]
+
+        with self.conn:
+            crossed = self._register_blocks(url, blocks)
+            chunk_count = self._store_chunks(url, blocks)
+            if crossed:
+                placeholders = ",".join("?" * len(crossed))
+                others = {row[0] for row in self.conn.execute(
+                    f"SELECT url FROM block_refs WHERE hash IN ({placeholders})", list(crossed))}
+                for other in sorted(others - {url}):
+                    self._rechunk(other)
+        return chunk_count
+
+    def _rechunk(self, url: str):
+        """Chunk a stored page again from its saved blocks"""
+        row = self.conn.execute("SELECT hashes FROM page_blocks WHERE url = ?", (url,)).fetchone()
+        hashes = row[0].split(",") if row and row[0] else []
+        placeholders = ",".join("?" * len(hashes))
+        texts = {digest: zlib.decompress(body).decode('utf-8') for digest, body in self.conn.execute(
+            f"SELECT hash, body FROM block_text WHERE hash IN ({placeholders})", hashes)} if hashes else {}
+        if len(texts) < len(set(hashes)):
+            return  # stored before block texts were kept
+        self._store_chunks(url, [(digest, texts[digest]) for digest in hashes])
+
+    def _store_chunks(self, url: str, blocks: List[Tuple[str, str]]) -> int:
+        """Replace a page's chunks with its (hash, text) blocks minus boilerplate; returns the chunk count"""
+        hashes = [digest for digest, _ in blocks]
+        boilerplate = self._boilerplate(hashes)
+        if boilerplate.issuperset(hashes):
+            # Nothing page-specific left: a duplicate page, not site chrome
+            boilerplate = set()
+
+        body = []
+        kept = set()
+        for digest, text in blocks:
+            if digest in boilerplate or digest in kept:
+                continue
+            kept.add(digest)
+            body.append(("text", text))
+
+        chunks = chunk_blocks(body, self.chunk_size)
+        self.conn.execute("DELETE FROM chunks WHERE url = ?", (url,))
+        for seq, chunk in enumerate(chunks):
+            digest = hashlib.sha1(chunk["text"].encode('utf-8')).hexdigest()
+            self.conn.execute("INSERT OR IGNORE INTO chunk_text (hash, body) VALUES (?, ?)",
+                              (digest, zlib.compress(chunk["text"].encode('utf-8'))))
+            self.conn.execute("INSERT INTO chunks (url, seq, start, end, hash) VALUES (?, ?, ?, ?, ?)",
+                              (url, seq, chunk["start"], chunk["end"], digest))
+        return len(chunks)
+
+    def passages(self, url: str) -> List[Dict]:
+        """Every stored chunk of a page, in reading order"""
+        rows = self.conn.execute(
+            "SELECT c.seq, c.start, c.end, t.body FROM chunks c JOIN chunk_text t ON t.hash = c.hash "
+            "WHERE c.url = ? ORDER BY c.seq", (url,)
+        )
+        return [{"seq": seq, "start": start, "end": end, "text": zlib.decompress(body).decode('utf-8')}
+                for seq, start, end, body in rows]
+
+    def best_passages(self, url: str, query: str, limit: int = 2) -> List[Dict]:
+        """The page's chunks sharing the most query terms, best first"""
+        terms = set(tokenize(query))
+        scored = []
+        for passage in self.passages(url):
+            tokens = tokenize(passage["text"])
+            overlap = sum(1 for token in tokens if token in terms)
+            if overlap:
+                scored.append((overlap / (1 + len(tokens)) ** 0.5, passage))
+        scored.sort(key=lambda item: (-item[0], item[1]["seq"]))
+        return [passage for _, passage in scored[:limit]]
+
+    def stats(self) -> Dict:
+        """Stored pages, chunk references and unique compressed bytes"""
+        pages, chunks = self.conn.execute("SELECT COUNT(DISTINCT url), COUNT(*) FROM chunks").fetchone()
+        unique, stored = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM chunk_text").fetchone()
+        boilerplate = self.conn.execute("SELECT COUNT(*) FROM block_pages WHERE pages >= ?",
+                                        (self.boilerplate_pages,)).fetchone()[0]
+        return {
+            "pages": pages,
+            "chunks": chunks,
+            "unique_chunks": unique,
+            "compressed_bytes": stored,
+            "boilerplate_blocks": boilerplate,
+        }
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
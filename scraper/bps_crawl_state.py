@@ -0,0 +1,197 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from datetime import datetime
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+
+
+_VOLATILE_BLOCKS_RE = re.compile(r'<(script|style|noscript)\b.*?</\1>', re.IGNORECASE | re.DOTALL)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def content_fingerprint(page_source: str) -> str:
+    """Hash of the page markup without scripts, styles and whitespace noise"""
+    stable = _VOLATILE_BLOCKS_RE.sub('', page_source or '')
+    stable = _WHITESPACE_RE.sub(' ', stable).strip()
+    return hashlib.sha1(stable.encode('utf-8')).hexdigest()
+
+
+class CrawlStateStore:
+    """Persistent crawl state: frontier queue, seen set and per-URL fetch metadata"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS frontier (
+            url TEXT PRIMARY KEY,
+            depth INTEGER NOT NULL,
+            added_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS seen (
+            url TEXT PRIMARY KEY
+        );
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,
+            fetched_at TEXT NOT NULL,
+            record TEXT NOT NULL,
+            links TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS emitted (
+            url TEXT PRIMARY KEY
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, db_path: str = "crawl_state.db"):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self.conn.commit()
+
+    def _run_status(self) -> Optional[str]:
+        """Status of the last run: "running" (or interrupted), "completed", or None before the first"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'run_status'").fetchone()
+        return row[0] if row else None
+
+    def _set_run_status(self, status: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('run_status', ?)", (status,))
+
+    def begin_run(self) -> bool:
+        """Start a crawl run; returns True when resuming one that was interrupted.
+
+        A run that finished (even if its page budget left URLs queued)
+        is followed by a fresh one, which starts from the homepage again
+        and re-checks stored pages.
+        """
+        pending = self.conn.execute("SELECT COUNT(*) FROM frontier").fetchone()[0]
+        if pending and self._run_status() != "completed":
+            with self.conn:
+                # The run's output starts over, so nothing counts as written yet
+                self.conn.execute("DELETE FROM emitted")
+                self._set_run_status("running")
+            return True
+
+        # Fresh run: forget what was seen and queued last time so changed pages get revisited
+        with self.conn:
+            self.conn.execute("DELETE FROM seen")
+            self.conn.execute("DELETE FROM frontier")
+            self.conn.execute("DELETE FROM emitted")
+            self._set_run_status("running")
+        return False
+
+    def finish_run(self):
+        """Mark the current run as completed; the next one starts fresh"""
+        with self.conn:
+            self._set_run_status("completed")
+
+    def enqueue(self, urls: Iterable[str], depth: int):
+        """Add URLs to the frontier and the seen set"""
+        now = time.time()
+        rows = [(url, depth, now) for url in urls]
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO frontier (url, depth, added_at) VALUES (?, ?, ?)", rows)
+            self.conn.executemany("INSERT OR IGNORE INTO seen (url) VALUES (?)", [(row[0],) for row in rows])
+
+    def mark_seen(self, urls: Iterable[str]):
+        """Record URLs as discovered without queueing them"""
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO seen (url) VALUES (?)", [(url,) for url in urls])
+
+    def pending(self, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Queued (url, depth) pairs in insertion order"""
+        query = "SELECT url, depth FROM frontier ORDER BY rowid"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        return [(url, depth) for url, depth in self.conn.execute(query)]
+
+    def complete(self, url: str):
+        """Remove a URL from the frontier once it has been handled"""
+        with self.conn:
+            self.conn.execute("DELETE FROM frontier WHERE url = ?", (url,))
+
+    def seen_urls(self) -> Iterator[str]:
+        """Every URL discovered in the current run, read lazily"""
+        for row in self.conn.execute("SELECT url FROM seen"):
+            yield row[0]
+
+    def page(self, url: str) -> Optional[Dict]:
+        """Stored fetch metadata and record for a URL"""
+        row = self.conn.execute(
+            "SELECT etag, last_modified, content_hash, fetched_at, record, links FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        if not row:
+            return None
+        etag, last_modified, content_hash, fetched_at, record, links = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": content_hash,
+            "fetched_at": fetched_at,
+            "record": json.loads(record),
+            "links": json.loads(links),
+        }
+
+    def fetch_ages(self, urls: List[str]) -> Dict[str, float]:
+        """Seconds since each stored URL was last fetched; unknown URLs are left out"""
+        now = time.time()
+        ages = {}
+        for start in range(0, len(urls), 500):
+            batch = urls[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            for url, fetched_at in self.conn.execute(
+                    f"SELECT url, fetched_at FROM pages WHERE url IN ({placeholders})", batch):
+                ages[url] = now - datetime.fromisoformat(fetched_at).timestamp()
+        return ages
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a re-fetch"""
+        row = self.conn.execute("SELECT etag, last_modified FROM pages WHERE url = ?", (url,)).fetchone()
+        headers = {}
+        if row and row[0]:
+            headers["If-None-Match"] = row[0]
+        if row and row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def save_page(self, url: str, record: Dict, links: List[str], content_hash: Optional[str],
+                  etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Store (or replace) the processed record for a URL"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, content_hash, fetched_at, record, links) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_hash, datetime.now().isoformat(),
+                 json.dumps(record, ensure_ascii=False), json.dumps(links)),
+            )
+
+    def update_record(self, url: str, record: Dict):
+        """Replace the stored record of a URL, keeping its fetch metadata"""
+        with self.conn:
+            self.conn.execute("UPDATE pages SET record = ? WHERE url = ?",
+                              (json.dumps(record, ensure_ascii=False), url))
+
+    def mark_emitted(self, url: str):
+        """Note that this run's output already holds the record of a URL"""
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO emitted (url) VALUES (?)", (url,))
+
+    def emitted(self, url: str) -> bool:
+        """Whether this run's output already holds the record of a URL"""
+        return self.conn.execute("SELECT 1 FROM emitted WHERE url = ?", (url,)).fetchone() is not None
+
+    def records(self) -> Iterator[Dict]:
+        """All stored page records, across runs, read lazily"""
+        for row in self.conn.execute("SELECT record FROM pages ORDER BY rowid"):
+            yield json.loads(row[0])
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
@@ -0,0 +1,83 @@
+import hashlib
+from typing import Dict, List, Optional
+
+from bps_search import tokenize
+
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+
+# Pages whose fingerprints differ in at most this many bits are near-duplicates.
+# With MAX_DISTANCE + 1 bands, two such fingerprints always agree on a whole band.
+MAX_DISTANCE = 3
+BANDS = MAX_DISTANCE + 1
+
+# Too little text to fingerprint reliably (e.g. a bare listing page)
+MIN_SHINGLES = 8
+
+_BAND_BITS = FINGERPRINT_BITS // BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+
+def _shingle_hash(shingle: str) -> int:
+    """64-bit hash of one shingle"""
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash over word 3-shingles, or None for too little text"""
+    tokens = tokenize(text)
+    shingles = {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(max(0, len(tokens) - SHINGLE_SIZE + 1))}
+    if len(shingles) < MIN_SHINGLES:
+        return None
+
+    weights = [0] * FINGERPRINT_BITS
+    for shingle in shingles:
+        value = _shingle_hash(shingle)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits"""
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateIndex:
+    """SimHash fingerprints of canonical pages, bucketed by band for sub-linear lookup"""
+
+    def __init__(self, max_distance: int = MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.fingerprints: Dict[str, int] = {}
+        self._buckets: List[Dict[int, List[str]]] = [{} for _ in range(BANDS)]
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    @staticmethod
+    def _bands(fingerprint: int):
+        return [(fingerprint >> (band * _BAND_BITS)) & _BAND_MASK for band in range(BANDS)]
+
+    def find(self, fingerprint: int) -> Optional[str]:
+        """URL of an indexed page within max_distance bits, if any"""
+        best_url, best_distance = None, self.max_distance + 1
+        for band, key in enumerate(self._bands(fingerprint)):
+            for url in self._buckets[band].get(key, ()):
+                distance = hamming_distance(fingerprint, self.fingerprints[url])
+                if distance < best_distance:
+                    best_url, best_distance = url, distance
+        return best_url
+
+    def add(self, url: str, fingerprint: int):
+        """Index a canonical page"""
+        if url in self.fingerprints:
+            return
+        self.fingerprints[url] = fingerprint
+        for band, key in enumerate(self._bands(fingerprint)):
+            self._buckets[band].setdefault(key, []).append(url)
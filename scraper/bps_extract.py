@@ -0,0 +1,189 @@
+import re
+from typing import Callable, List, Dict, Optional, Tuple
+
+import lxml.html
+from lxml import etree
+
+
+NO_DESCRIPTION = "No description available"
+
+_HEADER_TAGS = ("h1", "h2", "h3")
+
+# Structural page chrome whose text never belongs to the body content
+_CHROME_TAGS = frozenset(["nav", "header", "footer", "aside", "form", "script", "style", "noscript", "select"])
+_TEXT_BLOCK_TAGS = frozenset(["p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "caption", "blockquote", "dd", "dt"])
+_NESTED_BLOCK_XPATH = ".//p|.//ul|.//ol|.//table"
+_HEADER_WORD_RE = re.compile(r'\b[a-zA-Z]{3,}\b')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_PARSER = lxml.html.HTMLParser(encoding='utf-8', remove_comments=True)
+
+
+def _clean_text(text: str) -> str:
+    """Collapse whitespace runs"""
+    return _WHITESPACE_RE.sub(' ', text or '').strip()
+
+
+def parse_html(page_source: str):
+    """Parse page markup once with the lxml HTML parser"""
+    if not page_source:
+        return None
+    try:
+        return lxml.html.fromstring(page_source.encode('utf-8'), parser=_PARSER)
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def extract_page(page_source: str, is_valid_link: Optional[Callable[[str], bool]] = None) -> Dict:
+    """Parse page markup and extract its metadata, links and body text blocks"""
+    return extract_tree(parse_html(page_source), is_valid_link)
+
+
+def extract_tree(root, is_valid_link: Optional[Callable[[str], bool]] = None) -> Dict:
+    """Extract title, description, keywords, links, body text blocks and tables in one tree walk"""
+    result = {
+        "title": "",
+        "description": NO_DESCRIPTION,
+        "keywords": [],
+        "links": [],
+        "blocks": [],
+        "tables": [],
+    }
+
+    if root is None:
+        return result
+
+    meta_description = None
+    meta_keywords = None
+    first_paragraph = None
+    headers: List[str] = []
+    links: List[str] = []
+    blocks: List[Tuple[str, str]] = []
+    tables: List[Dict] = []
+    chrome = set()
+
+    for element in root.iter():
+        tag = element.tag
+        if not isinstance(tag, str):
+            continue
+
+        # Body text blocks (paragraphs, list items, table rows) outside the page chrome
+        if tag in _CHROME_TAGS:
+            chrome.add(element)
+        elif tag in _TEXT_BLOCK_TAGS or tag == "tr":
+            if not _inside(element, chrome):
+                block = _block_text(element, tag)
+                if block:
+                    blocks.append(("table" if tag == "tr" else "text", block))
+        if tag == "table" and not _inside(element, chrome):
+            tables.append(_table_grid(element))
+
+        if tag == "a":
+            href = element.get("href")
+            if href and (is_valid_link is None or is_valid_link(href)):
+                links.append(href)
+        elif tag == "meta":
+            name = (element.get("name") or "").lower()
+            if name == "description" and meta_description is None:
+                meta_description = element.get("content")
+            elif name == "keywords" and meta_keywords is None:
+                meta_keywords = element.get("content")
+        elif tag == "p":
+            if first_paragraph is None:
+                first_paragraph = _clean_text(element.text_content())
+        elif tag in _HEADER_TAGS:
+            if len(headers) < 3:
+                headers.append(_clean_text(element.text_content()).lower())
+        elif tag == "title":
+            if not result["title"]:
+                result["title"] = _clean_text(element.text_content())
+
+    # Description: meta description, else the first paragraph
+    if meta_description and meta_description.strip():
+        result["description"] = meta_description.strip()
+    elif first_paragraph is not None:
+        result["description"] = first_paragraph[:200] + "..." if len(first_paragraph) > 200 else first_paragraph
+
+    # Keywords: meta keywords plus the first words of the leading headers
+    keywords = []
+    if meta_keywords:
+        keywords.extend([k.strip() for k in meta_keywords.split(',')][:5])
+    for header in headers:
+        keywords.extend(_HEADER_WORD_RE.findall(header)[:2])
+    result["keywords"] = [k for k in dict.fromkeys(keywords) if k][:10]
+
+    result["links"] = links
+    result["blocks"] = blocks
+    result["tables"] = [table for table in tables if table["rows"]]
+    return result
+
+
+def _inside(element, containers) -> bool:
+    """Whether any ancestor of the element is one of the given containers"""
+    if not containers:
+        return False
+    for ancestor in element.iterancestors():
+        if ancestor in containers:
+            return True
+    return False
+
+
+def _block_text(element, tag: str) -> str:
+    """Text of one body block; table rows become ' | '-separated cells"""
+    if tag == "tr":
+        cells = [_clean_text(cell.text_content()) for cell in element if cell.tag in ("td", "th")]
+        return " | ".join(cells) if any(cells) else ""
+    if tag == "li" and element.xpath(_NESTED_BLOCK_XPATH):
+        # The nested blocks are emitted on their own
+        return _clean_text(element.text or "")
+    return _clean_text(element.text_content())
+
+
+def _span(cell, attribute: str) -> int:
+    """rowspan/colspan of a cell, clamped to a sane range"""
+    try:
+        return min(max(int(cell.get(attribute) or 1), 1), 100)
+    except ValueError:
+        return 1
+
+
+def _table_grid(table) -> Dict:
+    """Cell texts of a table with row and column spans filled in, plus the number of leading header rows"""
+    rows: List[List[str]] = []
+    header_rows = 0
+    spans: Dict[int, Tuple[int, str]] = {}
+
+    def take_span(column: int, row: List[str]) -> int:
+        left, text = spans.pop(column)
+        row.append(text)
+        if left > 1:
+            spans[column] = (left - 1, text)
+        return column + 1
+
+    for tr in table.iter("tr"):
+        if next(tr.iterancestors("table"), None) is not table:
+            continue  # row of a nested table
+        cells = [cell for cell in tr if cell.tag in ("td", "th")]
+        row: List[str] = []
+        column = 0
+        for cell in cells:
+            while column in spans:
+                column = take_span(column, row)
+            text = _clean_text(cell.text_content())
+            rowspan = _span(cell, "rowspan")
+            for _ in range(_span(cell, "colspan")):
+                row.append(text)
+                if rowspan > 1:
+                    spans[column] = (rowspan - 1, text)
+                column += 1
+        while column in spans:
+            column = take_span(column, row)
+
+        if not any(row):
+            continue
+        is_header = tr.getparent().tag == "thead" or all(cell.tag == "th" for cell in cells)
+        if is_header and header_rows == len(rows):
+            header_rows += 1
+        rows.append(row)
+
+    return {"header_rows": header_rows, "rows": rows}
@@ -0,0 +1,180 @@
+import html
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from bps_politeness import HostRateScheduler, parse_retry_after
+
+
+# Markers of an anti-bot interstitial instead of real page content
+BLOCKING_INDICATORS = [
+    'just a moment',
+    'checking your browser',
+    'please wait',
+    'cloudflare'
+]
+
+BLOCKING_STATUS_CODES = {403, 429, 503}
+
+# Answers a browser would get too, so there is no point retrying them in Chrome
+DEFINITIVE_FAILURE_CODES = {404, 410}
+
+MIN_CONTENT_LENGTH = 1000
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+_TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+
+
+def is_blocked_page(page_source: str) -> bool:
+    """Check page content for anti-bot challenge markers"""
+    page_lower = page_source.lower()
+    return any(indicator in page_lower for indicator in BLOCKING_INDICATORS)
+
+
+class HttpFetcher:
+    """Pooled, concurrent plain-HTTP fetcher with a per-host concurrency limit"""
+
+    def __init__(self, max_workers: int = 8, per_host_limit: int = 4, timeout: int = 20,
+                 user_agent: str = DEFAULT_USER_AGENT, scheduler: Optional[HostRateScheduler] = None):
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.scheduler = scheduler
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": user_agent,
+            "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "id-ID,id;q=0.9,en;q=0.8",
+        })
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._host_slots: Dict[str, threading.Semaphore] = {}
+        self._host_lock = threading.Lock()
+
+    def _host_slot(self, url: str) -> threading.Semaphore:
+        """Semaphore limiting concurrent requests to the URL's host"""
+        host = urlparse(url).netloc
+        with self._host_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.Semaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> Dict:
+        """Fetch one URL at the pace the scheduler allows; 'ok' is False when the page needs a real browser"""
+        if not self.scheduler:
+            return self._fetch(url, headers)
+
+        waited = self.scheduler.acquire(url)
+        result = self._fetch(url, headers)
+        result["delay"] = waited
+        self.scheduler.record(url, result["elapsed"], status=result["status"], blocked=result["blocked"],
+                              failed=result["status"] is None, retry_after=result["retry_after"])
+        return result
+
+    def fetch_text(self, url: str) -> Optional[str]:
+        """Plain GET outside the scheduler (robots.txt); None on any failure"""
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException:
+            return None
+        return response.text if response.status_code == 200 else None
+
+    def _fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> Dict:
+        """One GET request, classified into the fetch result fields"""
+        result = {
+            "url": url,
+            "final_url": url,
+            "status": None,
+            "title": "",
+            "source": "",
+            "ok": False,
+            "blocked": False,
+            "not_modified": False,
+            "needs_browser": True,
+            "etag": None,
+            "last_modified": None,
+            "error": None,
+            "retry_after": None,
+            "delay": 0.0,
+            "elapsed": 0.0,
+        }
+
+        start_time = time.time()
+        try:
+            with self._host_slot(url):
+                response = self.session.get(url, headers=headers, timeout=self.timeout, allow_redirects=True)
+        except requests.RequestException as e:
+            result["error"] = str(e)
+            result["elapsed"] = time.time() - start_time
+            return result
+
+        result["elapsed"] = time.time() - start_time
+        result["status"] = response.status_code
+        result["final_url"] = response.url
+        result["etag"] = response.headers.get("ETag")
+        result["last_modified"] = response.headers.get("Last-Modified")
+        result["retry_after"] = parse_retry_after(response.headers.get("Retry-After"))
+
+        if response.status_code == 304:
+            result["not_modified"] = True
+            result["needs_browser"] = False
+            return result
+
+        if response.status_code in DEFINITIVE_FAILURE_CODES:
+            result["error"] = f"HTTP {response.status_code}"
+            result["needs_browser"] = False
+            return result
+
+        content_type = response.headers.get("Content-Type", "")
+        if "html" not in content_type.lower() and response.status_code < 400:
+            result["error"] = f"unsupported content type: {content_type or 'unknown'}"
+            result["needs_browser"] = False
+            return result
+
+        page_source = response.text
+        result["source"] = page_source
+
+        if response.status_code in BLOCKING_STATUS_CODES or is_blocked_page(page_source):
+            result["blocked"] = True
+            return result
+
+        if response.status_code >= 400:
+            result["error"] = f"HTTP {response.status_code}"
+            return result
+
+        if len(page_source) < MIN_CONTENT_LENGTH:
+            result["error"] = "content too short"
+            return result
+
+        title_match = _TITLE_RE.search(page_source)
+        if title_match:
+            result["title"] = html.unescape(title_match.group(1)).strip()
+
+        result["ok"] = True
+        result["needs_browser"] = False
+        return result
+
+    def fetch_many(self, urls: Iterable[str], headers: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, Dict]:
+        """Fetch several URLs concurrently, keyed by requested URL; headers are per URL"""
+        urls: List[str] = list(dict.fromkeys(urls))
+        headers = headers or {}
+        futures = [self._executor.submit(self.fetch, url, headers.get(url)) for url in urls]
+        return {url: future.result() for url, future in zip(urls, futures)}
+
+    def close(self):
+        """Release worker threads and pooled connections"""
+        self._executor.shutdown(wait=True)
+        self.session.close()
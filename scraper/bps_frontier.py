@@ -0,0 +1,102 @@
+import heapq
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+# How much a page of each type is worth to the chatbot's index
+SECTION_VALUES = {
+    "statistics_table": 5,
+    "publication": 4,
+    "news": 4,
+    "statistics_subject": 3,
+    "statistics_data": 2,
+    "general": 1,
+}
+
+SECTION_WEIGHT = 10.0
+DEPTH_PENALTY = 3.0
+FRESHNESS_WEIGHT = 5.0
+NOVELTY_WEIGHT = 3.0
+
+# A stored page reaches full freshness priority again after this many seconds
+REFRESH_INTERVAL = 7 * 24 * 3600
+
+_DIGITS_RE = re.compile(r'\d+')
+
+
+def url_template(url: str) -> str:
+    """Path with every number collapsed, e.g. /statictable/2024/01/15/# -> one template"""
+    return _DIGITS_RE.sub('#', urlsplit(url).path.lower())
+
+
+class PriorityFrontier:
+    """Crawl frontier ordered by estimated page value instead of discovery order.
+
+    score = section value (statictable/publication/pressrelease over general)
+            - depth penalty
+            + freshness (never fetched, or fetched long ago)
+            + novelty (URL templates not seen many times already)
+    """
+
+    def __init__(self, classify: Callable[[str], str],
+                 ages: Optional[Callable[[List[str]], Dict[str, float]]] = None, max_size: int = 50000):
+        self.classify = classify
+        self.ages = ages
+        self.max_size = max_size
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._queued = set()
+        self._template_counts: Dict[str, int] = {}
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._queued
+
+    def score(self, url: str, depth: int, age: Optional[float] = None) -> float:
+        """Priority of a URL; higher is crawled first"""
+        section = SECTION_VALUES.get(self.classify(url), 1)
+        freshness = 1.0 if age is None else min(1.0, age / REFRESH_INTERVAL)
+        novelty = 1.0 / (1 + self._template_counts.get(url_template(url), 0))
+        return (SECTION_WEIGHT * section - DEPTH_PENALTY * depth
+                + FRESHNESS_WEIGHT * freshness + NOVELTY_WEIGHT * novelty)
+
+    def push_many(self, urls: Iterable[str], depth: int) -> List[str]:
+        """Queue URLs at a depth; returns the ones that were not queued already"""
+        urls = [url for url in dict.fromkeys(urls) if url not in self._queued]
+        ages = self.ages(urls) if self.ages and urls else {}
+        for url in urls:
+            score = self.score(url, depth, ages.get(url))
+            template = url_template(url)
+            self._template_counts[template] = self._template_counts.get(template, 0) + 1
+            self._sequence += 1
+            heapq.heappush(self._heap, (-score, self._sequence, url, depth))
+            self._queued.add(url)
+
+        if len(self._heap) > 2 * self.max_size:
+            # Keep the best max_size entries; the rest would never fit the page budget anyway
+            self._heap = heapq.nsmallest(self.max_size, self._heap)
+            heapq.heapify(self._heap)
+            self._queued = {entry[2] for entry in self._heap}
+        return urls
+
+    def push(self, url: str, depth: int) -> bool:
+        """Queue one URL"""
+        return bool(self.push_many([url], depth))
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """Highest-priority (url, depth), or None when empty"""
+        if not self._heap:
+            return None
+        _, _, url, depth = heapq.heappop(self._heap)
+        self._queued.discard(url)
+        return url, depth
+
+    def pop_many(self, count: int) -> List[Tuple[str, int]]:
+        """Up to `count` highest-priority (url, depth) pairs"""
+        batch = []
+        while len(batch) < count and self._heap:
+            batch.append(self.pop())
+        return batch
@@ -0,0 +1,140 @@
+import json
+import os
+from typing import Dict, Iterator, List, Optional
+
+from bps_publish import publish_file
+
+
+# NDJSON index layout: one {"header": {...}} line, one compact page record per
+# line, one {"alias": {"url": ..., "aliases": [...]}} line per page that URL
+# variants were folded into, and a closing {"footer": {...}} line with the
+# run statistics.
+HEADER_KEY = "header"
+ALIAS_KEY = "alias"
+FOOTER_KEY = "footer"
+
+_TAIL_BYTES = 64 * 1024
+
+
+def ndjson_path_for(output_file: str) -> str:
+    """NDJSON sibling of a .json index path"""
+    root, _ = os.path.splitext(output_file)
+    return root + ".ndjson"
+
+
+def partial_path_for(path: str) -> str:
+    """Where an NDJSON index is written until its run completes"""
+    return path + ".partial"
+
+
+class NdjsonIndexWriter:
+    """Appends page records to an NDJSON index as they are produced.
+
+    Records stream into `<path>.partial`, which NdjsonIndexReader can follow
+    while the crawl runs; a completed run renames it over `path` in one
+    step, so readers of the index never see a half-written crawl.
+    """
+
+    def __init__(self, path: str, header: Dict):
+        self.path = path
+        self.partial_path = partial_path_for(path)
+        self.record_count = 0
+        self._file = open(self.partial_path, 'w', encoding='utf-8')
+        self._write_line({HEADER_KEY: header})
+
+    def _write_line(self, obj: Dict):
+        """Write one compact JSON line and flush it so readers see it immediately"""
+        self._file.write(json.dumps(obj, ensure_ascii=False, separators=(',', ':')) + "\n")
+        self._file.flush()
+
+    def write(self, record: Dict):
+        """Append one page record"""
+        self._write_line(record)
+        self.record_count += 1
+
+    def write_aliases(self, url: str, aliases: List[str]):
+        """Append the URL variants folded into a page, kept out of the footer so it stays small"""
+        self._write_line({ALIAS_KEY: {"url": url, "aliases": aliases}})
+
+    @property
+    def closed(self) -> bool:
+        """Whether the footer has been written"""
+        return self._file.closed
+
+    def close(self, footer: Dict, publish: bool = True):
+        """Write the run statistics footer and close the file.
+
+        With publish the finished file replaces the index; otherwise (a
+        failed run) it stays at the partial path and the old index is kept.
+        """
+        if self._file.closed:
+            return
+        footer = dict(footer, total_urls=self.record_count)
+        self._write_line({FOOTER_KEY: footer})
+        self._file.close()
+        if publish:
+            publish_file(self.partial_path, self.path)
+
+
+class NdjsonIndexReader:
+    """Lazy reader for NDJSON indexes; safe to use while the crawl is still writing"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @property
+    def header(self) -> Optional[Dict]:
+        """Run header (first line)"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            first = f.readline()
+        try:
+            return json.loads(first).get(HEADER_KEY)
+        except (json.JSONDecodeError, AttributeError):
+            return None
+
+    @property
+    def footer(self) -> Optional[Dict]:
+        """Run statistics (last line), or None while the crawl is still running"""
+        try:
+            last = json.loads(self._last_line())
+        except json.JSONDecodeError:
+            return None
+        return last.get(FOOTER_KEY) if isinstance(last, dict) else None
+
+    def _last_line(self) -> str:
+        """The last non-blank line, read backwards from the end in blocks so it is whole whatever its size"""
+        with open(self.path, 'rb') as f:
+            position = f.seek(0, os.SEEK_END)
+            tail = b""
+            while position > 0:
+                step = min(_TAIL_BYTES, position)
+                position -= step
+                f.seek(position)
+                tail = f.read(step) + tail
+                content = tail.rstrip()
+                if b"\n" in content:
+                    return content.rsplit(b"\n", 1)[1].decode('utf-8', errors='ignore')
+            return tail.strip().decode('utf-8', errors='ignore')
+
+    def _objects(self) -> Iterator[Dict]:
+        """Every complete JSON object line, stopping at a torn last line"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                try:
+                    obj = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(obj, dict):
+                    yield obj
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Yield page records one at a time, skipping header, alias and footer lines"""
+        for obj in self._objects():
+            if HEADER_KEY not in obj and ALIAS_KEY not in obj and FOOTER_KEY not in obj:
+                yield obj
+
+    def aliases(self) -> Dict[str, List[str]]:
+        """URL variants folded into each page, url -> aliases"""
+        return {obj[ALIAS_KEY]["url"]: obj[ALIAS_KEY]["aliases"] for obj in self._objects() if ALIAS_KEY in obj}
@@ -0,0 +1,168 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+
+# Statuses that mean "slow down" rather than "this page is broken"
+THROTTLE_STATUS_CODES = {429, 503}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _HostState:
+    """Token bucket and backoff bookkeeping for one host"""
+
+    __slots__ = ("rate", "max_rate", "tokens", "updated_at", "backoff_until", "failures",
+                 "slow_start", "crawl_delay", "robots_checked", "requests", "backoffs")
+
+    def __init__(self, rate: float, max_rate: float):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.tokens = 1.0
+        self.updated_at = time.monotonic()
+        self.backoff_until = 0.0
+        self.failures = 0
+        self.slow_start = True
+        self.crawl_delay = None
+        self.robots_checked = False
+        self.requests = 0
+        self.backoffs = 0
+
+
+class HostRateScheduler:
+    """Per-host token buckets whose rate follows how the server is responding.
+
+    Fast, unblocked responses raise a host's rate (doubling-style slow start
+    until the first trouble, then additive); challenge pages, timeouts and
+    429/503 answers cut it in half and open an exponential, jittered backoff
+    window. Retry-After and robots.txt Crawl-delay cap it from the outside.
+    """
+
+    def __init__(self, initial_rate: float = 0.125, max_rate: float = 2.0, min_rate: float = 1 / 60,
+                 burst: float = 1.0, slow_response: float = 5.0, backoff_base: float = 2.0,
+                 backoff_max: float = 300.0, robots_fetcher: Optional[Callable[[str], Optional[str]]] = None,
+                 user_agent: str = "*"):
+        self.initial_rate = initial_rate
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, initial_rate)
+        self.burst = burst
+        self.slow_response = slow_response
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.robots_fetcher = robots_fetcher
+        self.user_agent = user_agent
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+        self._robots_lock = threading.Lock()
+
+    def _host(self, url: str) -> _HostState:
+        """State for the URL's host, created on first use (caller holds the lock)"""
+        host = urlsplit(url).netloc
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.initial_rate, self.max_rate)
+        return state
+
+    def _check_robots(self, url: str, state: _HostState):
+        """Apply the host's robots.txt Crawl-delay once"""
+        with self._robots_lock:
+            if state.robots_checked:
+                return
+            state.robots_checked = True
+            if not self.robots_fetcher:
+                return
+            parts = urlsplit(url)
+            text = self.robots_fetcher(f"{parts.scheme}://{parts.netloc}/robots.txt")
+            if not text:
+                return
+            parser = RobotFileParser()
+            parser.parse(text.splitlines())
+            parser.modified()
+            delay = parser.crawl_delay(self.user_agent)
+            if delay:
+                with self._lock:
+                    state.crawl_delay = float(delay)
+                    state.max_rate = min(state.max_rate, 1.0 / float(delay))
+                    state.rate = min(state.rate, state.max_rate)
+
+    def acquire(self, url: str) -> float:
+        """Block until a request to the URL's host is allowed; returns seconds waited"""
+        with self._lock:
+            state = self._host(url)
+        if not state.robots_checked:
+            self._check_robots(url, state)
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                state.tokens = min(self.burst, state.tokens + (now - state.updated_at) * state.rate)
+                state.updated_at = now
+                delay = max(state.backoff_until - now, 0.0)
+                if delay == 0.0 and state.tokens >= 1.0:
+                    state.tokens -= 1.0
+                    state.requests += 1
+                    return waited
+                if delay == 0.0:
+                    delay = (1.0 - state.tokens) / state.rate
+            time.sleep(delay)
+            waited += delay
+
+    def record(self, url: str, elapsed: float, status: Optional[int] = None, blocked: bool = False,
+               failed: bool = False, retry_after: Optional[float] = None):
+        """Feed one response back into the host's rate"""
+        with self._lock:
+            state = self._host(url)
+            now = time.monotonic()
+            throttled = blocked or failed or status in THROTTLE_STATUS_CODES
+
+            if throttled:
+                state.failures += 1
+                state.slow_start = False
+                state.rate = max(self.min_rate, state.rate / 2)
+                cap = min(self.backoff_max, self.backoff_base * 2 ** state.failures)
+                state.backoff_until = max(state.backoff_until, now + random.uniform(cap / 2, cap))
+                state.backoffs += 1
+            elif elapsed > self.slow_response:
+                # The server is struggling: ease off without a full backoff
+                state.slow_start = False
+                state.rate = max(self.min_rate, state.rate * 0.8)
+            else:
+                state.failures = 0
+                if state.slow_start:
+                    state.rate = min(state.max_rate, state.rate * 1.25)
+                else:
+                    state.rate = min(state.max_rate, state.rate + self.initial_rate / 4)
+
+            if retry_after is not None:
+                state.backoff_until = max(state.backoff_until, now + min(retry_after, self.backoff_max))
+            state.tokens = min(state.tokens, self.burst)
+
+    def summary(self) -> Dict[str, Dict]:
+        """Current rate and backoff counters per host"""
+        with self._lock:
+            return {
+                host: {
+                    "requests": state.requests,
+                    "rate_per_sec": round(state.rate, 3),
+                    "max_rate_per_sec": round(state.max_rate, 3),
+                    "crawl_delay": state.crawl_delay,
+                    "backoffs": state.backoffs,
+                }
+                for host, state in self._hosts.items()
+            }
@@ -0,0 +1,154 @@
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Optional, Tuple
+
+from bps_politeness import HostRateScheduler
+from bps_profile import timed
+
+# Default Unix socket of the warm pool daemon (`browser-pool`)
+WARM_POOL_SOCKET = "browser_pool.sock"
+
+
+class ChromeWorkerPool:
+    """N undetected Chrome drivers loading pages in parallel for one scraper"""
+
+    def __init__(self, scraper, size: int, user_agents: List[str], scheduler: HostRateScheduler):
+        self.scraper = scraper
+        self.scheduler = scheduler
+        # Cookies are saved to the session of the scraper that started the drivers
+        self.session = scraper.session
+        self.drivers = []
+        self._idle: "queue.Queue" = queue.Queue()
+
+        # uc.Chrome patches the driver binary on startup, so create drivers one at a time;
+        # worker n keeps its user agent (and with a session, its profile) from run to run
+        for index in range(size):
+            user_agent = user_agents[index % len(user_agents)]
+            driver = scraper._create_driver(user_agent, index)
+            if driver is None:
+                continue
+            self.drivers.append(driver)
+            self._idle.put(driver)
+
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.drivers)))
+
+    @property
+    def size(self) -> int:
+        """Number of drivers that started successfully"""
+        return len(self.drivers)
+
+    def load(self, url: str, patience: int = 15) -> Optional[Dict]:
+        """Load a page on the next idle driver; returns a page snapshot or None"""
+        driver = self._idle.get()
+        timings: Dict[str, float] = {}
+        try:
+            with timed(timings, "delay"):
+                self.scheduler.acquire(url)
+            started_at = time.time()
+            source = self.scraper._load_page_with_patience(url, patience=patience, driver=driver, timings=timings)
+            # A challenge that never cleared or a timeout slows the whole host down
+            self.scheduler.record(url, time.time() - started_at, failed=source is None)
+            if source is None:
+                return None
+            with timed(timings, "source"):
+                page = self.scraper._current_page(driver, source=source)
+            page["load_time"] = round(time.time() - started_at, 3)
+            page["timings"] = timings
+            return page
+        finally:
+            self._idle.put(driver)
+
+    def load_many(self, urls: List[str], patience: int = 15) -> Dict[str, Optional[Dict]]:
+        """Load several pages across the pool, keyed by requested URL"""
+        futures: List[Tuple[str, object]] = [(url, self._executor.submit(self.load, url, patience)) for url in urls]
+        return {url: future.result() for url, future in futures}
+
+    def attach(self, scraper):
+        """Load pages for another scraper (the next job of a warm pool) from now on"""
+        self.scraper = scraper
+        self.scheduler = scraper.scheduler
+
+    def save_session(self):
+        """Write the drivers' cookies to the browser session, if there is one"""
+        if self.session and self.drivers:
+            self.session.save_cookies(self.drivers)
+
+    def close(self):
+        """Stop the worker threads, save the session cookies and quit every driver"""
+        self._executor.shutdown(wait=True)
+        try:
+            self.save_session()
+        except Exception:
+            pass
+        for driver in self.drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self.drivers = []
+
+
+def serve_warm_pool(pool: ChromeWorkerPool, socket_path: str, run_job: Callable[[ChromeWorkerPool, Dict], Dict]):
+    """Keep the pool's drivers alive and run scrape jobs sent as NDJSON over a Unix socket.
+
+    Jobs share the drivers, so they run one at a time; each request line
+    gets one response line once its job has finished.
+    """
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    job_lock = threading.Lock()
+    counters = {"jobs": 0, "started_at": time.time()}
+
+    def answer(line: str) -> Dict:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return {"id": None, "error": f"invalid json: {e}"}
+        if not isinstance(request, dict):
+            return {"id": None, "error": "request must be a JSON object"}
+
+        request_id = request.get("id")
+        try:
+            if request.get("command") == "stats":
+                return {"id": request_id, "drivers": pool.size, "jobs": counters["jobs"],
+                        "uptime": round(time.time() - counters["started_at"], 1)}
+            with job_lock:
+                result = run_job(pool, request)
+                counters["jobs"] += 1
+            return {"id": request_id, "result": {key: value for key, value in result.items() if key != "urls"}}
+        except Exception as e:
+            return {"id": request_id, "error": str(e)}
+
+    class _Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw_line in self.rfile:
+                if not raw_line.strip():
+                    continue
+                response = answer(raw_line.decode('utf-8'))
+                self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode('utf-8'))
+                self.wfile.flush()
+
+    class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    with _Server(socket_path, _Handler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+
+def submit_job(socket_path: str, job: Dict) -> Dict:
+    """Send one job (or command) to a warm pool daemon and wait for its response"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((json.dumps(job, ensure_ascii=False) + "\n").encode('utf-8'))
+        with client.makefile('r', encoding='utf-8') as reader:
+            return json.loads(reader.readline())
@@ -0,0 +1,90 @@
+import cProfile
+import math
+import random
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Dict
+
+
+# Per-page crawl stages, in pipeline order
+STAGES = ("delay", "load", "wait", "source", "parse", "extract", "chunks", "save")
+
+
+@contextmanager
+def timed(timings: Dict[str, float], stage: str):
+    """Add the wall time of the block to timings[stage] (seconds)"""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started_at
+
+
+def timings_ms(timings: Dict[str, float]) -> Dict[str, float]:
+    """Stage timings in milliseconds, in pipeline order, for a page record"""
+    return {stage: round(timings[stage] * 1000, 2) for stage in STAGES if stage in timings}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class StageHistogram:
+    """Run-wide per-page stage timings in bounded memory.
+
+    count, max and total are exact; the percentiles come from a uniform
+    reservoir sample of at most `max_samples` values per stage.
+    """
+
+    def __init__(self, max_samples: int = 10000):
+        self.max_samples = max_samples
+        self.samples: Dict[str, List[float]] = {}
+        self._totals: Dict[str, List[float]] = {}  # stage -> [count, max, total]
+        self._random = random.Random(0)
+
+    def add(self, page_timings_ms: Dict[str, float]):
+        """Record one page's stage timings (milliseconds)"""
+        for stage, value in page_timings_ms.items():
+            totals = self._totals.setdefault(stage, [0, value, 0.0])
+            totals[0] += 1
+            totals[1] = max(totals[1], value)
+            totals[2] += value
+            samples = self.samples.setdefault(stage, [])
+            if len(samples) < self.max_samples:
+                samples.append(value)
+            else:
+                slot = self._random.randrange(totals[0])
+                if slot < self.max_samples:
+                    samples[slot] = value
+
+    def summary(self) -> Dict[str, Dict]:
+        """count / p50 / p95 / max / total milliseconds per stage"""
+        summary = {}
+        for stage in STAGES:
+            values = sorted(self.samples.get(stage, []))
+            if not values:
+                continue
+            count, maximum, total = self._totals[stage]
+            summary[stage] = {
+                "count": count,
+                "p50": percentile(values, 0.50),
+                "p95": percentile(values, 0.95),
+                "max": maximum,
+                "total": round(total, 2),
+            }
+        return summary
+
+
+def run_profiled(func: Callable, stats_file: str, *args, **kwargs):
+    """Run func under cProfile and dump the stats to stats_file (readable with pstats)"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(stats_file)
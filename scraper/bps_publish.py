@@ -0,0 +1,80 @@
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict
+
+
+def generation_path_for(output_file: str) -> str:
+    """Path of the generation marker next to an index path"""
+    return os.path.splitext(output_file)[0] + ".generation"
+
+
+def fsync_directory(path: str):
+    """Make a rename inside the file's directory durable (a no-op where directories cannot be opened)"""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def publish_file(tmp_path: str, path: str):
+    """Flush a finished temporary file to disk and rename it over the target in one step"""
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_directory(path)
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = 'w'):
+    """Write a file so readers only ever see the old or the complete new version.
+
+    Writes go to a temporary file in the same directory, which is fsynced and
+    renamed over `path` when the block exits cleanly and removed otherwise.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    f = open(tmp_path, mode, encoding=None if 'b' in mode else 'utf-8')
+    try:
+        yield f
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        os.replace(tmp_path, path)
+        fsync_directory(path)
+    except BaseException:
+        f.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_generation(output_file: str) -> Dict:
+    """Current generation marker of an index ({"generation": 0} before the first publication)"""
+    try:
+        with open(generation_path_for(output_file), 'r', encoding='utf-8') as f:
+            marker = json.load(f)
+        if isinstance(marker, dict) and isinstance(marker.get("generation"), int):
+            return marker
+    except (OSError, ValueError):
+        pass
+    return {"generation": 0}
+
+
+def next_generation(output_file: str) -> int:
+    """Number the next publication of an index will carry"""
+    return read_generation(output_file)["generation"] + 1
+
+
+def publish_generation(output_file: str, generation: int, **info) -> Dict:
+    """Announce a new generation once every file of it is in place; query engines swap to it"""
+    marker = dict(info, generation=generation, published_at=datetime.now().isoformat())
+    with atomic_open(generation_path_for(output_file)) as f:
+        json.dump(marker, f)
+    return marker
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Dict, Deque, Optional, Tuple
+from urllib.parse import urlparse
+
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from bps_fetch import is_blocked_page, MIN_CONTENT_LENGTH
+
+
+# A condition looks at the driver and the page source captured for this poll
+ReadinessCondition = Callable[[object, str], bool]
+
+# URL sections that get their own learned timeout
+KNOWN_SECTIONS = ("/subject", "/publication", "/statictable", "/pressrelease", "/news")
+
+
+def document_ready(driver, page_source: str) -> bool:
+    """document.readyState has reached 'complete'"""
+    try:
+        return driver.execute_script("return document.readyState") == "complete"
+    except WebDriverException:
+        return False
+
+
+def no_challenge(driver, page_source: str) -> bool:
+    """No anti-bot challenge markers in the page"""
+    return not is_blocked_page(page_source)
+
+
+def min_content_length(length: int = MIN_CONTENT_LENGTH) -> ReadinessCondition:
+    """Page source is at least `length` characters long"""
+    def condition(driver, page_source: str) -> bool:
+        return len(page_source) >= length
+    condition.__name__ = f"min_content_length({length})"
+    return condition
+
+
+DEFAULT_CONDITIONS: List[ReadinessCondition] = [document_ready, no_challenge, min_content_length()]
+
+
+def url_section(url: str) -> str:
+    """Map a URL to the site section its load times are learned under"""
+    path = urlparse(url).path.lower()
+    for section in KNOWN_SECTIONS:
+        if path.startswith(section):
+            return section
+    return "/"
+
+
+class PageReadinessWaiter:
+    """Waits until a loaded page satisfies every readiness condition"""
+
+    def __init__(self, conditions: Optional[List[ReadinessCondition]] = None, min_timeout: float = 5.0,
+                 headroom: float = 2.0, poll_frequency: float = 0.5, history_size: int = 20):
+        self.conditions = list(conditions) if conditions is not None else list(DEFAULT_CONDITIONS)
+        self.min_timeout = min_timeout
+        self.headroom = headroom
+        self.poll_frequency = poll_frequency
+        self.history_size = history_size
+        self.section_history: Dict[str, Deque[float]] = {}
+        # Per-section (loads, ready, total seconds), kept as running totals so memory does not grow per page
+        self.section_loads: Dict[str, Tuple[int, int, float]] = {}
+        # Pool workers wait and record concurrently
+        self._lock = threading.Lock()
+
+    def timeout_for(self, url: str, max_timeout: float) -> float:
+        """Learned timeout for the URL's section, capped at max_timeout"""
+        with self._lock:
+            history = self.section_history.get(url_section(url))
+            longest = max(history) if history else None
+        if longest is None:
+            return max_timeout
+        learned = longest * self.headroom
+        return min(max_timeout, max(self.min_timeout, learned))
+
+    def wait(self, driver, url: str, max_timeout: float, started_at: Optional[float] = None,
+             adaptive: bool = True) -> Dict:
+        """Block until the page is usable or the (adaptive) timeout expires"""
+        started_at = started_at if started_at is not None else time.time()
+        timeout = self.timeout_for(url, max_timeout) if adaptive else max_timeout
+        poll = {"condition": None, "source": None}
+
+        def all_conditions_met(drv) -> bool:
+            page_source = poll["source"] = drv.page_source
+            for condition in self.conditions:
+                if not condition(drv, page_source):
+                    poll["condition"] = getattr(condition, "__name__", repr(condition))
+                    return False
+            poll["condition"] = None
+            return True
+
+        try:
+            remaining = max(0.0, timeout - (time.time() - started_at))
+            WebDriverWait(driver, remaining, poll_frequency=self.poll_frequency).until(all_conditions_met)
+            ready = True
+        except TimeoutException:
+            ready = False
+
+        elapsed = time.time() - started_at
+        result = {
+            "url": url,
+            "section": url_section(url),
+            "ready": ready,
+            "elapsed": round(elapsed, 3),
+            "timeout": round(timeout, 3),
+            "failed_condition": poll["condition"],
+            # What the last poll saw; on a ready page the caller need not read the source again
+            "source": poll["source"],
+        }
+        self.record(result)
+        return result
+
+    def record(self, result: Dict):
+        """Remember how long a load took so later loads in its section adapt"""
+        with self._lock:
+            count, ready, total = self.section_loads.get(result["section"], (0, 0, 0.0))
+            self.section_loads[result["section"]] = (count + 1, ready + int(result["ready"]), total + result["elapsed"])
+            if result["ready"]:
+                history = self.section_history.setdefault(result["section"], deque(maxlen=self.history_size))
+                history.append(result["elapsed"])
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per-section load statistics"""
+        with self._lock:
+            section_loads = dict(self.section_loads)
+        return {
+            section: {"loads": count, "ready": ready, "avg_seconds": round(total / count, 3)}
+            for section, (count, ready, total) in section_loads.items()
+        }
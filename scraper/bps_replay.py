@@ -0,0 +1,188 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from bps_archive import ArchiveReader
+from bps_fetch import HttpFetcher
+
+
+# Interstitial served in place of a page when challenge injection is on
+CHALLENGE_PAGE = b"""<!DOCTYPE html>
+<html><head><title>Just a moment...</title></head>
+<body><h1>Checking your browser before accessing the website.</h1>
+<p>Please wait while we verify your browser. Cloudflare Ray ID: replay</p></body></html>"""
+
+
+def _archive_key(url: str) -> str:
+    """Host-independent lookup key: path plus query"""
+    parts = urlsplit(url)
+    return (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+
+class ReplayServer:
+    """Local HTTP stand-in for the BPS site, serving pages from a recorded archive"""
+
+    def __init__(self, archive_path: str, latency: Tuple[float, float] = (0.0, 0.0),
+                 challenge_rate: float = 0.0, seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        self.archive = ArchiveReader(archive_path)
+        self.latency = latency
+        self.challenge_rate = challenge_rate
+        self.stats = {"requests": 0, "served": 0, "challenges": 0, "not_found": 0}
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._challenged = set()
+        self._keys: Dict[str, str] = {_archive_key(url): url for url in self.archive.urls()}
+        self._hosts = {parts.netloc.encode('utf-8') for parts in map(urlsplit, self.archive.urls())}
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Origin the crawler should use instead of the live site"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        replay = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, headers, body = replay.respond(self.path)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return _Handler
+
+    def _should_challenge(self, key: str) -> bool:
+        """Challenge a URL's first request with probability challenge_rate"""
+        with self._lock:
+            if key in self._challenged or self.challenge_rate <= 0:
+                return False
+            self._challenged.add(key)
+            return self._random.random() < self.challenge_rate
+
+    def respond(self, path: str) -> Tuple[int, Dict[str, str], bytes]:
+        """Status, headers and body for a request path"""
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = self._random.uniform(*self.latency) if self.latency[1] > 0 else 0.0
+        if delay:
+            time.sleep(delay)
+
+        url = self._keys.get(path) or self._keys.get(path.rstrip("/") or "/")
+        if url is None:
+            with self._lock:
+                self.stats["not_found"] += 1
+            return 404, {"Content-Type": "text/html"}, b"<html><body>Not Found</body></html>"
+
+        if self._should_challenge(path):
+            with self._lock:
+                self.stats["challenges"] += 1
+            return 503, {"Content-Type": "text/html; charset=utf-8"}, CHALLENGE_PAGE
+
+        response = self.archive.get(url)
+        headers = {name: value for name, value in response["headers"].items()
+                   if name.lower() in ("content-type", "etag", "last-modified", "location")}
+        body = response["body"]
+        origin = self.base_url.encode('utf-8')
+        for host in self._hosts:
+            # Absolute links point back at the stand-in instead of the live site
+            for prefix in (b"https://", b"http://"):
+                body = body.replace(prefix + host, origin)
+            body = body.replace(b"//" + host, origin[len(b"http:"):])
+        if "Location" in headers:
+            headers["Location"] = self.base_url + _archive_key(headers["Location"])
+        with self._lock:
+            self.stats["served"] += 1
+        return response["status"], headers, body
+
+    def start(self) -> "ReplayServer":
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down and close the archive"""
+        self._server.shutdown()
+        self._server.server_close()
+        self.archive.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class ReplayBrowserPool:
+    """Stand-in for the Chrome worker pool when crawling a ReplayServer.
+
+    The replay server challenges only the first request for a URL, so a
+    second request gets the real page, the way Chrome clears a challenge on
+    the live site. Handed to the scraper as its browser pool, this keeps
+    replay runs with challenge injection deterministic and free of Chrome.
+    """
+
+    # Requests per page: the challenged one plus the one that gets through
+    ATTEMPTS = 2
+
+    def __init__(self, size: int = 1):
+        self.size = size
+        self.session = None
+        self._fetcher: Optional[HttpFetcher] = None
+        self._executor = ThreadPoolExecutor(max_workers=size)
+
+    def attach(self, scraper):
+        """Load pages at the pace of this scraper's scheduler from now on"""
+        if self._fetcher:
+            self._fetcher.close()
+        self._fetcher = HttpFetcher(max_workers=self.size, per_host_limit=self.size, scheduler=scraper.scheduler)
+
+    def load(self, url: str, patience: int = 15) -> Optional[Dict]:
+        """Load a page, getting past an injected challenge; returns a page snapshot or None"""
+        for _ in range(self.ATTEMPTS):
+            result = self._fetcher.fetch(url)
+            if result["ok"]:
+                return {
+                    "url": result["final_url"],
+                    "title": result["title"],
+                    "source": result["source"],
+                    "fetch_method": "replay_browser",
+                    "load_time": round(result["elapsed"], 3),
+                    "timings": {"delay": result["delay"], "load": result["elapsed"]},
+                }
+            if not result["blocked"]:
+                return None
+        return None
+
+    def load_many(self, urls: List[str], patience: int = 15) -> Dict[str, Optional[Dict]]:
+        """Load several pages concurrently, keyed by requested URL"""
+        futures = [(url, self._executor.submit(self.load, url, patience)) for url in urls]
+        return {url: future.result() for url, future in futures}
+
+    def save_session(self):
+        """Nothing to keep: there are no browser cookies in a replay"""
+
+    def close(self):
+        """Stop the worker threads and release the fetcher's connections"""
+        self._executor.shutdown(wait=True)
+        if self._fetcher:
+            self._fetcher.close()
+            self._fetcher = None
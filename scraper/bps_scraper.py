@@ -4,23 +4,99 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 from bs4 import BeautifulSoup
+import glob
 import json
-import re
 import os
 import sys
 import time
 import random
+import threading
 import logging
 from datetime import datetime
-from typing import List, Dict, Set
-from urllib.parse import urljoin, urlparse
+from typing import List, Dict, Set, Optional, Tuple
+from urllib.parse import urlparse
+
+from bps_fetch import HttpFetcher, is_blocked_page, MIN_CONTENT_LENGTH
+from bps_readiness import PageReadinessWaiter
+from bps_crawl_state import CrawlStateStore, content_fingerprint
+from bps_extract import extract_tree, parse_html
+from bps_urls import UrlRules
+from bps_pool import WARM_POOL_SOCKET, ChromeWorkerPool, serve_warm_pool, submit_job
+from bps_politeness import HostRateScheduler
+from bps_frontier import PriorityFrontier
+from bps_dedup import NearDuplicateIndex, simhash
+from bps_output import NdjsonIndexWriter, ndjson_path_for, partial_path_for
+from bps_search import IndexSearcher, binary_path_for, load_records, resolve_index_file
+from bps_binindex import MmapIndex, build_binary_index
+from bps_content import ChunkStore, chunk_path_for
+from bps_profile import StageHistogram, run_profiled, timed, timings_ms
+from bps_archive import ArchiveWriter
+from bps_replay import ReplayBrowserPool, ReplayServer
+from bps_vectors import build_vector_index, vector_path_for
+from bps_compact import BloomFilter, PageRecord, UrlTable, memory_report
+from bps_tables import TableStore, table_facts, table_path_for
+from bps_shards import SHARD_DIR, ShardRouter, crawl_sites, load_site_list, shard_path
+from bps_publish import atomic_open, next_generation, publish_generation
+from bps_session import SESSION_DIR, BrowserSession
+from bps_serve import serve, split_cli_args
+
+# User agents rotated across Chrome drivers
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+]
+
+# In NDJSON mode, table facts are staged on disk in batches of this many table pages
+TABLE_FLUSH_PAGES = 200
+
 
 class UndetectedBPSMedanScraper:
-    def __init__(self, output_file: str = "public/bps_undetected_index.json", headless: bool = False):
-        self.base_url = "https://medankota.bps.go.id"
+    def __init__(self, output_file: str = "public/bps_undetected_index.json", headless: bool = False,
+                 http_first: bool = True, state_file: Optional[str] = None, workers: int = 1,
+                 rate: Tuple[float, float] = (0.125, 2.0), output_format: str = "json",
+                 base_url: str = "https://medankota.bps.go.id", archive_file: Optional[str] = None,
+                 bloom_capacity: Optional[int] = None, session_dir: Optional[str] = None,
+                 browser_pool: Optional[ChromeWorkerPool] = None):
+        self.base_url = base_url
         self.output_file = output_file
+        self.output_format = output_format
+        self.stream_writer = None
         self.headless = headless
         self.driver = None
+        self.start_delay = 20
+        self.url_rules = UrlRules(allowed_hosts=[urlparse(self.base_url).hostname])
+        self.readiness = PageReadinessWaiter()
+        
+        # Per-host request pacing shared by the HTTP tier and every Chrome worker;
+        # `rate` is the (starting, maximum) pages per second it adapts between
+        self.scheduler = HostRateScheduler(initial_rate=rate[0], max_rate=rate[1])
+        
+        # Profiles, cookies and patched driver kept between runs; None starts Chrome from scratch
+        self.session = BrowserSession(session_dir) if session_dir else None
+        
+        # Chrome drivers for pages the HTTP tier cannot fetch, started on first use,
+        # unless a warm pool that outlives this scraper is handed in
+        self.workers = max(1, workers)
+        self.browser_pool = browser_pool
+        self._owns_browser_pool = browser_pool is None
+        if browser_pool:
+            browser_pool.attach(self)
+        self._count_lock = threading.Lock()
+        
+        # Plain HTTP tier tried before Chrome; None forces every page through the driver
+        self.http_fetcher = HttpFetcher(scheduler=self.scheduler) if http_first else None
+        if self.http_fetcher:
+            # robots.txt Crawl-delay caps the per-host rate
+            self.scheduler.robots_fetcher = self.http_fetcher.fetch_text
+            if self.session:
+                self.session.apply_cookies(self.http_fetcher.session)
+        
+        # Persistent frontier / seen set / fetch metadata; None keeps everything in memory
+        self.state = CrawlStateStore(state_file) if state_file else None
+        
+        # Optional WARC-like recording of every fetched page, for offline replay
+        self.archive = ArchiveWriter(archive_file) if archive_file else None
         
         # Setup logging
         logging.basicConfig(
@@ -36,62 +112,100 @@ class UndetectedBPSMedanScraper:
         # Create output directory
         os.makedirs(os.path.dirname(self.output_file) if os.path.dirname(self.output_file) else '.', exist_ok=True)
         
-        self.all_links = set()
-        self.scraped_data = []
+        # Body text chunks for retrieval, stored next to the index; a run writes a staged
+        # copy (opened once it is known whether the run resumes) published with the index
+        self.chunk_store: Optional[ChunkStore] = None
+        
+        # Every discovered URL, prefix-compressed; a Bloom filter caps it at a fixed size instead
+        self.all_links = BloomFilter(bloom_capacity) if bloom_capacity else UrlTable()
+        self.scraped_data: List[PageRecord] = []
+        self.scraped_count = 0
+        self.last_record = None
         self.page_count = 0
         self.error_count = 0
+        self.unchanged_count = 0
+        self.stage_timings = StageHistogram()
+        
+        # Near-duplicate pages (URL variants, redirects) fold into the first page seen
+        self.near_duplicates = NearDuplicateIndex()
+        self.aliases: Dict[str, List[str]] = {}
+        self.duplicate_count = 0
+        # In-memory records by URL, for alias folding; only kept when the records are kept anyway
+        self._records_by_url: Dict[str, PageRecord] = {}
+        
+        # Statistics table facts of this run, url -> (title, facts), stored columnar at the end
+        self.table_facts: Dict[str, Tuple[str, List]] = {}
 
     def setup_undetected_driver(self):
         """Setup undetected Chrome driver"""
+        # A kept session's challenge cookies are only good with the user agent that earned them
+        user_agent = USER_AGENTS[0] if self.session else random.choice(USER_AGENTS)
+        self.driver = self._create_driver(user_agent)
+        return self.driver is not None
+
+    def _chrome_options(self):
+        """Chrome options for one driver (uc.Chrome refuses to reuse an options object)"""
+        options = uc.ChromeOptions()
+        
+        if self.headless:
+            options.add_argument("--headless=new")
+        
+        # Additional stealth options
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--window-size=1920,1080")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-plugins")
+        options.add_argument("--disable-images")  # Speed up loading
+        options.add_argument("--disable-javascript")  # Disable JS to avoid detection
+        return options
+
+    def _create_driver(self, user_agent: str, index: int = 0):
+        """Start undetected Chrome driver `index` with the given user agent, or None on failure"""
         try:
             self.logger.info("Setting up undetected Chrome driver...")
             
-            # Create Chrome options
-            options = uc.ChromeOptions()
-            
-            if self.headless:
-                options.add_argument("--headless=new")
-            
-            # Additional stealth options
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--disable-gpu")
-            options.add_argument("--window-size=1920,1080")
-            options.add_argument("--disable-extensions")
-            options.add_argument("--disable-plugins")
-            options.add_argument("--disable-images")  # Speed up loading
-            options.add_argument("--disable-javascript")  # Disable JS to avoid detection
+            launch = {
+                "version_main": None,  # Auto-detect Chrome version
+                "driver_executable_path": None,
+                "user_data_dir": None,
+            }
+            if self.session:
+                # Persistent profile, and the already patched driver when one is cached
+                launch.update(self.session.launch_options(index))
             
             # Create undetected Chrome driver
-            self.driver = uc.Chrome(
-                options=options,
-                version_main=None,  # Auto-detect Chrome version
-                driver_executable_path=None,
-                browser_executable_path=None,
-                user_data_dir=None,
-                headless=self.headless
-            )
+            try:
+                driver = uc.Chrome(options=self._chrome_options(), browser_executable_path=None,
+                                   headless=self.headless, **launch)
+            except Exception as e:
+                if not launch["driver_executable_path"]:
+                    raise
+                # Chrome was probably updated past the cached driver: fetch and patch a new one
+                self.logger.warning(f"Cached chromedriver failed ({e}), fetching a new one...")
+                self.session.forget_driver()
+                launch.update(version_main=None, driver_executable_path=None)
+                driver = uc.Chrome(options=self._chrome_options(), browser_executable_path=None,
+                                   headless=self.headless, **launch)
+            
+            if self.session:
+                self.session.remember_driver(driver)
+                self.session.restore_cookies(driver)
             
             # Set reasonable timeouts
-            self.driver.implicitly_wait(15)
-            self.driver.set_page_load_timeout(45)
-            
-            # Random user agent rotation
-            user_agents = [
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            ]
+            driver.implicitly_wait(15)
+            driver.set_page_load_timeout(45)
             
-            user_agent = random.choice(user_agents)
-            self.driver.execute_cdp_cmd('Network.setUserAgentOverride', {"userAgent": user_agent})
+            # Per-driver user agent from the rotation list
+            driver.execute_cdp_cmd('Network.setUserAgentOverride', {"userAgent": user_agent})
             
             self.logger.info("Undetected Chrome driver setup completed successfully")
-            return True
+            return driver
             
         except Exception as e:
             self.logger.error(f"Failed to setup undetected driver: {e}")
-            return False
+            return None
 
     def test_connection_advanced(self):
         """Advanced connection test with multiple strategies"""
@@ -114,20 +228,25 @@ class UndetectedBPSMedanScraper:
             for strategy_name, test_url, wait_time in strategies:
                 print(f"🔍 Testing {strategy_name}: {test_url}")
                 try:
-                    # Navigate with extended waiting
+                    waited = self.scheduler.acquire(test_url)
+                    if waited > 1:
+                        print(f"  ⏳ Waited {waited:.1f}s for the polite request slot")
+                    
+                    # Navigate and wait until the page is usable (at most wait_time)
                     start_time = time.time()
                     self.driver.get(test_url)
                     
-                    # Wait for page to load completely
-                    print(f"  ⏳ Waiting {wait_time}s for page load...")
-                    time.sleep(wait_time)
+                    print(f"  ⏳ Waiting up to {wait_time}s for page load...")
+                    readiness = self.readiness.wait(self.driver, test_url, max_timeout=wait_time, started_at=start_time)
+                    if not readiness["ready"]:
+                        print(f"  ⚠️  Not ready: {readiness['failed_condition']}")
                     
                     load_time = time.time() - start_time
                     
                     # Get page information
                     page_title = self.driver.title
                     page_url = self.driver.current_url
-                    page_source = self.driver.page_source
+                    page_source = readiness["source"] if readiness["ready"] else self.driver.page_source
                     
                     print(f"  📄 Title: {page_title}")
                     print(f"  🔗 Final URL: {page_url}")
@@ -148,6 +267,7 @@ class UndetectedBPSMedanScraper:
                     ]
                     
                     blocked = any(sign in page_lower for sign in blocking_signs)
+                    self.scheduler.record(test_url, load_time, blocked=blocked or not readiness["ready"])
                     
                     if blocked:
                         print(f"  ❌ BLOCKED - Anti-bot protection detected")
@@ -175,7 +295,7 @@ class UndetectedBPSMedanScraper:
                             try:
                                 soup = BeautifulSoup(page_source, 'html.parser')
                                 links = soup.find_all('a', href=True)
-                                valid_links = [link for link in links if link.get('href') and 'medankota.bps.go.id' in link.get('href', '')]
+                                valid_links = [link for link in links if link.get('href') and urlparse(self.base_url).hostname in link.get('href', '')]
                                 print(f"  🔗 Found {len(links)} total links, {len(valid_links)} BPS links")
                                 
                                 if len(valid_links) > 0:
@@ -198,12 +318,6 @@ class UndetectedBPSMedanScraper:
                 except Exception as e:
                     print(f"  ❌ ERROR: {e}")
                     print()
-                
-                # Wait between tests to avoid triggering rate limits
-                if strategy_name != strategies[-1][0]:  # Don't wait after last test
-                    wait_between = random.randint(8, 15)
-                    print(f"⏳ Waiting {wait_between}s before next test...\n")
-                    time.sleep(wait_between)
             
             print("=== Test Summary ===")
             print(f"Successful URLs: {len(successful_urls)}")
@@ -230,6 +344,8 @@ class UndetectedBPSMedanScraper:
             return False
         finally:
             if self.driver:
+                if self.session:
+                    self.session.save_cookies([self.driver])
                 print("🔄 Closing browser...")
                 self.driver.quit()
 
@@ -237,139 +353,495 @@ class UndetectedBPSMedanScraper:
         """Main scraping method using undetected Chrome"""
         self.logger.info("Starting undetected Chrome scraping...")
         start_time = datetime.now()
-        
-        if not self.setup_undetected_driver():
-            return {"error": "Failed to setup undetected Chrome driver", "urls": []}
+        self.start_delay = start_delay
         
         try:
-            # Initial long delay to let browser settle
-            self.logger.info(f"Initial settling delay: {start_delay}s")
-            time.sleep(start_delay)
-            
-            # Start with homepage
-            self.logger.info("Loading homepage...")
-            success = self._load_page_with_patience(self.base_url, patience=30)
+            if self.output_format == "ndjson":
+                self.stream_writer = NdjsonIndexWriter(self.output_file, {
+                    "scraped_at": start_time.isoformat(),
+                    "base_url": self.base_url,
+                    "scraping_method": "undetected_chrome",
+                    "max_pages": max_pages
+                })
             
-            if not success:
-                # Try alternative approach - go to a specific section first
-                self.logger.info("Homepage failed, trying subject section...")
-                success = self._load_page_with_patience(f"{self.base_url}/subject", patience=25)
+            resumed = self.state.begin_run() if self.state else False
+            self.chunk_store = ChunkStore.stage(chunk_path_for(self.output_file), resume=resumed)
+            if not resumed:
+                self._remove_staged_table_facts()
+            if resumed:
+                pending = self.state.pending()
+                self.all_links.update(self.state.seen_urls())
+                self.logger.info(f"Resuming unfinished crawl with {len(pending)} queued pages")
+                return self._crawl_frontier(pending, max_pages, start_time, attempted=0)
             
-            if not success:
-                return {"error": "Could not access any page on the website", "urls": []}
+            # Start with homepage, over plain HTTP when the site lets us
+            self.logger.info("Loading homepage...")
+            first_page = self._fetch_over_http(self.base_url)
             
-            # Process the first successfully loaded page
-            self._process_current_page_carefully(self.driver.current_url, depth=0)
+            if not first_page:
+                if not self._ensure_browser_pool():
+                    return {"error": "Failed to setup undetected Chrome driver", "urls": []}
+                
+                first_page = self.browser_pool.load(self.base_url, patience=30)
+                
+                if not first_page:
+                    # Try alternative approach - go to a specific section first
+                    self.logger.info("Homepage failed, trying subject section...")
+                    first_page = self.browser_pool.load(f"{self.base_url}/subject", patience=25)
+                
+                if not first_page:
+                    return {"error": "Could not access any page on the website", "urls": []}
             
-            # Get links from the current page
-            initial_links = self._extract_links_carefully()
+            # Process the first successfully loaded page and get its links
+            initial_links = self._handle_page(first_page["url"], first_page, depth=0)
             self.logger.info(f"Found {len(initial_links)} links on first page")
             
-            # Visit additional pages
-            pages_to_visit = initial_links[:max_pages-1]  # -1 because we already have homepage
+            # Visit additional pages, most valuable first
+            if self.state:
+                self.state.enqueue(initial_links, depth=1)
+            return self._crawl_frontier([(url, 1) for url in initial_links], max_pages, start_time, attempted=1)
+            
+        except Exception as e:
+            self.logger.error(f"Scraping failed: {e}")
+            import traceback
+            self.logger.error(f"Traceback: {traceback.format_exc()}")
+            return {"error": str(e), "urls": [record.to_dict() for record in self.scraped_data]}
+        
+        finally:
+            if self.stream_writer:
+                # An interrupted run stays in the .partial file; the published index is kept
+                self.stream_writer.close(self._run_stats(max_pages, completed=False), publish=False)
+            if self.http_fetcher:
+                self.http_fetcher.close()
+            if self.state:
+                self.state.close()
+            if self.chunk_store:
+                # Unpublished chunks stay staged for a resumed run
+                self.chunk_store.close()
+                self.chunk_store = None
+            if self.archive:
+                self.archive.close()
+            if self.browser_pool and self._owns_browser_pool:
+                self.logger.info(f"Closing {self.browser_pool.size} undetected Chrome driver(s)")
+                self.browser_pool.close()
+            elif self.browser_pool:
+                # A warm pool outlives the job; keep what its drivers learned
+                self.browser_pool.save_session()
+            self.browser_pool = None
+
+    def _crawl_frontier(self, queued: List, max_pages: int, start_time: datetime, attempted: int) -> Dict:
+        """Visit queued (url, depth) pairs, highest priority first, until the frontier or the page budget runs out"""
+        frontier = PriorityFrontier(self.url_rules.classify, ages=self.state.fetch_ages if self.state else None)
+        for depth in sorted(set(depth for _, depth in queued)):
+            frontier.push_many([url for url, queued_depth in queued if queued_depth == depth], depth)
+        
+        while frontier and self.scraped_count < max_pages:
+            # Fetch the next batch concurrently over HTTP; blocked pages go to the Chrome pool
+            batch_size = max(self.http_fetcher.max_workers if self.http_fetcher else 1, self.workers)
+            depths = dict(frontier.pop_many(min(batch_size, max_pages - self.scraped_count)))
+            batch = list(depths)
+            pages = {}
+            needs_browser = list(batch)
+            if self.http_fetcher:
+                headers = {url: self.state.conditional_headers(url) for url in batch} if self.state else None
+                prefetched = self.http_fetcher.fetch_many(batch, headers=headers)
+                pages = {url: self._usable_http_page(prefetched[url]) for url in batch}
+                needs_browser = [url for url in batch if pages[url] is None and prefetched[url]["needs_browser"]]
+                self._count_error(sum(1 for url in batch if pages[url] is None and not prefetched[url]["needs_browser"]))
+
+            if needs_browser:
+                if self._ensure_browser_pool():
+                    pages.update(self.browser_pool.load_many(needs_browser, patience=15))
+                else:
+                    self._count_error(len(needs_browser))
             
-            for i, url in enumerate(pages_to_visit):
-                if len(self.scraped_data) >= max_pages:
+            for url in batch:
+                if self.scraped_count >= max_pages:
                     break
                 
-                self.logger.info(f"Loading page {i+2}/{min(len(pages_to_visit)+1, max_pages)}: {url}")
+                attempted += 1
+                self.logger.info(f"Processing page {attempted} ({self.scraped_count}/{max_pages} scraped, "
+                                 f"{len(frontier)} queued): {url}")
                 
-                if self._load_page_with_patience(url, patience=15):
-                    self._process_current_page_carefully(url, depth=1)
-                    
-                    # Add more links from successful pages (but limit growth)
-                    if len(self.scraped_data) < max_pages // 2:
-                        new_links = self._extract_links_carefully()
-                        for new_link in new_links[:3]:  # Add max 3 new links per page
-                            if new_link not in pages_to_visit and len(pages_to_visit) < max_pages:
-                                pages_to_visit.append(new_link)
+                page = pages.get(url)
                 
-                # Progress update
-                if (i + 1) % 5 == 0:
-                    success_rate = len(self.scraped_data) / (i + 2) * 100
-                    self.logger.info(f"Progress: {len(self.scraped_data)} pages scraped, {success_rate:.1f}% success rate")
+                if page is None:
+                    if self.state:
+                        self.state.complete(url)
+                    continue
+                
+                depth = depths[url]
+                new_links = self._handle_page(url, page, depth=depth)
                 
-                # Random delay between pages
-                delay = random.randint(8, 15)
-                self.logger.info(f"Waiting {delay}s before next page...")
-                time.sleep(delay)
+                # Every new link competes for the remaining budget on priority
+                added = frontier.push_many(new_links, depth + 1)
+                if self.state and added:
+                    self.state.enqueue(added, depth=depth + 1)
+                
+                # Progress update
+                if (attempted - 1) % 5 == 0:
+                    success_rate = self.scraped_count / attempted * 100
+                    self.logger.info(f"Progress: {self.scraped_count} pages scraped, {success_rate:.1f}% success rate")
+        
+        return self._finish_run(max_pages, start_time)
+
+    def _run_stats(self, max_pages: int, completed: bool = True) -> Dict:
+        """Run statistics shared by the JSON index and the NDJSON footer"""
+        attempted = self.scraped_count + self.error_count
+        return {
+            "completed": completed,
+            "finished_at": datetime.now().isoformat(),
+            "max_pages": max_pages,
+            "error_count": self.error_count,
+            "unchanged_count": self.unchanged_count,
+            "duplicate_count": self.duplicate_count,
+            "load_times_by_section": self.readiness.summary(),
+            "stage_timings_ms": self.stage_timings.summary(),
+            "politeness": self.scheduler.summary(),
+            "memory": memory_report(self.all_links, self.scraped_data),
+            "success_rate": f"{self.scraped_count/attempted*100:.1f}%" if attempted > 0 else "0%"
+        }
+
+    def _finish_run(self, max_pages: int, start_time: datetime) -> Dict:
+        """Assemble, save, publish and log the results of a crawl run"""
+        stats = self._run_stats(max_pages)
+        stats["generation"] = generation = next_generation(self.output_file)
+        saved = True
+        
+        if self.stream_writer:
+            # Pages known from earlier runs but not revisited this time complete the index
+            if self.state:
+                for record in self.state.records():
+                    if not self.state.emitted(record.get("url", "")):
+                        self.stream_writer.write(record)
+            for canonical_url, aliases in self.aliases.items():
+                self.stream_writer.write_aliases(canonical_url, aliases)
+            self.stream_writer.close(dict(stats, aliased_pages=len(self.aliases)))
+            final_data = dict(stats, aliases=self.aliases, scraped_at=start_time.isoformat(), base_url=self.base_url,
+                              scraping_method="undetected_chrome", total_urls=self.stream_writer.record_count,
+                              output_format="ndjson")
+            self.logger.info(f"Data streamed to {self.output_file}")
+        else:
+            # With a state store the index covers every known page, not just this run's
+            records = list(self.state.records()) if self.state else [record.to_dict() for record in self.scraped_data]
             
             # Prepare final data
             final_data = {
                 "scraped_at": datetime.now().isoformat(),
-                "total_urls": len(self.scraped_data),
+                "total_urls": len(records),
                 "base_url": self.base_url,
                 "scraping_method": "undetected_chrome",
                 "max_pages": max_pages,
                 "error_count": self.error_count,
-                "success_rate": f"{len(self.scraped_data)/(len(self.scraped_data)+self.error_count)*100:.1f}%" if (len(self.scraped_data)+self.error_count) > 0 else "0%",
-                "urls": self.scraped_data
+                "unchanged_count": self.unchanged_count,
+                "duplicate_count": self.duplicate_count,
+                "aliases": self.aliases,
+                "load_times_by_section": stats["load_times_by_section"],
+                "stage_timings_ms": stats["stage_timings_ms"],
+                "politeness": stats["politeness"],
+                "memory": stats["memory"],
+                "success_rate": stats["success_rate"],
+                "generation": generation,
+                "urls": records
             }
             
             # Save results
-            self._save_to_file(final_data)
-            
-            end_time = datetime.now()
-            duration = (end_time - start_time).total_seconds()
-            
-            self.logger.info(f"Undetected Chrome scraping completed!")
-            self.logger.info(f"Scraped {len(self.scraped_data)} pages in {duration:.2f} seconds")
-            self.logger.info(f"Success rate: {len(self.scraped_data)}/{len(self.scraped_data)+self.error_count}")
-            
-            return final_data
-            
+            saved = self._save_to_file(final_data)
+        
+        self._save_table_facts()
+        if saved:
+            self.chunk_store.publish(chunk_path_for(self.output_file))
+            self.chunk_store = None
+        if self.state:
+            self.state.finish_run()
+        if saved:
+            # Announced last, once the index, its chunks and its table store are in place
+            publish_generation(self.output_file, generation, total_urls=final_data["total_urls"])
+            self.logger.info(f"Published generation {generation} of {self.output_file}")
+        
+        end_time = datetime.now()
+        duration = (end_time - start_time).total_seconds()
+        
+        self.logger.info(f"Undetected Chrome scraping completed!")
+        self.logger.info(f"Scraped {self.scraped_count} pages in {duration:.2f} seconds ({self.unchanged_count} unchanged)")
+        self.logger.info(f"Success rate: {self.scraped_count}/{self.scraped_count+self.error_count}")
+        
+        return final_data
+
+    def _save_table_facts(self):
+        """Merge this run's statistics table facts into the columnar table store"""
+        staged = self._staged_table_batches()
+        if not self.table_facts and not staged:
+            return
+        try:
+            store = TableStore(table_path_for(self.output_file))
+            if staged:
+                # The last batch is still in memory; all batches are merged in one rewrite
+                store.merge([TableStore(path) for path in staged] + [self._facts_batch(self.table_facts)])
+            else:
+                store.replace_pages(self.table_facts)
+            self.table_facts = {}
+            self._remove_staged_table_facts()
+            self.logger.info(f"Table store: {len(store)} facts from {len(store.pages)} pages")
         except Exception as e:
-            self.logger.error(f"Scraping failed: {e}")
-            import traceback
-            self.logger.error(f"Traceback: {traceback.format_exc()}")
-            return {"error": str(e), "urls": self.scraped_data}
+            self.logger.error(f"Error saving table facts: {e}")
+
+    def _staged_table_batches(self) -> List[str]:
+        """Table store prefixes of the batches a streaming run has staged, oldest first"""
+        prefix = partial_path_for(table_path_for(self.output_file))
+        paths = [path[:-len(".json")] for path in glob.glob(glob.escape(prefix) + "-*.json")]
+        return sorted((path for path in paths if TableStore.exists(path)), key=lambda path: int(path.rsplit("-", 1)[1]))
+
+    def _facts_batch(self, pages: Dict[str, Tuple[str, List]]) -> TableStore:
+        """Write table facts to a new staged batch"""
+        staged = self._staged_table_batches()
+        number = int(staged[-1].rsplit("-", 1)[1]) + 1 if staged else 0
+        batch = TableStore(f"{partial_path_for(table_path_for(self.output_file))}-{number}")
+        batch.replace_pages(pages)
+        return batch
+
+    def _stage_table_facts(self):
+        """Move the table facts gathered so far out of memory, into a staged batch on disk"""
+        try:
+            self._facts_batch(self.table_facts)
+            self.table_facts = {}
+        except Exception as e:
+            self.logger.error(f"Error staging table facts: {e}")
+
+    def _remove_staged_table_facts(self):
+        """Drop the staged batches (once merged, or left over from an unfinished run)"""
+        for path in self._staged_table_batches():
+            for suffix in (".npz", ".json"):
+                os.remove(path + suffix)
+
+    def _emit_record(self, record: Dict):
+        """Hand a finished page record to the output (streamed, or kept for the final dump)"""
+        record = PageRecord.from_dict(record)
+        self.scraped_count += 1
+        self.last_record = record
+        if self.stream_writer:
+            self.stream_writer.write(record.to_dict())
+            if self.state:
+                # Tracked on disk, not in a set that grows with the crawl
+                self.state.mark_emitted(record.get("url", ""))
+        else:
+            self.scraped_data.append(record)
+            self._records_by_url[record.get("url")] = record
+
+    def _handle_page(self, url: str, page: Dict, depth: int) -> List[str]:
+        """Process a fetched page, reusing the stored record when it has not changed; returns new links"""
+        # A page never links back into the crawl as a new URL
+        self.all_links.update((url, page["url"]))
         
-        finally:
-            if self.driver:
-                self.logger.info("Closing undetected Chrome driver")
-                self.driver.quit()
+        if self.archive and page.get("source"):
+            self.archive.write_page(url, page)
+        
+        stored = self.state.page(url) if self.state else None
+        content_hash = content_fingerprint(page["source"]) if page.get("source") else None
+        
+        if stored and (page.get("not_modified") or stored["content_hash"] == content_hash):
+            # Unchanged since the last crawl: keep the old record and follow its known links
+            self.unchanged_count += 1
+            self._emit_record(stored["record"])
+            if stored["record"].get("fingerprint"):
+                self.near_duplicates.add(stored["record"]["url"], int(stored["record"]["fingerprint"], 16))
+            new_links = [link for link in stored["links"] if link not in self.all_links]
+            self.all_links.update(new_links)
+            if self.state:
+                self.state.mark_seen(new_links)
+                self.state.complete(url)
+            return new_links
+        
+        if page.get("not_modified"):
+            # 304 without a stored record to fall back on
+            self.error_count += 1
+            if self.state:
+                self.state.complete(url)
+            return []
+        
+        fingerprint = self._fingerprint(page)
+        canonical_url = self.near_duplicates.find(fingerprint) if fingerprint is not None else None
+        if canonical_url:
+            # Same content under another URL: keep one record and do not follow the copy's links
+            self._fold_duplicate(url, page["url"], canonical_url)
+            if self.state:
+                self.state.complete(url)
+            return []
+        
+        processed_before = self.scraped_count
+        self._process_current_page_carefully(url, depth=depth, page=page)
+        new_links = self._extract_links_carefully(page)
+        if fingerprint is not None and self.scraped_count > processed_before:
+            self.near_duplicates.add(self.last_record["url"], fingerprint)
+        
+        timings = page.setdefault("timings", {})
+        if self.state:
+            with timed(timings, "save"):
+                if self.scraped_count > processed_before:
+                    self.state.save_page(url, self.last_record.to_dict(), new_links, content_hash,
+                                         etag=page.get("etag"), last_modified=page.get("last_modified"))
+                self.state.mark_seen(new_links)
+                self.state.complete(url)
+        if self.scraped_count > processed_before:
+            # Recorded once the page is fully persisted, so "save" covers every write
+            self.stage_timings.add(timings_ms(timings))
+        
+        return new_links
+
+    def _fingerprint(self, page: Dict) -> Optional[int]:
+        """SimHash of the page title and body text, cached on the page snapshot"""
+        if "fingerprint" not in page:
+            extracted = self._extract_page(page)
+            text = "\n".join([page["title"] or extracted["title"]] + [block for _, block in extracted["blocks"]])
+            page["fingerprint"] = simhash(text)
+        return page["fingerprint"]
+
+    def _fold_duplicate(self, url: str, page_url: str, canonical_url: str):
+        """Record a near-duplicate page as an alias of its canonical record"""
+        aliases = self.aliases.setdefault(canonical_url, [])
+        for alias in (url, page_url):
+            if alias != canonical_url and alias not in aliases:
+                aliases.append(alias)
+        
+        record = self._records_by_url.get(canonical_url)
+        if record is not None:
+            record["aliases"] = aliases
+            if self.state:
+                self.state.update_record(canonical_url, record.to_dict())
+        elif self.state:
+            # Streamed records are not kept in memory; the stored copy takes the aliases
+            stored = self.state.page(canonical_url)
+            if stored:
+                self.state.update_record(canonical_url, dict(stored["record"], aliases=aliases))
+        
+        self.duplicate_count += 1
+        self.logger.info(f"Near-duplicate of {canonical_url}, folded: {url}")
 
-    def _load_page_with_patience(self, url: str, patience: int = 20) -> bool:
-        """Load page with extra patience for anti-bot systems"""
+    def _ensure_browser_pool(self) -> bool:
+        """Start the Chrome worker pool the first time a page needs a browser"""
+        if self.browser_pool:
+            return True
+        
+        pool = ChromeWorkerPool(self, self.workers, USER_AGENTS, self.scheduler)
+        if pool.size == 0:
+            pool.close()
+            return False
+        
+        self.browser_pool = pool
+        self.logger.info(f"Started {pool.size} Chrome worker(s)")
+        
+        if self.session and self.session.has_clearance(urlparse(self.base_url).hostname):
+            self.logger.info("Browser session already holds the site's cookies, skipping the settling delay")
+            return True
+        
+        # Initial long delay to let browsers settle
+        self.logger.info(f"Initial settling delay: {self.start_delay}s")
+        time.sleep(self.start_delay)
+        return True
+
+    def _count_error(self, count: int = 1):
+        """Increment the error counter; safe to call from worker threads"""
+        with self._count_lock:
+            self.error_count += count
+
+    def _fetch_over_http(self, url: str) -> Optional[Dict]:
+        """Fetch a single page through the HTTP tier, conditionally when it is stored"""
+        if not self.http_fetcher:
+            return None
+        headers = self.state.conditional_headers(url) if self.state else None
+        return self._usable_http_page(self.http_fetcher.fetch(url, headers=headers))
+
+    def _usable_http_page(self, result: Optional[Dict]) -> Optional[Dict]:
+        """Turn an HTTP fetch result into a page, or None if Chrome is needed"""
+        if not result:
+            return None
+        
+        if result.get("not_modified"):
+            return {
+                "url": result["final_url"],
+                "title": "",
+                "source": "",
+                "fetch_method": "http",
+                "not_modified": True,
+                "load_time": round(result["elapsed"], 3),
+                "timings": {"delay": result["delay"], "load": result["elapsed"]}
+            }
+        
+        if not result["ok"]:
+            reason = "blocking page detected" if result["blocked"] else result["error"]
+            if result["needs_browser"]:
+                self.logger.info(f"HTTP fetch unusable ({reason}), falling back to Chrome: {result['url']}")
+            else:
+                self.logger.warning(f"Skipping page ({reason}): {result['url']}")
+            return None
+        
+        return {
+            "url": result["final_url"],
+            "title": result["title"],
+            "source": result["source"],
+            "fetch_method": "http",
+            "etag": result.get("etag"),
+            "last_modified": result.get("last_modified"),
+            "load_time": round(result["elapsed"], 3),
+            "timings": {"delay": result["delay"], "load": result["elapsed"]}
+        }
+
+    def _current_page(self, driver=None, source: Optional[str] = None) -> Dict:
+        """Snapshot the page currently loaded in the driver (reusing its source if already read)"""
+        driver = driver or self.driver
+        return {
+            "url": driver.current_url,
+            "title": driver.title,
+            "source": source if source is not None else driver.page_source,
+            "fetch_method": "chrome"
+        }
+
+    def _load_page_with_patience(self, url: str, patience: int = 20, driver=None,
+                                 timings: Optional[Dict[str, float]] = None) -> Optional[str]:
+        """Load page with extra patience for anti-bot systems; returns its source, or None"""
+        driver = driver or self.driver
+        timings = timings if timings is not None else {}
         try:
             self.logger.info(f"Loading with patience: {url}")
             
             # Navigate to page
-            self.driver.get(url)
+            started_at = time.time()
+            with timed(timings, "load"):
+                driver.get(url)
             
-            # Wait patiently for the page to load
-            self.logger.info(f"Waiting {patience}s for page to fully load...")
-            time.sleep(patience)
+            # Wait until the page is usable, at most `patience` seconds
+            with timed(timings, "wait"):
+                readiness = self.readiness.wait(driver, url, max_timeout=patience, started_at=started_at)
+            self.logger.info(f"Page ready={readiness['ready']} after {readiness['elapsed']:.2f}s "
+                             f"(timeout {readiness['timeout']:.1f}s)")
             
             # Check page content
-            page_source = self.driver.page_source
-            page_title = self.driver.title
+            with timed(timings, "source"):
+                page_source = readiness["source"] if readiness["ready"] else driver.page_source
+                page_title = driver.title
             
             # Check if we're still being blocked
             page_lower = page_source.lower()
-            blocking_indicators = [
-                'just a moment',
-                'checking your browser',
-                'please wait',
-                'cloudflare'
-            ]
             
-            if any(indicator in page_lower for indicator in blocking_indicators):
-                self.logger.warning(f"Still seeing blocking page, waiting longer...")
-                time.sleep(15)  # Wait even more
-                page_source = self.driver.page_source
+            if not readiness["ready"]:
+                self.logger.warning(f"Page not ready ({readiness['failed_condition']}), waiting longer...")
+                with timed(timings, "wait"):
+                    readiness = self.readiness.wait(driver, url, max_timeout=patience + 15,
+                                                    started_at=started_at, adaptive=False)
+                with timed(timings, "source"):
+                    page_source = readiness["source"] if readiness["ready"] else driver.page_source
                 page_lower = page_source.lower()
                 
-                if any(indicator in page_lower for indicator in blocking_indicators):
+                if is_blocked_page(page_source):
                     self.logger.error(f"Page still blocked after extended wait: {url}")
-                    self.error_count += 1
-                    return False
+                    self._count_error()
+                    return None
             
             # Check for meaningful content
-            if len(page_source) < 1000:
+            if len(page_source) < MIN_CONTENT_LENGTH:
                 self.logger.warning(f"Page content too short: {url}")
-                self.error_count += 1
-                return False
+                self._count_error()
+                return None
             
             # Check for BPS content
             bps_indicators = ['badan pusat statistik', 'bps', 'statistik']
@@ -378,33 +850,42 @@ class UndetectedBPSMedanScraper:
                 # Don't count this as error, might still be useful
             
             self.logger.info(f"Successfully loaded page: {page_title}")
-            return True
+            return page_source
             
         except TimeoutException:
             self.logger.error(f"Timeout loading page: {url}")
-            self.error_count += 1
-            return False
+            self._count_error()
+            return None
         except Exception as e:
             self.logger.error(f"Error loading page {url}: {e}")
-            self.error_count += 1
-            return False
+            self._count_error()
+            return None
 
-    def _process_current_page_carefully(self, url: str, depth: int = 0):
-        """Carefully process the current page"""
+    def _process_current_page_carefully(self, url: str, depth: int = 0, page: Optional[Dict] = None):
+        """Carefully process the current page (or an already fetched one)"""
         try:
             # Get page information
-            page_title = self.driver.title
-            page_url = self.driver.current_url
-            page_source = self.driver.page_source
+            page = page or self._current_page()
+            page_url = page["url"]
+            page_source = page["source"]
             
-            # Parse with BeautifulSoup
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            # Extract metadata carefully
-            description = self._extract_description_safely(soup)
-            keywords = self._extract_keywords_safely(soup)
+            # Parse once; metadata and links come out of the same traversal
+            extracted = self._extract_page(page)
+            page_title = page["title"] or extracted["title"]
+            description = extracted["description"]
+            keywords = extracted["keywords"]
             page_type = self._classify_page_type(page_url, page_title)
             
+            # Body text and table rows, boilerplate removed, chunked for passage lookup
+            timings = page.setdefault("timings", {})
+            with timed(timings, "chunks"):
+                chunk_count = self.chunk_store.add_page(page_url, extracted["blocks"])
+            
+            # Numbers of statistics tables, as (year, region, indicator, value) facts
+            if page_type == "statistics_table" and extracted["tables"]:
+                self.table_facts[page_url] = (page_title, table_facts(page_title, extracted["tables"]))
+            stage_timings = timings_ms(timings)
+            
             # Store page data
             page_data = {
                 "url": page_url,
@@ -416,11 +897,21 @@ class UndetectedBPSMedanScraper:
                 "depth": depth,
                 "scraped_at": datetime.now().isoformat(),
                 "content_length": len(page_source),
-                "redirected": url != page_url
+                "redirected": url != page_url,
+                "fetch_method": page.get("fetch_method", "chrome"),
+                "load_time": page.get("load_time"),
+                "chunks": chunk_count,
+                "table_facts": len(self.table_facts[page_url][1]) if page_url in self.table_facts else 0,
+                "fingerprint": f"{page['fingerprint']:016x}" if page.get("fingerprint") is not None else None,
+                "timings_ms": stage_timings
             }
             
-            self.scraped_data.append(page_data)
-            self.page_count += 1
+            # The record cannot carry its own write time; "save" only goes into the run aggregates
+            with timed(timings, "save"):
+                self._emit_record(page_data)
+                self.page_count += 1
+                if self.stream_writer and len(self.table_facts) >= TABLE_FLUSH_PAGES:
+                    self._stage_table_facts()
             
             self.logger.info(f"✅ Processed page {self.page_count}: {page_title[:60]}...")
             
@@ -428,22 +919,31 @@ class UndetectedBPSMedanScraper:
             self.logger.error(f"Error processing page {url}: {e}")
             self.error_count += 1
 
-    def _extract_links_carefully(self) -> List[str]:
-        """Carefully extract valid links from current page"""
+    def _extract_page(self, page: Dict) -> Dict:
+        """Single-pass extraction of a page, cached on the page snapshot"""
+        if "extracted" not in page:
+            timings = page.setdefault("timings", {})
+            with timed(timings, "parse"):
+                root = parse_html(page["source"])
+            with timed(timings, "extract"):
+                page["extracted"] = extract_tree(root)
+        return page["extracted"]
+
+    def _extract_links_carefully(self, page: Optional[Dict] = None) -> List[str]:
+        """Carefully extract valid links from current page (or an already fetched one)"""
         try:
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+            page = page or self._current_page()
             links = []
             
-            for link_element in soup.find_all('a', href=True):
-                href = link_element.get('href')
-                if href and self._is_valid_bps_url(href):
-                    full_url = urljoin(self.base_url, href)
+            for href in self._extract_page(page)["links"]:
+                full_url = self.url_rules.normalize(href, page["url"])
+                if full_url:
                     if full_url not in self.all_links:
                         links.append(full_url)
                         self.all_links.add(full_url)
             
             self.logger.debug(f"Extracted {len(links)} new valid links")
-            return links[:15]  # Limit links per page
+            return links
             
         except Exception as e:
             self.logger.error(f"Error extracting links: {e}")
@@ -451,94 +951,48 @@ class UndetectedBPSMedanScraper:
 
     def _is_valid_bps_url(self, url: str) -> bool:
         """Check if URL is valid for scraping"""
-        if not url:
-            return False
-        
-        url_lower = url.lower()
-        
-        # Must contain BPS domain
-        if 'medankota.bps.go.id' not in url_lower:
-            return False
-        
-        # Skip unwanted file types and paths
-        skip_patterns = [
-            r'\.(pdf|doc|docx|xls|xlsx|ppt|pptx|zip|rar|jpg|jpeg|png|gif|css|js)(\?|$)',
-            r'/(assets|static|media|images|css|js|fonts)/',
-            r'/download/',
-            r'mailto:',
-            r'javascript:',
-            r'#',
-            r'\?print'
-        ]
-        
-        return not any(re.search(pattern, url_lower) for pattern in skip_patterns)
-
-    def _extract_description_safely(self, soup: BeautifulSoup) -> str:
-        """Safely extract page description"""
-        try:
-            # Meta description
-            meta_desc = soup.find('meta', attrs={'name': 'description'})
-            if meta_desc and meta_desc.get('content'):
-                return meta_desc.get('content').strip()
-            
-            # First paragraph
-            first_p = soup.find('p')
-            if first_p:
-                text = first_p.get_text(strip=True)
-                return text[:200] + "..." if len(text) > 200 else text
-            
-            return "No description available"
-        except:
-            return "No description available"
-
-    def _extract_keywords_safely(self, soup: BeautifulSoup) -> List[str]:
-        """Safely extract keywords"""
-        try:
-            keywords = []
-            
-            # Meta keywords
-            meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-            if meta_keywords and meta_keywords.get('content'):
-                keywords.extend([k.strip() for k in meta_keywords.get('content').split(',')][:5])
-            
-            # From headers
-            for header in soup.find_all(['h1', 'h2', 'h3'])[:3]:
-                text = header.get_text(strip=True).lower()
-                words = re.findall(r'\b[a-zA-Z]{3,}\b', text)
-                keywords.extend(words[:2])
-            
-            return list(set(keywords))[:10]
-        except:
-            return []
+        return self.url_rules.is_valid(url)
 
     def _classify_page_type(self, url: str, title: str) -> str:
         """Classify page type"""
-        url_lower = url.lower()
-        title_lower = title.lower()
-        
-        if '/subject/' in url_lower:
-            return 'statistics_subject'
-        elif '/publication' in url_lower:
-            return 'publication'
-        elif '/pressrelease' in url_lower or '/news' in url_lower:
-            return 'news'
-        elif '/statictable' in url_lower:
-            return 'statistics_table'
-        elif any(word in title_lower for word in ['tabel', 'data', 'statistik']):
-            return 'statistics_data'
-        elif any(word in title_lower for word in ['publikasi', 'laporan']):
-            return 'publication'
-        else:
-            return 'general'
+        return self.url_rules.classify(url, title)
 
-    def _save_to_file(self, data: Dict):
-        """Save data to JSON file"""
+    def _save_to_file(self, data: Dict) -> bool:
+        """Save data to JSON file, replacing the old one only once it is complete"""
         try:
-            with open(self.output_file, 'w', encoding='utf-8') as f:
+            with atomic_open(self.output_file) as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
             self.logger.info(f"Data saved to {self.output_file}")
+            return True
         except Exception as e:
             self.logger.error(f"Error saving to file: {e}")
+            return False
+
+
+def _scrape_settings(options: Dict) -> Dict:
+    """Scraper keyword arguments from the `scrape` CLI options"""
+    rate = tuple(float(bound) for bound in str(options.get("rate", "0.125-2")).split("-", 1))
+    bloom_capacity = None
+    if "bloom" in options:
+        # Seen set as a fixed-size Bloom filter, sized for this many URLs
+        bloom_capacity = int(options["bloom"]) if isinstance(options["bloom"], str) else 1_000_000
+    return {
+        "http_first": "chrome-only" not in options,
+        "state_file": None if "no-state" in options else options.get("state", "crawl_state.db"),
+        "workers": int(options.get("workers", 1)),
+        "rate": (rate[0], rate[-1]),
+        "output_format": options.get("format", "json"),
+        "archive_file": options.get("record") or None,
+        "bloom_capacity": bloom_capacity,
+        "session_dir": _session_dir(options),
+    }
+
+
+def _session_dir(options: Dict) -> Optional[str]:
+    """Browser session directory from --session[=dir] / --no-session (kept by default)"""
+    if "no-session" in options:
+        return None
+    return options["session"] if isinstance(options.get("session"), str) else SESSION_DIR
 
 
 def main():
@@ -550,21 +1004,44 @@ def main():
         
         if command == "test":
             print("🔧 Testing Undetected Chrome connection...")
-            scraper = UndetectedBPSMedanScraper(output_file, headless=False)
+            _, options = split_cli_args(sys.argv[2:])
+            scraper = UndetectedBPSMedanScraper(output_file, headless=False, session_dir=_session_dir(options))
             success = scraper.test_connection_advanced()
             
         elif command == "test-headless":
             print("🔧 Testing Undetected Chrome connection (headless)...")
-            scraper = UndetectedBPSMedanScraper(output_file, headless=True)
+            _, options = split_cli_args(sys.argv[2:])
+            scraper = UndetectedBPSMedanScraper(output_file, headless=True, session_dir=_session_dir(options))
             success = scraper.test_connection_advanced()
             
         elif command == "scrape":
-            max_pages = int(sys.argv[2]) if len(sys.argv) > 2 else 20
-            print(f"🚀 Starting Undetected Chrome scraping (max {max_pages} pages)...")
-            print("⚠️  This will take a while due to anti-bot protection...")
+            positional, options = split_cli_args(sys.argv[2:])
+            max_pages = int(positional[0]) if positional else 20
+            settings = _scrape_settings(options)
+            if settings["output_format"] == "ndjson":
+                output_file = ndjson_path_for(output_file)
+            profile_file = options.get("profile")
             
-            scraper = UndetectedBPSMedanScraper(output_file, headless=True)
-            result = scraper.scrape_with_undetected_chrome(max_pages=max_pages)
+            if "pool" in options:
+                # Run the job on the drivers of a `browser-pool` daemon, already started and warm
+                socket_path = options["pool"] if isinstance(options["pool"], str) else WARM_POOL_SOCKET
+                print(f"🚀 Sending scrape job (max {max_pages} pages) to the warm browser pool at {socket_path}...")
+                profile_file = None  # the job runs in the daemon's process
+                response = submit_job(socket_path, {"id": 1, "max_pages": max_pages, "options": options})
+                if "error" in response:
+                    print(f"❌ {response['error']}")
+                    return
+                result = response["result"]
+            else:
+                print(f"🚀 Starting Undetected Chrome scraping (max {max_pages} pages)...")
+                print("⚠️  This will take a while due to anti-bot protection...")
+                scraper = UndetectedBPSMedanScraper(output_file, headless=True, **settings)
+                if profile_file:
+                    # Whole-crawl cProfile dump, e.g. `python -m pstats crawl_profile.prof`
+                    profile_file = profile_file if isinstance(profile_file, str) else "crawl_profile.prof"
+                    result = run_profiled(scraper.scrape_with_undetected_chrome, profile_file, max_pages=max_pages)
+                else:
+                    result = scraper.scrape_with_undetected_chrome(max_pages=max_pages)
             
             print(f"\n{'='*60}")
             print(f"SCRAPING COMPLETED")
@@ -573,13 +1050,190 @@ def main():
             print(f"❌ Errors: {result.get('error_count', 0)}")
             print(f"📈 Success rate: {result.get('success_rate', 'N/A')}")
             print(f"💾 Output: {output_file}")
+            memory = result.get("memory")
+            if memory:
+                print(f"🧠 Seen set: {memory['urls']} URLs, {memory['seen_bytes_per_url']} bytes/URL; "
+                      f"records: {memory['record_bytes_per_page']} bytes/page")
+            for stage, summary in result.get("stage_timings_ms", {}).items():
+                print(f"⏱️  {stage:<8} p50 {summary['p50']:>9.2f} ms   p95 {summary['p95']:>9.2f} ms   max {summary['max']:>9.2f} ms")
+            if profile_file:
+                print(f"🧪 Profile: {profile_file}")
             
-        else:
+        elif command == "browser-pool":
+            # Chrome drivers started once and kept warm for `scrape --pool` jobs
+            _, options = split_cli_args(sys.argv[2:])
+            socket_path = options["socket"] if isinstance(options.get("socket"), str) else WARM_POOL_SOCKET
+            session_dir = _session_dir(options)
+            started_at = time.time()
+            host = UndetectedBPSMedanScraper(output_file, headless=True, http_first=False, session_dir=session_dir,
+                                             workers=int(options.get("workers", 1)))
+            if not host._ensure_browser_pool():
+                print("❌ Failed to setup undetected Chrome driver")
+                return
+            pool = host.browser_pool
+            
+            def run_job(pool: ChromeWorkerPool, job: Dict) -> Dict:
+                settings = _scrape_settings(job.get("options") or {})
+                # The drivers and their session were fixed when the pool started
+                settings.pop("workers")
+                settings["session_dir"] = session_dir
+                job_file = ndjson_path_for(output_file) if settings["output_format"] == "ndjson" else output_file
+                scraper = UndetectedBPSMedanScraper(job_file, headless=True, browser_pool=pool, **settings)
+                return scraper.scrape_with_undetected_chrome(max_pages=int(job.get("max_pages", 20)))
+            
+            print(f"🔥 {pool.size} warm Chrome driver(s) ready in {time.time() - started_at:.1f}s, "
+                  f"waiting for jobs on {socket_path}")
+            try:
+                serve_warm_pool(pool, socket_path, run_job)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                print("🔄 Closing browsers...")
+                pool.close()
+            
+        elif command == "replay":
+            # Crawl a local stand-in for the site, served from a recorded archive
+            positional, options = split_cli_args(sys.argv[2:])
+            if not positional:
+                print("Usage: python bps_scraper.py replay <archive> [max_pages] [--latency=MIN-MAX] [--challenge=RATE]")
+                return
+            max_pages = int(positional[1]) if len(positional) > 1 else 20
+            latency_ms = tuple(float(bound) for bound in str(options.get("latency", "0-0")).split("-", 1))
+            replay_file = options.get("output", "public/bps_replay_index.json")
+            workers = int(options.get("workers", 1))
+            # Challenged pages are retried against the replay, not loaded in Chrome
+            browser_pool = ReplayBrowserPool(workers)
+            with ReplayServer(positional[0], latency=(latency_ms[0] / 1000, latency_ms[-1] / 1000),
+                              challenge_rate=float(options.get("challenge", 0))) as server:
+                print(f"🔁 Replaying {len(server.archive)} archived pages at {server.base_url}")
+                scraper = UndetectedBPSMedanScraper(replay_file, headless=True,
+                                                    workers=workers,
+                                                    rate=(1000, 1000),
+                                                    base_url=server.base_url,
+                                                    browser_pool=browser_pool)
+                try:
+                    result = scraper.scrape_with_undetected_chrome(max_pages=max_pages, start_delay=0)
+                finally:
+                    browser_pool.close()
+                print(json.dumps({key: value for key, value in result.items() if key != "urls"}, indent=2))
+                print(json.dumps({"replay": server.stats}, indent=2))
+            
+        elif command == "crawl-sites":
+            # One index shard per BPS site, several sites crawled at once
+            positional, options = split_cli_args(sys.argv[2:])
+            max_pages = int(positional[0]) if positional else 20
+            sites = load_site_list(options.get("sites") if isinstance(options.get("sites"), str) else None)
+            shard_dir = options.get("shard-dir", SHARD_DIR)
+            rate = tuple(float(bound) for bound in str(options.get("rate", "0.125-2")).split("-", 1))
+            print(f"🌐 Crawling {len(sites)} sites into {shard_dir} (max {max_pages} pages each)...")
+            results = crawl_sites(sites, shard_dir, max_pages=max_pages, parallel=int(options.get("parallel", 4)),
+                                  state="no-state" not in options, output_format=options.get("format", "json"),
+                                  workers=int(options.get("workers", 1)), rate=(rate[0], rate[-1]))
+            for name, result in results.items():
+                print(f"  {name:<24} {result.get('total_urls', 0):>5} pages   "
+                      f"{result.get('error_count', 0):>4} errors   {result.get('error', '')}")
+            
+        elif command == "serve":
+            # Long-lived query daemon: NDJSON requests in, NDJSON results out
+            serve(sys.argv[2:], output_file)
+            
+        elif command == "build-index":
+            # Compile the crawled records into the memory-mappable binary index
+            positional, _ = split_cli_args(sys.argv[2:])
+            source_file = positional[0] if positional else resolve_index_file(output_file)
+            if source_file.endswith(".bin"):
+                source_file = output_file
+            target_file = positional[1] if len(positional) > 1 else binary_path_for(output_file)
+            stats = build_binary_index(load_records(source_file), target_file)
+            publish_generation(target_file, next_generation(target_file), rebuilt="index")
+            print(f"📦 Built {target_file} from {source_file}")
+            print(json.dumps(stats, indent=2))
+            
+        elif command == "build-vectors":
+            # Embed pages and their chunks for semantic (vector/hybrid) search
+            positional, options = split_cli_args(sys.argv[2:])
+            if "shards" in options:
+                shard_dir = options["shards"] if isinstance(options["shards"], str) else SHARD_DIR
+                router = ShardRouter(shard_dir)
+                targets = [(searcher.index_file, shard_path(shard_dir, name)) for name, searcher in router.shards.items()]
+                router.close()
+            else:
+                targets = [(positional[0] if positional else resolve_index_file(output_file), output_file)]
+            for source_file, base_file in targets:
+                if source_file.endswith(".bin"):
+                    source_file = base_file
+                target = vector_path_for(base_file)
+                chunk_file = chunk_path_for(base_file)
+                chunk_store = ChunkStore(chunk_file) if os.path.exists(chunk_file) else None
+                try:
+                    stats = build_vector_index(load_records(source_file), target, chunk_store)
+                finally:
+                    if chunk_store:
+                        chunk_store.close()
+                publish_generation(base_file, next_generation(base_file), rebuilt="vectors")
+                print(f"🧭 Built {target}.npy from {source_file}")
+                print(json.dumps(stats, indent=2))
+            
+        elif command == "inspect-index":
+            positional, options = split_cli_args(sys.argv[2:])
+            index = MmapIndex(positional[0] if positional else binary_path_for(output_file))
+            print(json.dumps(index.stats(), indent=2))
+            if "query" in options:
+                for doc_id, score in index.search(str(options["query"])):
+                    print(f"  {score:7.3f}  {index.record(doc_id)['title'][:60]}")
+            index.close()
+            
+        elif command == "lookup":
+            # Direct numeric answer from the statistics table store
+            positional, options = split_cli_args(sys.argv[2:])
+            table_file = table_path_for(output_file)
+            if not TableStore.exists(table_file):
+                print(f"No table store at {table_file}; crawl statistics tables first")
+                return
+            store = TableStore(table_file)
+            for fact in store.lookup(" ".join(positional), int(options.get("limit", 5))):
+                print(f"📊 {fact['indicator']} · {fact['region'] or '-'} · {fact['year'] or '-'}: {fact['value']:,.2f}")
+                print(f"   {fact['url']}")
+            
+        elif command in ("help", "--help", "-h"):
             print("Usage: python undetected_scraper.py [command]")
             print("Commands:")
             print("  test              - Test connection (visible browser)")
             print("  test-headless     - Test connection (headless)")
-            print("  scrape [max_pages] - Scrape website (default: 20 pages)")
+            print("                      (both take [--session=dir | --no-session])")
+            print("  scrape [max_pages] [--chrome-only] [--state=path | --no-state]")
+            print("                    [--workers=N] [--rate=START-MAX] [--format=json|ndjson] [--profile[=file]]")
+            print("                    [--record=archive.warc] [--bloom[=capacity]] [--session=dir | --no-session]")
+            print("                    [--pool[=socket]]")
+            print("                    - Scrape website (default: 20 pages), resuming/updating crawl state;")
+            print("                      N parallel Chrome workers; pages/sec per host adapts from START up to MAX;")
+            print("                      --bloom keeps the seen-URL set in a fixed-size Bloom filter;")
+            print(f"                      Chrome profiles and cookies persist in {SESSION_DIR}/ unless --no-session;")
+            print("                      --pool runs the job on a running browser-pool")
+            print("  browser-pool [--workers=N] [--socket=path] [--session=dir | --no-session]")
+            print("                    - Keep Chrome drivers warm between scrape jobs (scrape --pool)")
+            print("  replay <archive> [max_pages] [--latency=MIN-MAX] [--challenge=RATE]")
+            print("                    - Crawl a local stand-in site served from a recorded archive (latency in ms)")
+            print("  crawl-sites [max_pages] [--sites=a,b | --sites=file] [--parallel=N] [--shard-dir=path]")
+            print("                    - Crawl BPS kabupaten/kota sites concurrently, one index shard per site")
+            print("                      (default: every North Sumatra site)")
+            print("  serve [--socket[=path]] [--shards[=dir]] - Answer NDJSON queries on stdin (or a Unix socket,")
+            print("                      default bps_scraper.sock), optionally routed over the per-site shards;")
+            print("                      `python bps_serve.py` does the same without loading Chrome")
+            print("  build-index [source] [target] - Compile the index into the binary mmap format")
+            print("  build-vectors [source] [--shards[=dir]] - Embed the index (or every shard) for semantic search")
+            print("  inspect-index [path] [--query=text] - Show binary index statistics")
+            print("  lookup <query> [--limit=N] - Answer from statistics tables, e.g. lookup penduduk medan 2023")
+            print("  <keyword> [--mode=bm25|vector|hybrid] - Search the scraped index and print JSON results")
+            
+        else:
+            # Any other argument is a search query over the scraped index
+            positional, options = split_cli_args(sys.argv[1:])
+            query = " ".join(positional)
+            searcher = IndexSearcher(resolve_index_file(output_file), chunk_file=chunk_path_for(output_file),
+                                     vector_file=vector_path_for(output_file))
+            mode = options.get("mode", "bm25")
+            print(json.dumps(searcher.search(query, passages=2, mode=mode), ensure_ascii=False))
     else:
         print("🔧 Undetected Chrome BPS Scraper")
         print("=" * 40)
@@ -0,0 +1,524 @@
+import json
+import math
+import os
+import re
+import sys
+import heapq
+import socketserver
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import List, Dict, Optional, TextIO, Tuple
+
+from bps_output import NdjsonIndexReader, ndjson_path_for
+
+
+RESULT_FIELDS = ("title", "url", "description", "type")
+
+# bm25: keyword match; vector: embedding similarity; hybrid: both, rank-fused
+SEARCH_MODES = ("bm25", "vector", "hybrid")
+
+# Common Indonesian function words that carry no search signal
+INDONESIAN_STOPWORDS = frozenset([
+    "yang", "dan", "di", "ke", "dari", "dengan", "untuk", "pada", "dalam",
+    "ini", "itu", "atau", "adalah", "oleh", "sebagai", "juga", "akan",
+    "berapa", "apa", "bagaimana", "tentang", "the", "of", "and", "in",
+])
+
+# Field weights: a hit in the title is worth more than one in the description
+FIELD_WEIGHTS = {"title": 3, "keywords": 2, "description": 1, "type": 1}
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+_PARTICLE_SUFFIXES = ("nya", "lah", "kah")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split Indonesian text into normalized search terms"""
+    tokens = []
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        for suffix in _PARTICLE_SUFFIXES:
+            if len(token) > len(suffix) + 3 and token.endswith(suffix):
+                token = token[:-len(suffix)]
+                break
+        if len(token) > 1 and token not in INDONESIAN_STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Inverted index over page records with precomputed BM25 impacts"""
+
+    def __init__(self, records: List[Dict], k1: float = 1.2, b: float = 0.75):
+        self.records = records
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        self._build()
+
+    def _build(self):
+        """Tokenize every record and fold term statistics into per-posting scores"""
+        term_freqs = []
+        doc_lengths = []
+        doc_freq: Counter = Counter()
+
+        for record in self.records:
+            counts: Counter = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                value = record.get(field, "")
+                if isinstance(value, list):
+                    value = " ".join(value)
+                for term in tokenize(value):
+                    counts[term] += weight
+            term_freqs.append(counts)
+            doc_lengths.append(sum(counts.values()))
+            doc_freq.update(counts.keys())
+
+        doc_count = len(self.records)
+        avg_length = (sum(doc_lengths) / doc_count) if doc_count else 0.0
+
+        idf = {
+            term: math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for doc_id, counts in enumerate(term_freqs):
+            norm = self.k1 * (1 - self.b + self.b * doc_lengths[doc_id] / avg_length) if avg_length else self.k1
+            for term, tf in counts.items():
+                impact = idf[term] * tf * (self.k1 + 1) / (tf + norm)
+                postings.setdefault(term, []).append((doc_id, impact))
+
+        # Highest impact first, so single-term queries are a slice
+        for term_postings in postings.values():
+            term_postings.sort(key=lambda posting: posting[1], reverse=True)
+
+        self.postings = postings
+
+    def __len__(self) -> int:
+        """Number of records in the index"""
+        return len(self.records)
+
+    def record(self, doc_id: int) -> Dict:
+        """Record by index"""
+        return self.records[doc_id]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Return (record index, score) pairs for the best-matching records"""
+        terms = set(tokenize(query))
+        if len(terms) == 1:
+            return self.postings.get(terms.pop(), [])[:limit]
+
+        scores: Dict[int, float] = {}
+        for term in terms:
+            for doc_id, impact in self.postings.get(term, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + impact
+
+        if not scores:
+            return []
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+def binary_path_for(output_file: str) -> str:
+    """Binary (memory-mappable) sibling of a .json index path"""
+    return os.path.splitext(output_file)[0] + ".bin"
+
+
+def load_records(index_file: str) -> List[Dict]:
+    """Read page records from a JSON or NDJSON index"""
+    if not os.path.exists(index_file):
+        return []
+    if index_file.endswith(".ndjson"):
+        return list(NdjsonIndexReader(index_file))
+    with open(index_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get("urls", []) if isinstance(data, dict) else []
+
+
+def index_siblings(output_file: str) -> Tuple[str, str, str]:
+    """The JSON, NDJSON and binary forms of an index, given the path of any of them"""
+    root, extension = os.path.splitext(output_file)
+    json_file = output_file if extension not in (".ndjson", ".bin") else root + ".json"
+    return json_file, ndjson_path_for(output_file), binary_path_for(output_file)
+
+
+def resolve_index_file(output_file: str) -> str:
+    """Pick the freshest of the JSON index and its NDJSON and binary siblings"""
+    candidates = [path for path in index_siblings(output_file) if os.path.exists(path)]
+    if not candidates:
+        return output_file
+    return max(candidates, key=os.path.getmtime)
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """(mtime_ns, size, inode) of a file, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class QueryCache:
+    """Bounded LRU cache of query results with a time-to-live per entry"""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple, Tuple[float, List[Dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(keyword: str, limit: int, passages: int, mode: str = "bm25") -> Tuple:
+        """Normalized cache key: the query's distinct search terms, order-independent"""
+        return tuple(sorted(set(tokenize(keyword)))), limit, passages, mode
+
+    def get(self, key: Tuple) -> Optional[List[Dict]]:
+        """Cached results for the key, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple, results: List[Dict]):
+        """Store results, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (the counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class IndexSnapshot:
+    """One loaded generation of the index and its side files; never changed after it is built"""
+
+    def __init__(self, index, vectors=None, tables=None, generation: int = 0, signature=None, chunks=None):
+        self.index = index
+        self.vectors = vectors
+        self.tables = tables
+        self.chunks = chunks
+        self.generation = generation
+        self.signature = signature
+
+
+class IndexSearcher:
+    """Query engine over the scraped page records, loaded once and kept in memory.
+
+    The loaded index, chunk store, vector index and table store form an
+    immutable snapshot. When a crawl publishes a new generation the next snapshot is
+    built in a background thread and swapped in by reference, so queries
+    already running finish on the snapshot they started with.
+    """
+
+    # Seconds between index file freshness checks on the query path
+    CHECK_INTERVAL = 1.0
+
+    def __init__(self, index_file: str = "public/bps_undetected_index.json", chunk_file: Optional[str] = None,
+                 cache: Optional[QueryCache] = None, vector_file: Optional[str] = None,
+                 table_file: Optional[str] = None):
+        self.index_file = index_file
+        self.chunk_file = chunk_file
+        self.vector_file = vector_file
+        self.table_file = table_file
+        self.cache = cache if cache is not None else QueryCache()
+        self._snapshot = IndexSnapshot(BM25Index([]))
+        self._reload_lock = threading.Lock()
+        self._checked_at = 0.0
+        self.load()
+
+    @property
+    def index(self):
+        """Page index of the current snapshot"""
+        return self._snapshot.index
+
+    @property
+    def chunks(self):
+        """Passage store of the current snapshot, or None"""
+        return self._snapshot.chunks
+
+    @property
+    def vectors(self):
+        """Vector index of the current snapshot, or None"""
+        return self._snapshot.vectors
+
+    @property
+    def tables(self):
+        """Table store of the current snapshot, or None"""
+        return self._snapshot.tables
+
+    @property
+    def generation(self) -> int:
+        """Published generation being served (0 for an index without a generation marker)"""
+        return self._snapshot.generation
+
+    def load(self):
+        """Load the scraped index from disk and swap it in"""
+        with self._reload_lock:
+            self._swap_in()
+
+    def _swap_in(self):
+        """Build a snapshot of what is on disk now and make it the current one"""
+        self._checked_at = time.monotonic()
+        snapshot = self._build_snapshot()
+        self._snapshot = snapshot
+        self.cache.clear()
+
+    def _build_snapshot(self) -> IndexSnapshot:
+        """Load the index, vector index and table store into a new snapshot"""
+        from bps_publish import read_generation
+        # Read the marker first: files published after it belong to a later generation and trigger another reload
+        signature = self._disk_signature()
+        generation = read_generation(self.index_file)["generation"]
+        # A new generation may have been published in another form (JSON over an older .bin)
+        self.index_file = resolve_index_file(self.index_file)
+        if self.index_file.endswith(".bin") and os.path.exists(self.index_file):
+            # Compiled index: mapped, not parsed, so opening it is O(1)
+            from bps_binindex import MmapIndex
+            index = MmapIndex(self.index_file)
+        else:
+            index = BM25Index(load_records(self.index_file))
+
+        chunks = None
+        if self.chunk_file and os.path.exists(self.chunk_file):
+            from bps_content import ChunkStore
+            # Opened per generation: the published file is replaced by rename, and this
+            # connection keeps reading the generation it was opened on
+            chunks = ChunkStore(self.chunk_file, read_only=True)
+
+        vectors = None
+        if self.vector_file:
+            from bps_vectors import VectorIndex
+            if VectorIndex.exists(self.vector_file):
+                vectors = VectorIndex(self.vector_file)
+        tables = None
+        if self.table_file:
+            from bps_tables import TableStore
+            if TableStore.exists(self.table_file):
+                tables = TableStore(self.table_file)
+        return IndexSnapshot(index, vectors, tables, generation, signature, chunks)
+
+    def _disk_signature(self) -> Tuple:
+        """What a reload is keyed on: the generation marker once there is one, else the files themselves"""
+        from bps_publish import generation_path_for
+        marker = file_signature(generation_path_for(self.index_file))
+        if marker is not None:
+            return "generation", marker
+        # Without a marker the vector index and table store are rebuilt separately from the index
+        return ("files", *(file_signature(path) for path in index_siblings(self.index_file)),
+                file_signature(self.chunk_file) if self.chunk_file else None,
+                file_signature(self.vector_file + ".json") if self.vector_file else None,
+                file_signature(self.table_file + ".json") if self.table_file else None)
+
+    def __len__(self) -> int:
+        """Number of indexed records"""
+        return len(self._snapshot.index)
+
+    def stats(self) -> Dict:
+        """Index size, generation and cache counters"""
+        snapshot = self._snapshot
+        return {"records": len(snapshot.index), "generation": snapshot.generation,
+                "reloading": self._reload_lock.locked(), "cache": self.cache.stats(),
+                "vectors": len(snapshot.vectors) if snapshot.vectors is not None else 0,
+                "table_facts": len(snapshot.tables) if snapshot.tables is not None else 0}
+
+    def _reload_if_changed(self):
+        """Start a background reload when a new generation (or changed index file) is on disk"""
+        now = time.monotonic()
+        if now - self._checked_at < self.CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        if self._disk_signature() == self._snapshot.signature or self._reload_lock.locked():
+            return
+        threading.Thread(target=self._reload_in_background, daemon=True).start()
+
+    def _reload_in_background(self):
+        """Build and swap in the new snapshot unless another reload is already doing it"""
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            if self._disk_signature() != self._snapshot.signature:
+                self._swap_in()
+        except Exception as e:
+            # Keep serving the current snapshot; the next check retries
+            print(f"Index reload failed: {e}", file=sys.stderr)
+        finally:
+            self._reload_lock.release()
+
+    def search(self, keyword: str, limit: int = 10, passages: int = 0, mode: str = "bm25") -> List[Dict]:
+        """Return the top-k records for the keyword, served from the cache when possible.
+
+        mode is "bm25" (keyword match), "vector" (embedding similarity) or
+        "hybrid" (both rankings merged); without a vector index every mode is bm25.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"unknown search mode {mode!r}, expected one of {', '.join(SEARCH_MODES)}")
+        self._reload_if_changed()
+        # Everything below reads this one snapshot, even if a reload swaps in the next one meanwhile
+        snapshot = self._snapshot
+        if snapshot.vectors is None:
+            mode = "bm25"
+        key = self.cache.key(keyword, limit, passages, mode) + (snapshot.generation,)
+        results = self.cache.get(key)
+        if results is None:
+            results = self._search(snapshot, keyword, limit, passages, mode)
+            if snapshot is self._snapshot:
+                self.cache.put(key, results)
+        return results
+
+    def lookup(self, keyword: str, limit: int = 5) -> List[Dict]:
+        """Table facts answering the query directly (empty without a table store)"""
+        self._reload_if_changed()
+        tables = self._snapshot.tables
+        return tables.lookup(keyword, limit) if tables is not None else []
+
+    def _search(self, snapshot: IndexSnapshot, keyword: str, limit: int, passages: int,
+                mode: str = "bm25") -> List[Dict]:
+        """Rank records for the keyword, optionally with matching passages.
+
+        Each result carries its ranking score, so results from several
+        searchers (e.g. index shards) can be merged.
+        """
+        by_url: Dict[str, Dict] = {}
+        scores: Dict[str, float] = {}
+        best_chunk: Dict[str, int] = {}
+        rankings = []
+        if mode in ("bm25", "hybrid"):
+            ranking = []
+            for doc_id, score in snapshot.index.search(keyword, limit):
+                record = _public_fields(snapshot.index.record(doc_id))
+                by_url.setdefault(record["url"], record)
+                scores.setdefault(record["url"], score)
+                ranking.append(record["url"])
+            rankings.append(ranking)
+        if mode in ("vector", "hybrid"):
+            ranking = []
+            for page_index, score, chunk_seq in snapshot.vectors.search(keyword, limit):
+                record = _public_fields(snapshot.vectors.record(page_index))
+                by_url.setdefault(record["url"], record)
+                scores.setdefault(record["url"], score)
+                best_chunk[record["url"]] = chunk_seq
+                ranking.append(record["url"])
+            rankings.append(ranking)
+
+        if len(rankings) == 1:
+            urls = rankings[0]
+        else:
+            from bps_vectors import reciprocal_rank_fusion
+            urls, scores = reciprocal_rank_fusion(rankings)
+        results = [dict(by_url[url], score=round(float(scores[url]), 6)) for url in urls[:limit]]
+
+        if passages and snapshot.chunks:
+            for result in results:
+                found = snapshot.chunks.best_passages(result["url"], keyword, limit=passages)
+                if not found and best_chunk.get(result["url"], -1) >= 0:
+                    # No shared terms, but the embedding matched one of the page's chunks
+                    stored = snapshot.chunks.passages(result["url"])
+                    found = [passage for passage in stored if passage["seq"] == best_chunk[result["url"]]]
+                result["passages"] = [passage["text"] for passage in found]
+        return results
+
+
+def _public_fields(record: Dict) -> Dict:
+    """Reduce a page record to the fields the chatbot consumes"""
+    return {field: record.get(field, "") for field in RESULT_FIELDS}
+
+
+def handle_request_line(searcher, line: str) -> Optional[Dict]:
+    """Answer one newline-delimited JSON query against an IndexSearcher or ShardRouter"""
+    line = line.strip()
+    if not line:
+        return None
+
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as e:
+        return {"id": None, "error": f"invalid json: {e}"}
+
+    if not isinstance(request, dict):
+        return {"id": None, "error": "request must be a JSON object"}
+
+    request_id = request.get("id")
+    try:
+        if request.get("command") == "reload":
+            searcher.load()
+            return {"id": request_id, "ok": True, "records": len(searcher)}
+        if request.get("command") == "stats":
+            return dict(id=request_id, **searcher.stats())
+        if request.get("command") == "lookup":
+            # Direct numeric answer from the statistics table store
+            return {"id": request_id, "facts": searcher.lookup(request.get("keyword", ""),
+                                                                 int(request.get("limit", 5)))}
+
+        options = {
+            "limit": int(request.get("limit", 10)),
+            "passages": int(request.get("passages", 0)),
+            "mode": request.get("mode", "bm25"),
+        }
+        if request.get("shards"):
+            # Only a shard router understands this; a single index rejects it below
+            options["shards"] = request["shards"]
+        results = searcher.search(request.get("keyword", ""), **options)
+        return {"id": request_id, "results": results}
+    except Exception as e:
+        return {"id": request_id, "error": str(e)}
+
+
+def serve_stream(searcher, instream: TextIO = sys.stdin, outstream: TextIO = sys.stdout):
+    """Serve NDJSON queries from a stream until EOF"""
+    for line in instream:
+        response = handle_request_line(searcher, line)
+        if response is None:
+            continue
+        outstream.write(json.dumps(response, ensure_ascii=False) + "\n")
+        outstream.flush()
+
+
+def serve_unix_socket(searcher, socket_path: str):
+    """Serve NDJSON queries on a local Unix socket, one connection per client"""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    class _Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw_line in self.rfile:
+                response = handle_request_line(searcher, raw_line.decode('utf-8'))
+                if response is None:
+                    continue
+                self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode('utf-8'))
+                self.wfile.flush()
+
+    class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    with _Server(socket_path, _Handler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
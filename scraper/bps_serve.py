@@ -0,0 +1,61 @@
+import sys
+from typing import Dict, List
+
+from bps_content import chunk_path_for
+from bps_search import IndexSearcher, resolve_index_file, serve_stream, serve_unix_socket
+from bps_shards import SHARD_DIR, ShardRouter
+from bps_tables import table_path_for
+from bps_vectors import vector_path_for
+
+# Query server entry point. It only loads the query engine, so starting it
+# (e.g. from the chatbot server) does not import the crawler's Chrome stack.
+
+INDEX_FILE = "public/bps_undetected_index.json"
+# Default Unix socket of `serve --socket`
+QUERY_SOCKET = "bps_scraper.sock"
+
+USAGE = "python bps_serve.py [--shards[=dir]] [--socket[=path] | --socket path]"
+
+
+def split_cli_args(args: List[str]):
+    """Split CLI arguments into positionals and --key[=value] options"""
+    positional = []
+    options: Dict = {}
+    for arg in args:
+        if arg.startswith("--"):
+            key, _, value = arg[2:].partition("=")
+            options[key] = value if value else True
+        else:
+            positional.append(arg)
+    return positional, options
+
+
+def serve(args: List[str], output_file: str = INDEX_FILE):
+    """Long-lived query daemon: NDJSON requests in, NDJSON results out (stdin/stdout or a Unix socket)"""
+    positional, options = split_cli_args(args)
+    if "shards" in options:
+        # Route queries over per-site shards instead of the single index
+        shard_dir = options["shards"] if isinstance(options["shards"], str) else SHARD_DIR
+        searcher = ShardRouter(shard_dir)
+    else:
+        searcher = IndexSearcher(resolve_index_file(output_file), chunk_file=chunk_path_for(output_file),
+                                 vector_file=vector_path_for(output_file),
+                                 table_file=table_path_for(output_file))
+    if "socket" in options:
+        socket_path = options["socket"]
+        if not isinstance(socket_path, str):
+            # `--socket /path` or a bare `--socket`
+            socket_path = positional[0] if positional else QUERY_SOCKET
+        serve_unix_socket(searcher, socket_path)
+    else:
+        serve_stream(searcher)
+
+
+if __name__ == "__main__":
+    if any(arg in ("-h", "--help") for arg in sys.argv[1:]):
+        print(f"Usage: {USAGE}")
+        sys.exit(0)
+    try:
+        serve(sys.argv[1:])
+    except KeyboardInterrupt:
+        pass
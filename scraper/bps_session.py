@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import time
+from typing import Dict, Iterable, List, Optional
+
+from bps_publish import atomic_open
+
+SESSION_DIR = "browser_session"
+
+# Cookie attributes Network.setCookies accepts back from Network.getAllCookies
+_COOKIE_PARAMS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+
+_DRIVER_NAME = "undetected_chromedriver" + (".exe" if os.name == "nt" else "")
+
+
+class BrowserSession:
+    """Chrome state kept between runs: profiles, a cookie jar and the patched driver binary.
+
+    Layout of the session directory: profile-<n>/ is the user-data dir of
+    worker n (Chrome locks a profile to one process), cookies.json the
+    persistent cookies of every worker, so a cleared anti-bot challenge
+    carries over to the next run, and the patched chromedriver with
+    session.json (its Chrome major version), so uc.Chrome neither
+    downloads nor patches a driver on startup.
+    """
+
+    def __init__(self, session_dir: str = SESSION_DIR):
+        self.session_dir = session_dir
+        self.cookie_file = os.path.join(session_dir, "cookies.json")
+        self.meta_file = os.path.join(session_dir, "session.json")
+        self.driver_file = os.path.join(session_dir, _DRIVER_NAME)
+        os.makedirs(session_dir, exist_ok=True)
+        self.cookies = self._load_cookies()
+
+    def _load_cookies(self) -> List[Dict]:
+        """Stored cookies that have not expired yet"""
+        try:
+            with open(self.cookie_file, 'r', encoding='utf-8') as f:
+                cookies = json.load(f)
+        except (OSError, ValueError):
+            return []
+        now = time.time()
+        return [cookie for cookie in cookies if isinstance(cookie, dict) and cookie.get("expires", 0) > now]
+
+    def _load_meta(self) -> Dict:
+        try:
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def launch_options(self, index: int = 0) -> Dict:
+        """uc.Chrome keyword arguments for worker `index`: its profile, plus the cached driver when there is one"""
+        options = {"user_data_dir": os.path.abspath(os.path.join(self.session_dir, f"profile-{index}"))}
+        version_main = self._load_meta().get("version_main")
+        if version_main and os.path.exists(self.driver_file):
+            options["driver_executable_path"] = os.path.abspath(self.driver_file)
+            options["version_main"] = version_main
+        return options
+
+    def remember_driver(self, driver):
+        """Keep a copy of the driver binary uc.Chrome just patched (uc deletes its own on quit)"""
+        patcher = getattr(driver, "patcher", None)
+        source = getattr(patcher, "executable_path", None)
+        if not source or os.path.abspath(source) == os.path.abspath(self.driver_file) or not os.path.exists(source):
+            return
+        version = str((driver.capabilities or {}).get("browserVersion", "")).split(".")[0]
+        if not version.isdigit():
+            return
+        shutil.copy2(source, self.driver_file + ".tmp")
+        os.replace(self.driver_file + ".tmp", self.driver_file)
+        with atomic_open(self.meta_file) as f:
+            json.dump({"version_main": int(version)}, f)
+
+    def forget_driver(self):
+        """Drop the cached driver, e.g. after Chrome was updated past its version"""
+        for path in (self.driver_file, self.meta_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def restore_cookies(self, driver):
+        """Put the stored cookies into a freshly started driver"""
+        if self.cookies:
+            driver.execute_cdp_cmd('Network.setCookies', {"cookies": self.cookies})
+
+    def save_cookies(self, drivers: Iterable):
+        """Merge the persistent cookies of running drivers into the jar and write it"""
+        merged = {(cookie["domain"], cookie["path"], cookie["name"]): cookie for cookie in self.cookies}
+        for driver in drivers:
+            try:
+                found = driver.execute_cdp_cmd('Network.getAllCookies', {}).get("cookies", [])
+            except Exception:
+                continue  # the browser already died; its profile still holds what Chrome flushed
+            for cookie in found:
+                # Session cookies (expires -1) end with the browser, as they would in Chrome
+                if cookie.get("expires", -1) > 0:
+                    cookie = {key: cookie[key] for key in _COOKIE_PARAMS if key in cookie}
+                    merged[(cookie["domain"], cookie["path"], cookie["name"])] = cookie
+        now = time.time()
+        self.cookies = [cookie for cookie in merged.values() if cookie["expires"] > now]
+        with atomic_open(self.cookie_file) as f:
+            json.dump(self.cookies, f, indent=2)
+
+    def has_clearance(self, host: Optional[str]) -> bool:
+        """Whether the jar holds unexpired cookies for the host (a challenge was passed before)"""
+        host = host or ""
+        return any(host == cookie["domain"].lstrip(".") or host.endswith("." + cookie["domain"].lstrip("."))
+                   for cookie in self.cookies)
+
+    def apply_cookies(self, http_session):
+        """Hand the stored cookies to a requests session (the plain HTTP tier)"""
+        for cookie in self.cookies:
+            http_session.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"],
+                                     path=cookie.get("path", "/"))
@@ -0,0 +1,222 @@
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+from bps_content import chunk_path_for
+from bps_output import ndjson_path_for
+from bps_search import IndexSearcher, resolve_index_file, tokenize
+from bps_tables import table_path_for
+from bps_vectors import reciprocal_rank_fusion, vector_path_for
+
+
+SHARD_DIR = "public/shards"
+
+# BPS kabupaten/kota sites of North Sumatra: subdomain -> region name.
+# Override with --sites=a,b or a file of subdomains when the list changes.
+SUMUT_SITES = {
+    "medankota": "Medan",
+    "binjaikota": "Binjai",
+    "tebingtinggikota": "Tebing Tinggi",
+    "pematangsiantarkota": "Pematangsiantar",
+    "tanjungbalaikota": "Tanjungbalai",
+    "sibolgakota": "Sibolga",
+    "padangsidimpuankota": "Padangsidimpuan",
+    "gunungsitolikota": "Gunungsitoli",
+    "deliserdangkab": "Deli Serdang",
+    "langkatkab": "Langkat",
+    "karokab": "Karo",
+    "simalungunkab": "Simalungun",
+    "asahankab": "Asahan",
+    "labuhanbatukab": "Labuhanbatu",
+    "labuhanbatuselatankab": "Labuhanbatu Selatan",
+    "labuhanbatuutarakab": "Labuhanbatu Utara",
+    "dairikab": "Dairi",
+    "pakpakbharatkab": "Pakpak Bharat",
+    "samosirkab": "Samosir",
+    "tobakab": "Toba",
+    "taputkab": "Tapanuli Utara",
+    "taptengkab": "Tapanuli Tengah",
+    "tapselkab": "Tapanuli Selatan",
+    "humbanghasundutankab": "Humbang Hasundutan",
+    "mandailingnatalkab": "Mandailing Natal",
+    "padanglawaskab": "Padang Lawas",
+    "padanglawasutarakab": "Padang Lawas Utara",
+    "serdangbedagaikab": "Serdang Bedagai",
+    "batubarakab": "Batu Bara",
+    "niaskab": "Nias",
+    "niasselatankab": "Nias Selatan",
+    "niasutarakab": "Nias Utara",
+    "niasbaratkab": "Nias Barat",
+}
+
+# Region names span at most this many query words ("labuhanbatu selatan", "padang lawas utara")
+_MAX_REGION_WORDS = 3
+
+
+def site_url(site: str) -> str:
+    """Base URL for a site given as a subdomain, a host name or a URL"""
+    if "://" in site:
+        return site.rstrip("/")
+    host = site if "." in site else f"{site}.bps.go.id"
+    return f"https://{host}"
+
+
+def shard_name(site: str) -> str:
+    """Shard name of a site: the first label of its host, e.g. deliserdangkab"""
+    return urlsplit(site_url(site)).hostname.split(".", 1)[0]
+
+
+def shard_path(shard_dir: str, name: str) -> str:
+    """JSON index path of a shard"""
+    return os.path.join(shard_dir, f"{name}.json")
+
+
+def load_site_list(value: Optional[str] = None) -> List[str]:
+    """Sites from a file (one per line, # comments) or a comma-separated list; default all of SUMUT_SITES"""
+    if not value:
+        return list(SUMUT_SITES)
+    if os.path.isfile(value):
+        with open(value, 'r', encoding='utf-8') as f:
+            lines = [line.split("#", 1)[0].strip() for line in f]
+        return [line for line in lines if line]
+    return [site.strip() for site in value.split(",") if site.strip()]
+
+
+def _region_key(text: str) -> str:
+    """Region name as the search terms it is written with, joined: 'Deli Serdang' -> 'deliserdang'"""
+    return "".join(tokenize(text))
+
+
+def crawl_sites(sites: Iterable[str], shard_dir: str = SHARD_DIR, max_pages: int = 20, parallel: int = 4,
+                state: bool = True, output_format: str = "json", **scraper_options) -> Dict[str, Dict]:
+    """Crawl several BPS sites concurrently, each into its own index shard; returns run stats per shard"""
+    from bps_scraper import UndetectedBPSMedanScraper
+
+    os.makedirs(shard_dir, exist_ok=True)
+
+    def crawl(site: str) -> Dict:
+        name = shard_name(site)
+        output_file = shard_path(shard_dir, name)
+        if output_format == "ndjson":
+            output_file = ndjson_path_for(output_file)
+        scraper = UndetectedBPSMedanScraper(output_file, headless=True, base_url=site_url(site),
+                                            state_file=os.path.join(shard_dir, f"{name}_state.db") if state else None,
+                                            output_format=output_format, **scraper_options)
+        result = scraper.scrape_with_undetected_chrome(max_pages=max_pages, start_delay=0)
+        return {key: value for key, value in result.items() if key != "urls"}
+
+    sites = list(sites)
+    with ThreadPoolExecutor(max_workers=max(1, min(parallel, len(sites)))) as executor:
+        results = executor.map(crawl, sites)
+        return {shard_name(site): result for site, result in zip(sites, results)}
+
+
+class ShardRouter:
+    """Query engine over per-site index shards.
+
+    A query that names a region ("penduduk deli serdang") only goes to that
+    region's shard; anything else fans out to every shard in parallel. The
+    per-shard top-k lists are merged by score, so the work per query grows
+    with the shards it touches, not with the number of sites indexed.
+    """
+
+    def __init__(self, shard_dir: str = SHARD_DIR, max_workers: int = 8):
+        self.shard_dir = shard_dir
+        self.shards: Dict[str, IndexSearcher] = {}
+        self._regions: Dict[str, str] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.load()
+
+    def load(self):
+        """Discover the shards in the shard directory and (re)load each of them"""
+        names = set()
+        if os.path.isdir(self.shard_dir):
+            for filename in os.listdir(self.shard_dir):
+                name, extension = os.path.splitext(filename)
+                if extension in (".json", ".ndjson", ".bin") and not name.endswith(("_vectors", "_tables")):
+                    names.add(name)
+
+        shards = {}
+        for name in sorted(names):
+            searcher = self.shards.get(name)
+            if searcher is None:
+                base_file = shard_path(self.shard_dir, name)
+                searcher = IndexSearcher(resolve_index_file(base_file), chunk_file=chunk_path_for(base_file),
+                                         vector_file=vector_path_for(base_file),
+                                         table_file=table_path_for(base_file))
+            else:
+                searcher.load()
+            shards[name] = searcher
+        self.shards = shards
+
+        self._regions = {}
+        for name in shards:
+            if name in SUMUT_SITES:
+                self._regions[_region_key(SUMUT_SITES[name])] = name
+            for suffix in ("kab", "kota"):
+                if name.endswith(suffix):
+                    self._regions.setdefault(name[:-len(suffix)], name)
+
+    def __len__(self) -> int:
+        """Number of indexed records over all shards"""
+        return sum(len(searcher) for searcher in self.shards.values())
+
+    def route(self, keyword: str) -> List[str]:
+        """Shards whose region the query names, or every shard when it names none"""
+        tokens = tokenize(keyword)
+        matched = {}
+        for start in range(len(tokens)):
+            for end in range(start + 1, min(len(tokens), start + _MAX_REGION_WORDS) + 1):
+                key = "".join(tokens[start:end])
+                if key in self._regions:
+                    matched[key] = self._regions[key]
+        # "nias selatan" also contains "nias": keep only the most specific region
+        names = {name for key, name in matched.items()
+                 if not any(key != other and key in other for other in matched)}
+        return sorted(names) if names else list(self.shards)
+
+    def search(self, keyword: str, limit: int = 10, passages: int = 0, mode: str = "bm25",
+               shards: Optional[List[str]] = None) -> List[Dict]:
+        """Top-k records over the routed (or the given) shards, merged by rank.
+
+        Shard scores are not comparable (BM25 statistics differ per shard,
+        and a shard without vectors answers a vector query with BM25), so
+        the per-shard rankings are combined with reciprocal rank fusion.
+        """
+        names = [name for name in (shards or self.route(keyword)) if name in self.shards]
+        if not names:
+            return []
+        if len(names) == 1:
+            return self.shards[names[0]].search(keyword, limit, passages, mode)
+
+        futures = [self._executor.submit(self.shards[name].search, keyword, limit, passages, mode)
+                   for name in names]
+        shard_results = [future.result() for future in futures]
+        by_url = {result["url"]: result for results in shard_results for result in results}
+        urls, scores = reciprocal_rank_fusion([result["url"] for result in results] for results in shard_results)
+        return [dict(by_url[url], score=round(scores[url], 6)) for url in urls[:limit]]
+
+    def lookup(self, keyword: str, limit: int = 5) -> List[Dict]:
+        """Table facts from the routed shards, best lookup score first"""
+        names = [name for name in self.route(keyword) if name in self.shards]
+        futures = [self._executor.submit(self.shards[name].lookup, keyword, limit) for name in names]
+        facts = {}
+        for fact in heapq.merge(*(future.result() for future in futures), key=lambda fact: -fact["score"]):
+            # The same figure published by several sites is one answer
+            facts.setdefault((fact["indicator"], fact["region"], fact["year"], fact["value"]), fact)
+            if len(facts) == limit:
+                break
+        return list(facts.values())
+
+    def stats(self) -> Dict:
+        """Size and cache counters per shard"""
+        return {
+            "records": len(self),
+            "shards": {name: searcher.stats() for name, searcher in self.shards.items()},
+        }
+
+    def close(self):
+        """Stop the fan-out threads"""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,354 @@
+import json
+import math
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # the table store is optional; page search works without it
+    np = None
+
+from bps_publish import publish_file
+from bps_search import tokenize
+
+
+TABLE_FORMAT_VERSION = 1
+
+# One extracted number: (year or 0 when unknown, region or "", indicator, value)
+Fact = Tuple[int, str, str, float]
+
+_YEAR_RE = re.compile(r'\b(19[5-9]\d|20\d\d)\b')
+_YEAR_TOKEN_RE = re.compile(r'^(19[5-9]\d|20\d\d)$')
+_THOUSANDS_RE = re.compile(r'^\d{1,3}(?:\.\d{3})+$')
+_NUMBER_RE = re.compile(r'^-?\d+(?:\.\d+)?$')
+_TITLE_SUFFIX_RE = re.compile(r'\s+-\s+(?:Tabel Statis|Tabel Dinamis|Badan Pusat Statistik).*$', re.IGNORECASE)
+_TITLE_REGION_RE = re.compile(r'\b((?:Kota|Kabupaten)\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)')
+_LEFTOVER_RE = re.compile(r'[\s,;:\-–]+$|^[\s,;:\-–]+')
+
+# Row labels of a table's total line, which stands for the whole region in the title
+_TOTAL_LABELS = frozenset(["jumlah", "total", "jumlah/total"])
+
+# Words that name the kind of region rather than the region itself
+_REGION_KIND_WORDS = frozenset(["kota", "kabupaten", "kab", "kecamatan", "kelurahan", "desa", "provinsi"])
+
+# Question and table words that say nothing about which indicator is meant
+_GENERIC_TERMS = frozenset([
+    "jumlah", "tahun", "berapa", "data", "total", "banyak", "banyaknya", "angka", "nilai", "statistik",
+    "bps", "menurut", "per", "sebanyak", "ada", "tabel", "informasi", "info", "saat", "tersebut",
+])
+
+# Share of the query's content terms an indicator must contain to answer it
+MIN_TERM_COVERAGE = 2 / 3
+
+
+def table_path_for(output_file: str) -> str:
+    """Path prefix of the table store files next to an index path"""
+    return os.path.splitext(output_file)[0] + "_tables"
+
+
+def parse_number(text: str) -> Optional[float]:
+    """Value of an Indonesian-formatted number ('2.460.858', '12,5', '34.43'), or None"""
+    text = (text or "").replace(" ", "").replace("%", "").replace(" ", "")
+    if not text:
+        return None
+    if "," in text:
+        # Indonesian notation: '.' groups thousands and ',' marks the decimals
+        text = text.replace(".", "").replace(",", ".", 1)
+    elif _THOUSANDS_RE.match(text):
+        text = text.replace(".", "")
+    if not _NUMBER_RE.match(text):
+        return None
+    return float(text)
+
+
+def _without_years(text: str) -> str:
+    """Text with years and the punctuation left around them removed"""
+    return _LEFTOVER_RE.sub("", _YEAR_RE.sub("", text).replace("  ", " ")).strip()
+
+
+def table_facts(title: str, tables: List[Dict]) -> List[Fact]:
+    """Turn a statistics page's table grids into (year, region, indicator, value) facts.
+
+    The first column labels the rows (a region, or a year in time series);
+    header rows give each value column its indicator and year, falling back
+    to the page title for whatever the header does not say.
+    """
+    stem = _TITLE_SUFFIX_RE.sub("", title or "").strip()
+    title_years = set(_YEAR_RE.findall(stem))
+    default_year = int(title_years.pop()) if len(title_years) == 1 else 0
+    title_indicator = _without_years(stem)
+    title_region = _TITLE_REGION_RE.search(stem)
+    title_region = title_region.group(1) if title_region else ""
+
+    facts: List[Fact] = []
+    for table in tables:
+        rows = table["rows"]
+        header_rows = table["header_rows"]
+        if not header_rows and rows and all(parse_number(cell) is None or _YEAR_RE.fullmatch(cell)
+                                            for cell in rows[0][1:]):
+            header_rows = 1
+        width = max(len(row) for row in rows)
+
+        columns = []
+        for column in range(width):
+            parts = [row[column] for row in rows[:header_rows] if column < len(row) and row[column]]
+            label = " ".join(dict.fromkeys(parts))
+            years = _YEAR_RE.findall(label)
+            columns.append((int(years[-1]) if years else 0, _without_years(label) or title_indicator))
+
+        for row in rows[header_rows:]:
+            label = row[0] if row else ""
+            row_year = int(label) if _YEAR_RE.fullmatch(label) else 0
+            if row_year or label.lower() in _TOTAL_LABELS or not label:
+                region = title_region
+            else:
+                region = label
+            for column in range(1, len(row)):
+                value = parse_number(row[column])
+                if value is None:
+                    continue
+                column_year, indicator = columns[column]
+                facts.append((column_year or row_year or default_year, region, indicator, value))
+    return facts
+
+
+# A table of facts coded against its own dictionaries: (regions, indicators, pages, columns)
+_Part = Tuple[List[str], List[str], List[Dict], Dict[str, "np.ndarray"]]
+
+
+def _facts_part(pages: Dict[str, Tuple[str, List[Fact]]]) -> _Part:
+    """Columns of the facts of some pages (url -> (title, facts)); pages without facts are kept too"""
+    regions = sorted({fact[1] for _, facts in pages.values() for fact in facts})
+    indicators = sorted({fact[2] for _, facts in pages.values() for fact in facts})
+    region_codes = {region: code for code, region in enumerate(regions)}
+    indicator_codes = {indicator: code for code, indicator in enumerate(indicators)}
+
+    page_list = []
+    rows = []
+    for url, (title, facts) in pages.items():
+        page_code = len(page_list)
+        page_list.append({"url": url, "title": title})
+        rows.extend((indicator_codes[indicator], region_codes[region], year, page_code, value)
+                    for year, region, indicator, value in facts)
+    columns = {
+        "indicator": np.array([row[0] for row in rows], dtype=np.int32),
+        "region": np.array([row[1] for row in rows], dtype=np.int32),
+        "year": np.array([row[2] for row in rows], dtype=np.int16),
+        "page": np.array([row[3] for row in rows], dtype=np.int64),
+        "value": np.array([row[4] for row in rows], dtype=np.float64),
+    }
+    return regions, indicators, page_list, columns
+
+
+class TableStore:
+    """Columnar store of table facts: NumPy columns over string dictionaries, grouped by indicator.
+
+    Files: <path>.npz holds the year/region/indicator/page/value columns,
+    sorted by indicator with per-indicator row offsets; <path>.json holds
+    the region, indicator and page dictionaries and the indicator index
+    (search term -> indicator codes).
+    """
+
+    def __init__(self, path: str):
+        if np is None:
+            raise RuntimeError("the table store needs numpy: pip install numpy")
+        self.path = path
+        self.regions: List[str] = []
+        self.indicators: List[str] = []
+        self.pages: List[Dict] = []
+        self.index: Dict[str, List[int]] = {}
+        self.columns = {name: np.zeros(0, dtype=dtype) for name, dtype in
+                        (("year", np.int16), ("region", np.int32), ("indicator", np.int32),
+                         ("page", np.int32), ("value", np.float64))}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self._region_terms: List[set] = []
+        self._whole_regions = np.zeros(0, dtype=np.float64)
+        if self.exists(path):
+            self._load()
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """Whether a table store is saved at the path prefix"""
+        return np is not None and os.path.exists(path + ".npz") and os.path.exists(path + ".json")
+
+    def _load(self):
+        with open(self.path + ".json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("version") != TABLE_FORMAT_VERSION:
+            raise ValueError(f"{self.path} is not a version {TABLE_FORMAT_VERSION} table store")
+        self.regions = meta["regions"]
+        self.indicators = meta["indicators"]
+        self.pages = meta["pages"]
+        self.index = meta["index"]
+        with np.load(self.path + ".npz") as arrays:
+            self.columns = {name: arrays[name] for name in self.columns}
+            self.offsets = arrays["offsets"]
+        self._region_terms = [set(tokenize(region)) - _REGION_KIND_WORDS for region in self.regions]
+        # A whole kota/kabupaten (a table's total line) answers a query that names no sub-region
+        self._whole_regions = np.array([0.25 if _TITLE_REGION_RE.fullmatch(region) else 0.0
+                                        for region in self.regions], dtype=np.float64)
+
+    def __len__(self) -> int:
+        """Number of stored facts"""
+        return len(self.columns["value"])
+
+    def page_facts(self) -> Dict[str, Tuple[str, List[Fact]]]:
+        """Every stored fact, grouped per page as url -> (title, facts)"""
+        grouped = {page["url"]: (page["title"], []) for page in self.pages}
+        columns = self.columns
+        for row in range(len(self)):
+            page = self.pages[columns["page"][row]]
+            grouped[page["url"]][1].append((int(columns["year"][row]), self.regions[columns["region"][row]],
+                                            self.indicators[columns["indicator"][row]],
+                                            float(columns["value"][row])))
+        return grouped
+
+    def replace_pages(self, pages: Dict[str, Tuple[str, List[Fact]]]):
+        """Replace the facts of the given pages (url -> (title, facts)) and rewrite the store"""
+        self._write([self._without_pages(set(pages)), _facts_part(pages)])
+
+    def merge(self, others: List["TableStore"]):
+        """Replace the facts of every page in other table stores with theirs (later stores win) and rewrite the store.
+
+        The stores stay columnar throughout, so merging costs a few bytes
+        per fact rather than a Python tuple per fact.
+        """
+        replaced: set = set()
+        parts = []
+        for other in reversed(others):
+            parts.append(other._without_pages(replaced))
+            replaced.update(page["url"] for page in other.pages)
+        self._write([self._without_pages(replaced)] + parts[::-1])
+
+    def _without_pages(self, urls: set) -> "_Part":
+        """This store's facts minus those of the given pages"""
+        kept_pages = [page for page in self.pages if page["url"] not in urls]
+        if len(kept_pages) == len(self.pages):
+            return self.regions, self.indicators, self.pages, self.columns
+        page_map = np.full(len(self.pages), -1, dtype=np.int64)
+        page_map[[code for code, page in enumerate(self.pages) if page["url"] not in urls]] = np.arange(len(kept_pages))
+        pages = page_map[self.columns["page"]]
+        rows = pages >= 0
+        columns = {name: column[rows] for name, column in self.columns.items()}
+        columns["page"] = pages[rows]
+        return self.regions, self.indicators, kept_pages, columns
+
+    def _write(self, parts: List["_Part"]):
+        """Rewrite the store from parts, each coded against its own region, indicator and page lists"""
+        regions = sorted({part[0][code] for part in parts for code in np.unique(part[3]["region"])})
+        indicators = sorted({part[1][code] for part in parts for code in np.unique(part[3]["indicator"])})
+        region_codes = {region: code for code, region in enumerate(regions)}
+        indicator_codes = {indicator: code for code, indicator in enumerate(indicators)}
+
+        page_list: List[Dict] = []
+        pieces = []
+        for part_regions, part_indicators, part_pages, columns in parts:
+            region_map = np.array([region_codes.get(region, -1) for region in part_regions], dtype=np.int32)
+            indicator_map = np.array([indicator_codes.get(indicator, -1) for indicator in part_indicators],
+                                     dtype=np.int32)
+            pieces.append({
+                "indicator": indicator_map[columns["indicator"]] if len(indicator_map) else columns["indicator"],
+                "region": region_map[columns["region"]] if len(region_map) else columns["region"],
+                "year": columns["year"],
+                "page": columns["page"] + len(page_list),
+                "value": columns["value"],
+            })
+            page_list.extend(part_pages)
+
+        columns = {name: np.concatenate([piece[name] for piece in pieces]).astype(column.dtype, copy=False)
+                   for name, column in self.columns.items()}
+        del pieces
+        order = np.lexsort((columns["year"], columns["region"], columns["indicator"]))
+        for name in columns:
+            columns[name] = columns[name][order]
+        offsets = np.searchsorted(columns["indicator"], np.arange(len(indicators) + 1)).astype(np.int64)
+
+        index: Dict[str, List[int]] = {}
+        for code, indicator in enumerate(indicators):
+            for term in dict.fromkeys(tokenize(indicator)):
+                index.setdefault(term, []).append(code)
+
+        with open(self.path + ".npz.tmp", 'wb') as f:
+            np.savez(f, offsets=offsets, **columns)
+        with open(self.path + ".json.tmp", 'w', encoding='utf-8') as f:
+            json.dump({"version": TABLE_FORMAT_VERSION, "regions": regions, "indicators": indicators,
+                       "pages": page_list, "index": index}, f, ensure_ascii=False)
+        for suffix in (".npz", ".json"):
+            publish_file(self.path + suffix + ".tmp", self.path + suffix)
+        self._load()
+
+    def lookup(self, query: str, limit: int = 5) -> List[Dict]:
+        """Facts answering a query like 'penduduk medan 2023', best first.
+
+        The query's content terms (minus years, generic words like "jumlah"
+        and region names) pick the indicators: one qualifies only when it
+        contains at least MIN_TERM_COVERAGE of them, so a query about
+        something the store does not hold gets no answer rather than a
+        wrong one. Rows are scored by indicator terms matched plus how well
+        their region matches the query; only the asked-for years are kept,
+        and ties go to the latest year.
+        """
+        if not len(self):
+            return []
+        terms = tokenize(query)
+        years = {int(term) for term in terms if _YEAR_TOKEN_RE.match(term)}
+        words = set(term for term in terms if not _YEAR_TOKEN_RE.match(term))
+        region_words = set().union(*self._region_terms) if self._region_terms else set()
+        content = words - _GENERIC_TERMS - _REGION_KIND_WORDS - region_words
+        if not content:
+            return []
+
+        matches: Dict[int, int] = {}
+        for word in content:
+            for code in self.index.get(word, ()):
+                matches[code] = matches.get(code, 0) + 1
+        needed = math.ceil(len(content) * MIN_TERM_COVERAGE)
+        matches = {code: count for code, count in matches.items() if count >= needed}
+        if not matches:
+            return []
+        candidates = sorted(matches)
+        rows = np.concatenate([np.arange(self.offsets[code], self.offsets[code + 1]) for code in candidates])
+        indicator_scores = np.zeros(len(self.indicators), dtype=np.float64)
+        indicator_scores[candidates] = [matches[code] for code in candidates]
+
+        # Region score per region code: query words it shares, plus a bonus when it names nothing else
+        region_scores = self._whole_regions.copy()
+        for code, region_terms in enumerate(self._region_terms):
+            shared = len(region_terms & words)
+            region_scores[code] += shared + (0.5 if shared and shared == len(region_terms) else 0.0)
+        score = (indicator_scores[self.columns["indicator"][rows]]
+                 + region_scores[self.columns["region"][rows]])
+
+        year = self.columns["year"][rows]
+        if years:
+            keep = np.isin(year, list(years))
+            rows, score, year = rows[keep], score[keep], year[keep]
+
+        # Best indicator and region match first, then the most recent year
+        order = np.lexsort((-year.astype(np.int32), -score))
+        facts = []
+        seen = set()
+        for row, row_score in zip(rows[order], score[order]):
+            fact = dict(self.fact(int(row)), score=round(float(row_score), 6))
+            # The same figure republished on several pages is one answer
+            key = (fact["indicator"], fact["region"], fact["year"], fact["value"])
+            if key not in seen:
+                seen.add(key)
+                facts.append(fact)
+                if len(facts) == limit:
+                    break
+        return facts
+
+    def fact(self, row: int) -> Dict:
+        """One stored fact with its source page"""
+        columns = self.columns
+        page = self.pages[columns["page"][row]]
+        return {
+            "indicator": self.indicators[columns["indicator"][row]],
+            "region": self.regions[columns["region"][row]],
+            "year": int(columns["year"][row]) or None,
+            "value": float(columns["value"][row]),
+            "title": page["title"],
+            "url": page["url"],
+        }
@@ -0,0 +1,142 @@
+import re
+from typing import Iterable, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+
+# Every path the crawler never follows, as one alternation
+_SKIP_RE = re.compile(
+    r'\.(?:pdf|doc|docx|xls|xlsx|ppt|pptx|zip|rar|jpg|jpeg|png|gif|css|js)$'
+    r'|/(?:assets|static|media|images|css|js|fonts)/'
+    r'|/download/'
+)
+_SKIP_QUERY_RE = re.compile(r'(?:^|&)print\b')
+
+_ABSOLUTE_RE = re.compile(r'https?://', re.IGNORECASE)
+_URL_RE = re.compile(
+    r'(?P<scheme>https?)://(?P<host>[^/?#:@]+)(?::(?P<port>\d+))?(?P<path>[^?#]*)(?:\?(?P<query>[^#]*))?',
+    re.IGNORECASE
+)
+
+_SKIP_SCHEMES_RE = re.compile(r'^\s*(?:mailto|javascript|tel|data):', re.IGNORECASE)
+
+# URL section -> page type, in priority order
+_URL_TYPE_RE = re.compile(
+    r'(?P<statistics_subject>/subject/)'
+    r'|(?P<publication>/publication)'
+    r'|(?P<news>/pressrelease|/news)'
+    r'|(?P<statistics_table>/statictable)'
+)
+_URL_TYPE_PRIORITY = ("statistics_subject", "publication", "news", "statistics_table")
+
+_TITLE_DATA_RE = re.compile(r'tabel|data|statistik')
+_TITLE_PUBLICATION_RE = re.compile(r'publikasi|laporan')
+
+# Query parameters that never change page content
+_TRACKING_PARAMS = frozenset(["fbclid", "gclid", "_ga", "ref"])
+
+
+def _canonical_query(query: str) -> str:
+    """Drop empty and tracking parameters and sort the rest"""
+    params = [
+        param for param in query.split("&")
+        if param and not param.startswith("utm_") and param.split("=", 1)[0] not in _TRACKING_PARAMS
+    ]
+    params.sort()
+    return "&".join(params)
+
+
+class UrlRules:
+    """Precompiled link validation, normalization and page-type classification"""
+
+    def __init__(self, allowed_hosts: Iterable[str] = ("medankota.bps.go.id",)):
+        self.allowed_hosts = frozenset(host.lower() for host in allowed_hosts)
+        self._origins = {}
+
+    def normalize(self, href: str, base_url: str) -> Optional[str]:
+        """Absolute, canonical URL for a crawlable link, or None to skip it"""
+        if not href:
+            return None
+
+        href = href.strip()
+        if href.startswith("//"):
+            href = f"{self._origin(base_url).split(':', 1)[0]}:{href}"
+        elif href.startswith("/"):
+            href = self._origin(base_url) + href
+        elif not _ABSOLUTE_RE.match(href):
+            if _SKIP_SCHEMES_RE.match(href):
+                return None
+            # Document-relative or fragment-only link: the rare, slow path
+            href = urljoin(base_url, href)
+
+        match = _URL_RE.match(href)
+        if not match:
+            return None
+
+        host = match.group("host").lower()
+        if host not in self.allowed_hosts:
+            return None
+
+        path = match.group("path") or "/"
+        if "/." in path:
+            path = urlsplit(urljoin(href, path)).path or "/"
+        query = match.group("query")
+
+        if _SKIP_RE.search(path.lower()):
+            return None
+
+        url = f"{match.group('scheme').lower()}://{host}"
+        port = match.group("port")
+        if port and port not in ("80", "443"):
+            url += f":{port}"
+        url += path
+
+        if query:
+            if _SKIP_QUERY_RE.search(query.lower()):
+                return None
+            query = _canonical_query(query)
+            if query:
+                url += f"?{query}"
+
+        return url
+
+    def _origin(self, base_url: str) -> str:
+        """scheme://host[:port] of a base URL, cached per base"""
+        origin = self._origins.get(base_url)
+        if origin is None:
+            match = _URL_RE.match(base_url)
+            origin = f"{match.group('scheme').lower()}://{match.group('host').lower()}" if match else ""
+            if match and match.group("port"):
+                origin += f":{match.group('port')}"
+            if len(self._origins) < 4096:
+                self._origins[base_url] = origin
+        return origin
+
+    def is_valid(self, url: str) -> bool:
+        """Check an absolute URL against the crawl rules"""
+        return self.normalize(url, url) is not None
+
+    def classify(self, url: str, title: str = "") -> str:
+        """Page type from the URL section, falling back to title words"""
+        best = None
+        for match in _URL_TYPE_RE.finditer(url.lower()):
+            rank = _URL_TYPE_PRIORITY.index(match.lastgroup)
+            if best is None or rank < best:
+                best = rank
+                if rank == 0:
+                    break
+        if best is not None:
+            return _URL_TYPE_PRIORITY[best]
+
+        title_lower = (title or "").lower()
+        if _TITLE_DATA_RE.search(title_lower):
+            return 'statistics_data'
+        if _TITLE_PUBLICATION_RE.search(title_lower):
+            return 'publication'
+        return 'general'
+
+    def process(self, href: str, base_url: str, title: str = "") -> Optional[Tuple[str, str]]:
+        """Normalize and classify a link in one pass: (url, page_type) or None"""
+        url = self.normalize(href, base_url)
+        if url is None:
+            return None
+        return url, self.classify(url, title)
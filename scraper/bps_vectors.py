@@ -0,0 +1,204 @@
+import json
+import os
+import zlib
+from typing import Dict, Iterable, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # vector search is optional; keyword search works without it
+    np = None
+
+from bps_publish import publish_file
+from bps_search import RESULT_FIELDS, tokenize
+
+
+VECTOR_FORMAT_VERSION = 1
+
+# Hashed TF-IDF feature space, reduced with LSA to a small dense embedding
+HASH_DIM = 2048
+EMBEDDING_DIM = 128
+CHAR_NGRAM = 3
+
+# Rows scored per matrix block, so a query never touches more than this at once
+BLOCK_ROWS = 8192
+
+
+def vector_path_for(output_file: str) -> str:
+    """Path prefix of the vector index files next to an index path"""
+    return os.path.splitext(output_file)[0] + "_vectors"
+
+
+def _features(text: str) -> List[int]:
+    """Hashed word and character-trigram features; trigrams match word variants"""
+    features = []
+    for token in tokenize(text):
+        features.append(zlib.crc32(token.encode('utf-8')) % HASH_DIM)
+        padded = f"#{token}#"
+        for i in range(len(padded) - CHAR_NGRAM + 1):
+            features.append(zlib.crc32(b"g" + padded[i:i + CHAR_NGRAM].encode('utf-8')) % HASH_DIM)
+    return features
+
+
+def _term_matrix(texts: List[str]):
+    """Sublinear term-frequency rows over the hashed feature space"""
+    matrix = np.zeros((len(texts), HASH_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        features = _features(text)
+        if features:
+            np.add.at(matrix[row], features, 1.0)
+    np.log1p(matrix, out=matrix)
+    return matrix
+
+
+def _normalize_rows(matrix):
+    """Scale rows to unit length (zero rows stay zero)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class HashedLsaEmbedder:
+    """CPU-only text embedder: hashed TF-IDF projected onto its top LSA components"""
+
+    def __init__(self, idf, projection):
+        self.idf = idf
+        self.projection = projection
+
+    @classmethod
+    def fit(cls, texts: List[str], dim: int = EMBEDDING_DIM) -> "HashedLsaEmbedder":
+        """Learn IDF weights and the LSA projection from a corpus"""
+        document_frequency = np.zeros(HASH_DIM, dtype=np.float64)
+        gram = np.zeros((HASH_DIM, HASH_DIM), dtype=np.float64)
+        for start in range(0, len(texts), 1000):
+            tf = _term_matrix(texts[start:start + 1000])
+            document_frequency += (tf > 0).sum(axis=0)
+        idf = np.log((1 + len(texts)) / (1 + document_frequency)).astype(np.float32) + 1.0
+
+        # Right singular vectors of the TF-IDF matrix = eigenvectors of its Gram matrix
+        for start in range(0, len(texts), 1000):
+            block = _normalize_rows(_term_matrix(texts[start:start + 1000]) * idf)
+            gram += block.T.astype(np.float64) @ block
+        eigenvalues, eigenvectors = np.linalg.eigh(gram)
+        keep = min(dim, max(1, int((eigenvalues > 1e-9).sum())))
+        projection = eigenvectors[:, ::-1][:, :keep].astype(np.float32)
+        return cls(idf, projection)
+
+    def embed(self, texts: List[str]):
+        """Unit-length embeddings, one row per text"""
+        tfidf = _normalize_rows(_term_matrix(texts) * self.idf)
+        return _normalize_rows(tfidf @ self.projection)
+
+
+def _page_text(record: Dict) -> str:
+    """Title, description and keywords of a page record as one text"""
+    keywords = record.get("keywords") or []
+    return "\n".join([record.get("title", ""), record.get("description", ""), " ".join(keywords)])
+
+
+def build_vector_index(records: List[Dict], path: str, chunk_store=None) -> Dict:
+    """Embed every page (and its stored chunks) and write the memory-mappable vector index"""
+    if np is None:
+        raise RuntimeError("vector search needs numpy: pip install numpy")
+
+    pages = []
+    texts = []
+    rows: List[Tuple[int, int]] = []
+    for record in records:
+        page_index = len(pages)
+        pages.append({field: record.get(field, "") for field in RESULT_FIELDS})
+        texts.append(_page_text(record))
+        rows.append((page_index, -1))
+        if chunk_store is not None:
+            for passage in chunk_store.passages(record.get("url", "")):
+                texts.append(f"{record.get('title', '')}\n{passage['text']}")
+                rows.append((page_index, passage["seq"]))
+
+    embedder = HashedLsaEmbedder.fit(texts)
+    matrix = np.lib.format.open_memmap(path + ".npy.tmp", mode='w+', dtype=np.float32,
+                                       shape=(len(texts), embedder.projection.shape[1]))
+    for start in range(0, len(texts), 1000):
+        matrix[start:start + 1000] = embedder.embed(texts[start:start + 1000])
+    matrix.flush()
+    del matrix
+
+    with open(path + ".model.npz.tmp", 'wb') as f:
+        np.savez(f, idf=embedder.idf, projection=embedder.projection)
+    with open(path + ".json.tmp", 'w', encoding='utf-8') as f:
+        json.dump({"version": VECTOR_FORMAT_VERSION, "pages": pages, "rows": rows}, f, ensure_ascii=False)
+    # The .json goes last: it is what a reloading searcher checks
+    for suffix in (".npy", ".model.npz", ".json"):
+        publish_file(path + suffix + ".tmp", path + suffix)
+
+    return {"pages": len(pages), "rows": len(rows), "dimensions": int(embedder.projection.shape[1])}
+
+
+class VectorIndex:
+    """Top-k cosine search over the memory-mapped embedding matrix"""
+
+    def __init__(self, path: str):
+        if np is None:
+            raise RuntimeError("vector search needs numpy: pip install numpy")
+        self.path = path
+        with open(path + ".json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("version") != VECTOR_FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {VECTOR_FORMAT_VERSION} vector index")
+        self.pages: List[Dict] = meta["pages"]
+        self.rows = np.asarray(meta["rows"], dtype=np.int32).reshape(-1, 2)
+        model = np.load(path + ".model.npz")
+        self.embedder = HashedLsaEmbedder(model["idf"], model["projection"])
+        self.matrix = np.load(path + ".npy", mmap_mode='r')
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """Whether a complete vector index is stored at the path prefix"""
+        return np is not None and all(os.path.exists(path + suffix) for suffix in (".npy", ".model.npz", ".json"))
+
+    def __len__(self) -> int:
+        """Number of pages in the index"""
+        return len(self.pages)
+
+    def search_many(self, queries: List[str], limit: int = 10) -> List[List[Tuple[int, float, int]]]:
+        """Per query, the best (page index, score, chunk seq or -1) triples, one per page"""
+        if not queries or not len(self.matrix):
+            return [[] for _ in queries]
+        query_vectors = self.embedder.embed(queries)
+        candidates = min(len(self.matrix), limit * 8)
+
+        best_rows = [[] for _ in queries]
+        for start in range(0, len(self.matrix), BLOCK_ROWS):
+            scores = np.asarray(self.matrix[start:start + BLOCK_ROWS]) @ query_vectors.T
+            take = min(candidates, scores.shape[0])
+            top = np.argpartition(-scores, take - 1, axis=0)[:take]
+            for q in range(len(queries)):
+                best_rows[q].extend((float(scores[row, q]), start + int(row)) for row in top[:, q])
+
+        results = []
+        for rows in best_rows:
+            rows.sort(reverse=True)
+            seen = {}
+            for score, row in rows:
+                page_index, chunk_seq = int(self.rows[row][0]), int(self.rows[row][1])
+                if score > 0 and page_index not in seen:
+                    seen[page_index] = (page_index, score, chunk_seq)
+                    if len(seen) == limit:
+                        break
+            results.append(list(seen.values()))
+        return results
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float, int]]:
+        """Best (page index, score, chunk seq or -1) triples for one query"""
+        return self.search_many([query], limit)[0]
+
+    def record(self, page_index: int) -> Dict:
+        """Result fields of a page"""
+        return self.pages[page_index]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> Tuple[List[str], Dict[str, float]]:
+    """Merge ranked URL lists: score = sum of 1 / (k + rank) over the lists; returns (urls, scores)"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, url in enumerate(ranking, 1):
+            scores[url] = scores.get(url, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda url: scores[url], reverse=True), scores
@@ -1,6 +1,7 @@
 // server/routes/chatbot.ts
 import { RequestHandler } from "express";
-import { spawn } from "child_process";
+import { spawn, ChildProcessWithoutNullStreams } from "child_process";
+import readline from "readline";
 import { OpenAI } from "openai";
 import path from "path";
 import { fileURLToPath } from "url";
@@ -28,8 +29,30 @@ interface ScrapedResult {
   url: string;
   description: string;
   type: string;
+  passages?: string[];
+  score?: number;
 }
 
+interface TableFact {
+  indicator: string;
+  region: string;
+  year: number | null;
+  value: number;
+  title: string;
+  url: string;
+  score: number;
+}
+
+interface DaemonMessage {
+  id?: number;
+  results?: ScrapedResult[];
+  facts?: TableFact[];
+  error?: string;
+}
+
+// bm25: keyword match; hybrid: keyword match fused with semantic (embedding) search
+type SearchMode = "bm25" | "vector" | "hybrid";
+
 const openai = new OpenAI({
   apiKey: process.env.OPENAI_API_KEY || "ollama",
   baseURL: process.env.OPENAI_API_KEY
@@ -37,42 +60,154 @@ const openai = new OpenAI({
     : process.env.OLLAMA_BASE_URL || "http://localhost:11434/v1",
 });
 
-class ChatbotService {
-  private async runPythonScraper(keyword: string): Promise<ScrapedResult[]> {
-    return new Promise((resolve) => {
-      const scraperPath = path.join(__dirname, "../../scraper/bps_scraper.py");
-      const pythonProcess = spawn("python", [scraperPath, keyword]);
+const SCRAPER_DIR = path.join(__dirname, "../../scraper");
+const SCRAPER_PASSAGES_PER_RESULT = 2;
+const SCRAPER_QUERY_TIMEOUT_MS = 10000;
+const SCRAPER_FACTS_PER_ANSWER = 3;
+// Set to a shard directory (e.g. public/shards) to search every crawled BPS site
+const SCRAPER_SHARD_DIR = process.env.SCRAPER_SHARD_DIR;
 
-      let output = "";
-      let errorOutput = "";
+// Long-lived `bps_serve.py` query process (the crawler's `serve` command
+// without its Chrome imports). Queries are written as one JSON object per
+// line on stdin and answered the same way on stdout, so Python startup and
+// index loading are paid once instead of once per keyword.
+class ScraperDaemon {
+  private process: ChildProcessWithoutNullStreams | null = null;
+  private nextId = 1;
+  private pending = new Map<
+    number,
+    {
+      resolve: (message: DaemonMessage) => void;
+      reject: (error: Error) => void;
+      timer: NodeJS.Timeout;
+    }
+  >();
 
-      pythonProcess.stdout.on("data", (data) => {
-        output += data.toString();
-      });
+  private ensureProcess(): ChildProcessWithoutNullStreams {
+    if (this.process) return this.process;
 
-      pythonProcess.stderr.on("data", (data) => {
-        errorOutput += data.toString();
-      });
+    const args = ["bps_serve.py"];
+    if (SCRAPER_SHARD_DIR) args.push(`--shards=${SCRAPER_SHARD_DIR}`);
+    const child = spawn("python", args, {
+      cwd: SCRAPER_DIR,
+    });
 
-      pythonProcess.on("close", () => {
-        if (errorOutput) {
-          console.error("Python scraper error:", errorOutput);
-          return resolve([]);
-        }
-        try {
-          const results = JSON.parse(output);
-          resolve(Array.isArray(results) ? results : []);
-        } catch (error) {
-          console.error("Failed to parse scraper output:", error);
-          resolve([]);
-        }
-      });
+    readline.createInterface({ input: child.stdout }).on("line", (line) => {
+      this.handleLine(line);
+    });
 
-      pythonProcess.on("error", (error) => {
-        console.error("Failed to spawn python process:", error);
-        resolve([]);
-      });
+    child.stderr.on("data", (data) => {
+      console.error("Python scraper error:", data.toString());
     });
+
+    child.on("error", (error) => {
+      console.error("Failed to spawn python process:", error);
+      this.reset(child, error);
+    });
+
+    // Writing to a process that already exited (EPIPE) fails here, not in write()
+    child.stdin.on("error", (error) => {
+      console.error("Failed to write to python process:", error);
+      this.reset(child, error);
+    });
+
+    child.on("close", () => {
+      this.reset(child, new Error("python scraper process exited"));
+    });
+
+    this.process = child;
+    return child;
+  }
+
+  private handleLine(line: string) {
+    let message: DaemonMessage;
+    try {
+      message = JSON.parse(line);
+    } catch (error) {
+      console.error("Failed to parse scraper output:", error);
+      return;
+    }
+
+    const entry = this.pending.get(message.id);
+    if (!entry) return;
+    this.pending.delete(message.id);
+    clearTimeout(entry.timer);
+
+    if (message.error) {
+      console.error("Python scraper error:", message.error);
+    }
+    entry.resolve(message);
+  }
+
+  // Forget a failed process (the next query starts a new one) and fail
+  // every query still waiting on it; events of an already replaced process
+  // are ignored
+  private reset(child: ChildProcessWithoutNullStreams, error: Error) {
+    if (this.process !== child) return;
+    this.process = null;
+    if (child.exitCode === null) child.kill();
+    for (const entry of this.pending.values()) {
+      clearTimeout(entry.timer);
+      entry.reject(error);
+    }
+    this.pending.clear();
+  }
+
+  private send(request: Record<string, unknown>): Promise<DaemonMessage> {
+    return new Promise((resolve, reject) => {
+      const child = this.ensureProcess();
+      const id = this.nextId++;
+
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        console.error(`Python scraper query timed out: ${request.keyword}`);
+        resolve({});
+      }, SCRAPER_QUERY_TIMEOUT_MS);
+
+      this.pending.set(id, { resolve, reject, timer });
+      child.stdin.write(JSON.stringify({ id, ...request }) + "\n");
+    });
+  }
+
+  // A failed query (the process died) answers with no results; the next
+  // query starts a fresh process
+  private async request(request: Record<string, unknown>): Promise<DaemonMessage> {
+    try {
+      return await this.send(request);
+    } catch (error) {
+      console.error("Python scraper query failed:", error);
+      return {};
+    }
+  }
+
+  async query(keyword: string, mode: SearchMode = "bm25"): Promise<ScrapedResult[]> {
+    const message = await this.request({
+      keyword,
+      mode,
+      passages: SCRAPER_PASSAGES_PER_RESULT,
+    });
+    return Array.isArray(message.results) ? message.results : [];
+  }
+
+  // Figures from the crawled statistics tables, e.g. for "penduduk medan 2023"
+  async lookup(keyword: string): Promise<TableFact[]> {
+    const message = await this.request({
+      command: "lookup",
+      keyword,
+      limit: SCRAPER_FACTS_PER_ANSWER,
+    });
+    return Array.isArray(message.facts) ? message.facts : [];
+  }
+}
+
+const scraperDaemon = new ScraperDaemon();
+
+class ChatbotService {
+  private async runPythonScraper(
+    keyword: string,
+    mode: SearchMode = "bm25",
+  ): Promise<ScrapedResult[]> {
+    return scraperDaemon.query(keyword, mode);
   }
 
   private async getAIResponse(
@@ -112,7 +247,11 @@ Jika ada link, jelaskan relevansinya secara singkat.`,
     if (scrapedResults.length > 0) {
       prompt += "Hasil pencarian dari BPS Kota Medan:\n";
       scrapedResults.forEach((r, i) => {
-        prompt += `${i + 1}. ${r.title}\n${r.description}\n${r.url}\n\n`;
+        prompt += `${i + 1}. ${r.title}\n${r.description}\n${r.url}\n`;
+        (r.passages || []).forEach((passage) => {
+          prompt += `> ${passage.replace(/\n/g, "\n> ")}\n`;
+        });
+        prompt += "\n";
       });
       prompt +=
         "Jelaskan relevansi hasil ini terhadap pertanyaan pengguna dan sertakan saran jika perlu.";
@@ -158,9 +297,45 @@ Jika ada link, jelaskan relevansinya secara singkat.`,
     });
   }
 
+  // A question that names a year and matches a table is answered from the
+  // table store directly, without a round trip to the language model
+  private async answerFromTables(message: string): Promise<ChatbotResponse | null> {
+    if (!/\b(19|20)\d{2}\b/.test(message)) return null;
+    const facts = await scraperDaemon.lookup(message);
+    if (facts.length === 0) return null;
+
+    const lines = facts.map((fact) => {
+      const where = fact.region ? ` di ${fact.region}` : "";
+      const when = fact.year ? ` tahun ${fact.year}` : "";
+      return `- ${fact.indicator}${where}${when}: ${fact.value.toLocaleString("id-ID")}`;
+    });
+    const sources = new Map(facts.map((fact) => [fact.url, fact.title]));
+    return {
+      response: `Berdasarkan tabel statistik BPS:\n${lines.join("\n")}`,
+      links: [...sources].map(([url, title]) => ({
+        title,
+        url,
+        description: "Tabel statistik sumber data",
+      })),
+    };
+  }
+
   async processQuery(message: string): Promise<ChatbotResponse> {
+    const tableAnswer = await this.answerFromTables(message);
+    if (tableAnswer) return tableAnswer;
+
     const keywords = this.extractKeywords(message);
     if (keywords.length === 0) {
+      // No known topic word: let semantic search match the question itself
+      const semanticResults = this.removeDuplicates(
+        await this.runPythonScraper(message, "hybrid"),
+      );
+      if (semanticResults.length > 0) {
+        return {
+          response: await this.getAIResponse(message, semanticResults),
+          links: semanticResults.map(({ passages, score, ...link }) => link),
+        };
+      }
       return {
         response:
           "Silakan berikan kata kunci yang lebih spesifik, misalnya: kemiskinan, penduduk, PDRB, pendidikan.",
@@ -174,18 +349,17 @@ Jika ada link, jelaskan relevansinya secara singkat.`,
       };
     }
 
-    let allResults: ScrapedResult[] = [];
-    for (const kw of keywords) {
-      const results = await this.runPythonScraper(kw);
-      allResults = [...allResults, ...results];
-    }
+    const resultsPerKeyword = await Promise.all(
+      keywords.map((kw) => this.runPythonScraper(kw)),
+    );
+    const allResults: ScrapedResult[] = resultsPerKeyword.flat();
 
     const uniqueResults = this.removeDuplicates(allResults);
     const aiResponse = await this.getAIResponse(message, uniqueResults);
 
     return {
       response: aiResponse,
-      links: uniqueResults,
+      links: uniqueResults.map(({ passages, score, ...link }) => link),
     };
   }
 }